@@ -1,7 +1,7 @@
 # ============================================================================
 # IMPORTS - HANDLERS COMPARTIDOS (Shared)
 # ============================================================================
-from actions.handlers.shared.session_actions import ActionFinalizarChat
+from actions.handlers.shared.session_actions import ActionSessionStart, ActionFinalizarChat
 from actions.handlers.shared.advisor_actions import ActionSolicitarAsesor
 from actions.handlers.shared.fallback_actions import (
     ActionSmartFallback,
@@ -93,6 +93,15 @@ from actions.handlers.tramites.tributarios_tramites_actions import (
     ActionTramitesSuspensionTributaria
 )
 
+# ============================================================================
+# ARRANQUE DEL ACTION SERVER
+# ============================================================================
+# El action server importa este módulo al iniciar: abrir el outbox de
+# escrituras al backend y reanudar las entregas que quedaron pendientes
+from actions.api.backend_outbox import backend_outbox
+
+backend_outbox.resume()
+
 # ============================================================================
 # EXPORTACIÓN DE TODAS LAS ACTIONS
 # ============================================================================
@@ -100,6 +109,7 @@ __all__ = [
     # ========================================================================
     # SHARED - Actions compartidos
     # ========================================================================
+    'ActionSessionStart',
     'ActionFinalizarChat',
     'ActionSolicitarAsesor',
     'ActionSmartFallback',
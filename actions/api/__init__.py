@@ -4,7 +4,21 @@ Módulo de integración con APIs externas
 Este módulo contiene toda la lógica de comunicación con servicios externos:
 - Autenticación con la API del SAT
 - Cliente HTTP para endpoints del SAT
+- Configuración de la API del SAT y circuit breakers por familia de endpoints
+- Hedging de peticiones lentas del SAT para recortar la latencia de cola
+- Timeouts por familia de endpoints (conexión/lectura, modo adaptativo)
+- Deduplicación (single-flight) de consultas idénticas en curso
+- Límite de tasa de salida al SAT por familia, con prioridad para consultas del usuario
+- Bulkheads (límites de concurrencia) por servicio externo y familia de endpoints
+- Catálogo en memoria de códigos de falta con refresco en segundo plano
+- Catálogo en memoria de requisitos del TUPA por trámite con refresco en segundo plano
 - Autenticación con el backend interno
 - Cliente para operaciones con el backend (ciudadanos, asesores)
+- Caché stale-while-revalidate de los mensajes de despedida
 - Configuración de endpoints del backend
+- Transporte HTTP compartido con pool de conexiones keep-alive
+- Política de reintentos con backoff y presupuesto global de reintentos
+- Clientes asíncronos (SAT y backend) para actions con run asíncrono
+- Registro en segundo plano de consultas y outbox durable de escrituras al backend
+- Almacén de tokens compartido entre workers y renovación coordinada
 """
\ No newline at end of file
@@ -0,0 +1,234 @@
+"""
+Cliente asíncrono para el backend del sistema de ciudadanos con autenticación JWT
+"""
+import asyncio
+import aiohttp
+import logging
+from typing import Optional, Dict, Any, Tuple, List
+from .backend_config import BackendConfig
+from .backend_auth import backend_auth
+from .backend_client import BackendAPIClient, citizen_profile_cache
+from .retry_policy import retry_policy
+from .bulkhead import backend_bulkheads
+from .timeout_policy import backend_timeout_policy
+from .http_transport import async_http_transport, AsyncResponse
+from actions.utils.deadline import Deadline
+
+logger = logging.getLogger(__name__)
+
+
+class AsyncBackendAPIClient(BackendAPIClient):
+    """
+    Cliente asíncrono para APIs del backend
+
+    Comparte con BackendAPIClient la interpretación de respuestas; solo cambia
+    el transporte, que no bloquea el event loop del action server.
+    """
+
+    def __init__(self):
+        super().__init__()
+        # Teléfono -> tarea de precarga en curso (mantiene la referencia a la tarea)
+        self._prefetches: Dict[str, "asyncio.Task"] = {}
+
+    async def _get_headers_async(self, extra_headers: Optional[Dict[str, str]] = None,
+                                 deadline: Optional[Deadline] = None) -> Dict[str, str]:
+        """Obtiene headers con token de autenticación sin bloquear el event loop"""
+        headers = await backend_auth.get_auth_headers_async(deadline)
+        if extra_headers:
+            headers.update(extra_headers)
+        return headers
+
+    async def _make_authenticated_request(
+            self,
+            method: str,
+            url: str,
+            extra_headers: Optional[Dict[str, str]] = None,
+            deadline: Optional[Deadline] = None,
+            **kwargs
+    ) -> Optional[AsyncResponse]:
+        """
+        Realiza petición HTTP autenticada con manejo de token expirado
+
+        Args:
+            method: HTTP (GET, POST, PUT, etc.)
+            url: URL completa del endpoint
+            extra_headers: Headers adicionales (p. ej. Idempotency-Key)
+            deadline: Plazo del action; las llamadas solo reciben el tiempo restante
+            **kwargs: Argumentos adicionales para aiohttp
+
+        Returns:
+            AsyncResponse o None si hay error
+        """
+        headers = await self._get_headers_async(extra_headers, deadline)
+        if "Authorization" not in headers:
+            # Sin token (login fallido y en backoff): fallar rápido
+            logger.error(f"Sin token de autenticación para backend, omitiendo petición: {url}")
+            return None
+
+        # Ocupar un cupo del bulkhead de la familia (y del backend) mientras dure la petición
+        family = BackendConfig.endpoint_family(url)
+        bulkhead = backend_bulkheads.get(family)
+        wait = BackendConfig.BULKHEAD_MAX_WAIT
+        if not await bulkhead.acquire_async(min(wait, deadline.remaining()) if deadline is not None else wait):
+            logger.warning(f"Bulkhead de backend {family} lleno, omitiendo petición: {url}")
+            return None
+
+        try:
+            logger.info(f"{method} {url}")
+
+            response = await async_http_transport.request(
+                method,
+                url,
+                headers=headers,
+                timeout=backend_timeout_policy.timeout_for(family),
+                retry_policy=retry_policy,
+                deadline=deadline,
+                **kwargs
+            )
+
+            # Si el token expiró (401), renovar e intentar de nuevo
+            if response.status_code == 401:
+                logger.warning("Token expirado, renovando...")
+                backend_auth.clear_rejected_token(headers)
+
+                # Reintentar con nuevo token
+                headers = await self._get_headers_async(extra_headers, deadline)
+                if "Authorization" not in headers:
+                    logger.error("No se pudo renovar el token, omitiendo reintento")
+                    return None
+                response = await async_http_transport.request(
+                    method,
+                    url,
+                    headers=headers,
+                    timeout=backend_timeout_policy.timeout_for(family),
+                    retry_policy=retry_policy,
+                    deadline=deadline,
+                    **kwargs
+                )
+
+                if response.status_code == 401:
+                    logger.error("Fallo en reintento después de renovar token")
+                    return None
+                else:
+                    logger.info("Reintento exitoso con nuevo token")
+
+            return response
+
+        except asyncio.TimeoutError:
+            logger.error(f"Timeout en petición: {url}")
+            return None
+        except aiohttp.ClientConnectionError:
+            logger.error(f"Error de conexión: {url}")
+            return None
+        except Exception as e:
+            logger.error(f"Error inesperado en petición {url}: {e}")
+            return None
+        finally:
+            bulkhead.release()
+
+    async def get_citizen_data(self, phone_number: str,
+                               deadline: Optional[Deadline] = None) -> Optional[Dict[str, Any]]:
+        """Obtiene datos básicos de un ciudadano por número de teléfono (con caché)"""
+        cached = citizen_profile_cache.get(phone_number)
+        if cached is not None:
+            return cached
+
+        endpoint = BackendConfig.CITIZEN_GET_INFO.format(phone=phone_number)
+        url = f"{self.base_url}{endpoint}"
+
+        response = await self._make_authenticated_request("GET", url, deadline=deadline)
+        data = self._parse_citizen_data_response(response, phone_number)
+        citizen_profile_cache.put(phone_number, data)
+        return data
+
+    def prefetch_citizen_data(self, phone_number: str):
+        """
+        Carga en segundo plano los datos del ciudadano en la caché
+
+        No espera la respuesta; si ya están en caché o hay una carga en curso
+        para el mismo teléfono no hace nada.
+        """
+        if not citizen_profile_cache.enabled or phone_number in self._prefetches:
+            return
+        if citizen_profile_cache.get(phone_number) is not None:
+            return
+
+        task = asyncio.ensure_future(self.get_citizen_data(phone_number))
+        self._prefetches[phone_number] = task
+        task.add_done_callback(lambda _: self._prefetches.pop(phone_number, None))
+
+    async def close_assistance(self, phone_number: str, idempotency_key: Optional[str] = None,
+                               deadline: Optional[Deadline] = None) -> Tuple[bool, str]:
+        """Cierra la asistencia activa para un ciudadano"""
+        url = f"{self.base_url}{BackendConfig.ASSISTANCE_CLOSE}"
+
+        payload = {
+            "phoneNumber": phone_number
+        }
+
+        response = await self._make_authenticated_request(
+            "PUT",
+            url,
+            extra_headers=self._idempotency_headers(idempotency_key),
+            deadline=deadline,
+            json=payload
+        )
+        return self._parse_close_assistance_response(response, phone_number)
+
+    async def request_advisor(self, phone_number: str, idempotency_key: Optional[str] = None,
+                              deadline: Optional[Deadline] = None) -> Tuple[bool, str]:
+        """Solicita un asesor humano para el ciudadano"""
+        endpoint = BackendConfig.CITIZEN_REQUEST_ADVISOR.format(phone=phone_number)
+        url = f"{self.base_url}{endpoint}"
+
+        response = await self._make_authenticated_request(
+            "POST",
+            url,
+            extra_headers=self._idempotency_headers(idempotency_key),
+            deadline=deadline
+        )
+        return self._parse_request_advisor_response(response, phone_number)
+
+    async def log_bot_query(
+            self,
+            phone_number: str,
+            query_type: str,
+            document_type: str,
+            document_value: str,
+            idempotency_key: Optional[str] = None,
+            deadline: Optional[Deadline] = None
+    ) -> Tuple[bool, str]:
+        """Registra una consulta del bot a la API del SAT en el backend"""
+        endpoint = BackendConfig.BOT_QUERY_LOG.format(phone=phone_number)
+        url = f"{self.base_url}{endpoint}"
+
+        payload = {
+            "queryType": query_type,
+            "documentType": document_type,
+            "documentValue": document_value
+        }
+
+        response = await self._make_authenticated_request(
+            "POST",
+            url,
+            extra_headers=self._idempotency_headers(idempotency_key),
+            deadline=deadline,
+            json=payload
+        )
+        return self._parse_bot_query_response(response, phone_number, payload)
+
+    async def get_farewell_messages(self, category_id: int = None,
+                                    deadline: Optional[Deadline] = None) -> Optional[List[str]]:
+        """Obtiene los mensajes de despedida configurados para el canal"""
+        if category_id is None:
+            category_id = BackendConfig.CHANNEL_CATEGORY_ID
+
+        endpoint = BackendConfig.FAREWELL_MESSAGES.format(categoryId=category_id)
+        url = f"{self.base_url}{endpoint}"
+
+        response = await self._make_authenticated_request("GET", url, deadline=deadline)
+        return self._parse_farewell_messages_response(response, category_id)
+
+
+# Instancia global del cliente backend asíncrono
+async_backend_client = AsyncBackendAPIClient()
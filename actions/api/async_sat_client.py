@@ -0,0 +1,339 @@
+"""
+Cliente asíncrono para APIs del SAT (no bloquea el event loop del action server)
+"""
+import asyncio
+import aiohttp
+import time
+import logging
+from typing import Optional, Dict, Any, Tuple
+from actions.utils.metrics import metrics
+from actions.utils.deadline import Deadline, DeadlineConfig
+from .sat_client import SATAPIClient, sat_result_cache
+from .sat_auth import auth_manager
+from .sat_config import SATConfig
+from .circuit_breaker import sat_breaker_for
+from .bulkhead import sat_bulkheads
+from .rate_limiter import sat_rate_limiters, background_priority
+from .timeout_policy import sat_timeout_policy
+from .single_flight import async_sat_single_flight
+from .hedging import hedged_call, adaptive_hedge_delay, sat_hedge_budget
+from .retry_policy import retry_policy
+from .http_transport import async_http_transport
+from .falta_catalog import falta_catalog
+from .tupa_catalog import tupa_catalog
+
+logger = logging.getLogger(__name__)
+
+
+class AsyncSATAPIClient(SATAPIClient):
+    """
+    Cliente asíncrono para todas las APIs del SAT
+
+    Reutiliza los endpoints de SATAPIClient: cada método consultar_* devuelve
+    una corrutina que debe esperarse con await.
+    """
+
+    def __init__(self):
+        super().__init__()
+        # Clave de caché de deuda -> consulta especulativa en curso
+        self._prefetches: Dict[str, "asyncio.Task"] = {}
+
+    async def _get_headers_async(self, deadline: Optional[Deadline] = None) -> Dict[str, str]:
+        """Obtiene headers con token de autenticación sin bloquear el event loop"""
+        headers = self.default_headers.copy()
+
+        token = await auth_manager.get_valid_token_async(deadline)
+        if token:
+            headers["Authorization"] = f"Bearer {token}"
+
+        return headers
+
+    async def _cached_request(self, tipo: str, documento: str, endpoint: str,
+                              deadline: Optional[Deadline] = None) -> Optional[Dict[str, Any]]:
+        """Consulta de deuda con caché LRU+TTL por documento normalizado"""
+        key = self._result_cache_key(tipo, documento)
+        if key is not None:
+            prefetch = self._prefetches.get(key)
+            if prefetch is not None and prefetch is not asyncio.current_task():
+                # Aprovechar la consulta especulativa en curso en lugar de repetirla
+                await asyncio.wait({prefetch}, timeout=deadline.remaining() if deadline else None)
+            cached = sat_result_cache.get(key)
+            if cached is not None:
+                logger.info(f"Consulta de deuda servida desde caché: {key}")
+                return cached
+
+        result = await self._make_request("GET", endpoint, deadline=deadline)
+        if key is not None:
+            sat_result_cache.put(key, result)
+        return result
+
+    def prefetch_deuda(self, tipo: str, documento: str):
+        """
+        Lanza en segundo plano la consulta de deuda de un documento para dejarla en caché
+
+        Se usa mientras el usuario aún decide qué consultar: la respuesta la
+        comparten las consultas de papeletas e impuestos por placa, DNI o
+        RUC. No espera el resultado y corre con prioridad de segundo plano.
+        """
+        consultas = {
+            "placa": self.consultar_papeletas_por_placa,
+            "dni": self.consultar_papeletas_por_dni,
+            "ruc": self.consultar_papeletas_por_ruc,
+        }
+        if tipo not in consultas or not sat_result_cache.enabled:
+            return
+
+        key = self._result_cache_key(tipo, documento)
+        if key is None or key in self._prefetches or sat_result_cache.get(key) is not None:
+            return
+
+        async def prefetch():
+            try:
+                with background_priority():
+                    await consultas[tipo](documento, deadline=Deadline.for_action())
+            except Exception as e:
+                logger.warning(f"Error en consulta especulativa de {key}: {e}")
+            finally:
+                self._prefetches.pop(key, None)
+
+        metrics.increment("sat.prefetch.started")
+        self._prefetches[key] = asyncio.ensure_future(prefetch())
+
+    async def consultar_codigo_falta(self, codigo: str,
+                                     deadline: Optional[Deadline] = None) -> Optional[Dict[str, Any]]:
+        """Consulta un código de falta desde el catálogo en memoria (la red solo si no está)"""
+        cached = falta_catalog.get(codigo)
+        if cached is not None:
+            return cached
+
+        result = await self.fetch_codigo_falta(codigo, deadline)
+        falta_catalog.put(codigo, result)
+        return result
+
+    async def consultar_requisitos_tramite(self, titulo: str, tipo_tramite: str = "papeletas",
+                                           deadline: Optional[Deadline] = None) -> Optional[str]:
+        """Requisitos de un trámite desde el catálogo del TUPA en memoria (la red solo si no está)"""
+        cached = tupa_catalog.get(tipo_tramite, titulo)
+        if cached is not None:
+            return cached
+
+        entry = await self.fetch_requisitos_tramite(titulo, tipo_tramite, deadline)
+        tupa_catalog.put(tipo_tramite, titulo, entry)
+        return entry["texto"] if entry else None
+
+    async def fetch_requisitos_tramite(self, titulo: str, tipo_tramite: str = "papeletas",
+                                       deadline: Optional[Deadline] = None) -> Optional[Dict[str, Any]]:
+        """Consulta menú y TUPA de un trámite sin pasar por el catálogo en memoria"""
+        menu_response = await self.consultar_menu_opcion(titulo, tipo_tramite=tipo_tramite, deadline=deadline)
+        if not menu_response or 'ivalor' not in menu_response:
+            logger.error(f"No se pudo obtener ivalor para: {titulo}")
+            return None
+
+        ivalor = menu_response.get('ivalor')
+        requisitos_response = await self.consultar_requisitos_tupa(ivalor, deadline=deadline)
+        return self._build_requisitos_entry(ivalor, requisitos_response)
+
+    async def _make_request(self, method: str, endpoint: str, deadline: Optional[Deadline] = None,
+                            **kwargs) -> Optional[Dict[str, Any]]:
+        """
+        Realiza una petición a la API del SAT, compartiendo las consultas idénticas en curso
+
+        Args:
+            method: Método HTTP (GET, POST, etc.)
+            endpoint: Endpoint de la API
+            deadline: Plazo del action; las llamadas solo reciben el tiempo restante
+            **kwargs: Argumentos adicionales para aiohttp
+
+        Returns:
+            Dict con la respuesta o None si hay error
+        """
+        if SATConfig.COALESCE_REQUESTS and method.upper() == "GET" and not kwargs:
+            call = async_sat_single_flight.do(
+                self._coalesce_key(method, endpoint), self._execute_request, method, endpoint, deadline
+            )
+        else:
+            call = self._execute_request(method, endpoint, deadline=deadline, **kwargs)
+
+        if deadline is None:
+            return await call
+        try:
+            # Una consulta compartida puede haber empezado con otro plazo: no esperar más que el propio
+            return await asyncio.wait_for(call, timeout=max(deadline.remaining(), DeadlineConfig.MIN_TIMEOUT))
+        except asyncio.TimeoutError:
+            logger.warning(f"Plazo del action agotado esperando a la API SAT: {endpoint}")
+            metrics.increment("sat.deadline_exceeded")
+            return None
+
+    async def _execute_request(self, method: str, endpoint: str, deadline: Optional[Deadline] = None,
+                               **kwargs) -> Optional[Dict[str, Any]]:
+        """
+        Realiza una petición HTTP asíncrona con manejo de errores y reintentos
+
+        Args:
+            method: Método HTTP (GET, POST, etc.)
+            endpoint: Endpoint de la API
+            deadline: Plazo del action; las llamadas solo reciben el tiempo restante
+            **kwargs: Argumentos adicionales para aiohttp
+
+        Returns:
+            Dict con la respuesta o None si hay error
+        """
+        headers = await self._get_headers_async(deadline)
+        if "Authorization" not in headers:
+            # Sin token (login fallido y en backoff): fallar rápido
+            logger.error(f"Sin token de autenticación para API SAT, omitiendo petición: {endpoint}")
+            return None
+
+        if deadline is not None and deadline.expired():
+            logger.warning(f"Plazo del action agotado, omitiendo petición: {endpoint}")
+            metrics.increment("sat.deadline_exceeded")
+            return None
+
+        family = SATConfig.endpoint_family(endpoint)
+
+        # Cortar de inmediato si la familia del endpoint está degradada, antes de
+        # esperar fichas o cupos que una petición rechazada no va a usar
+        breaker = sat_breaker_for(family)
+        if breaker is None or not breaker.allow_request():
+            logger.warning(f"Circuit breaker abierto para {family}, omitiendo petición: {endpoint}")
+            return None
+
+        try:
+            # Esperar turno en el límite de tasa de la familia (las consultas del usuario van primero)
+            limiter = sat_rate_limiters.get(family)
+            if limiter is not None and not await limiter.acquire_async(self._rate_limit_wait(deadline)):
+                # Devolver la prueba half-open (si lo era) sin evaluar al SAT
+                breaker.record(None)
+                logger.warning(f"Límite de tasa de {family} alcanzado, omitiendo petición: {endpoint}")
+                return None
+
+            # Ocupar un cupo del bulkhead de la familia (y del SAT) mientras dure la petición
+            bulkhead = sat_bulkheads.get(family)
+            if not await bulkhead.acquire_async(self._bulkhead_wait(deadline)):
+                breaker.record(None)
+                logger.warning(f"Bulkhead de {family} lleno, omitiendo petición: {endpoint}")
+                return None
+        except asyncio.CancelledError:
+            # Tarea cancelada (plazo del action) mientras esperaba ficha o cupo
+            breaker.record(None)
+            raise
+
+        healthy = None
+        started = time.monotonic()
+        try:
+            if family in SATConfig.HEDGE_FAMILIES and method.upper() == "GET":
+                # Duplicar la petición si tarda más que el percentil observado
+                result, healthy = await hedged_call(
+                    lambda: self._send_request(method, endpoint, headers, deadline, **kwargs),
+                    delay=adaptive_hedge_delay(
+                        f"sat.{family}.latency_ms",
+                        percentile=SATConfig.HEDGE_PERCENTILE,
+                        min_samples=SATConfig.HEDGE_MIN_SAMPLES,
+                        default_delay=SATConfig.HEDGE_DEFAULT_DELAY,
+                        min_delay=SATConfig.HEDGE_MIN_DELAY
+                    ),
+                    budget=sat_hedge_budget,
+                    name=f"sat.{family}",
+                    is_acceptable=lambda outcome: outcome[1] is not False,
+                    rate_limiter=limiter
+                )
+            else:
+                result, healthy = await self._send_request(method, endpoint, headers, deadline, **kwargs)
+        finally:
+            # Siempre liberar el resultado y el cupo (también si la tarea se cancela)
+            breaker.record(healthy)
+            bulkhead.release()
+
+        if healthy is not None:
+            # Latencia de la llamada completa (reintentos incluidos) para el hedging y los
+            # paneles; el timeout adaptativo usa la de cada intento, que mide el transporte
+            metrics.observe(f"sat.{family}.latency_ms", (time.monotonic() - started) * 1000)
+        return result
+
+    async def _send_request(self, method: str, endpoint: str, headers: Dict[str, str],
+                            deadline: Optional[Deadline] = None,
+                            **kwargs) -> Tuple[Optional[Dict[str, Any]], Optional[bool]]:
+        """
+        Envía la petición (reintentando una vez ante 401) y evalúa la salud del servicio
+
+        Returns:
+            Tuple: (respuesta o None, True si el SAT respondió sano, False ante
+                error 5xx/timeout/conexión, None si no llegó a evaluarse o el
+                error fue local)
+        """
+        url = f"{self.base_url}{endpoint}"
+        family = SATConfig.endpoint_family(endpoint)
+        timeout = sat_timeout_policy.timeout_for(family)
+        # Los reintentos toman ficha del mismo límite de tasa que la petición original
+        rate_limiter = sat_rate_limiters.get(family)
+
+        try:
+            logger.info(f" {method} {endpoint}")
+
+            response = await async_http_transport.request(
+                method,
+                url,
+                headers=headers,
+                timeout=timeout,
+                retry_policy=retry_policy,
+                deadline=deadline,
+                rate_limiter=rate_limiter,
+                latency_metric=sat_timeout_policy.attempt_metric(family),
+                verify=False,
+                **kwargs
+            )
+
+            if response.status_code == 200:
+                logger.info(f"Respuesta exitosa: {response.status_code}")
+                return response.json(), True
+
+            elif response.status_code == 401:
+                # Token expirado, renovar y reintentar
+                logger.warning("Token expirado, renovando...")
+                auth_manager.clear_rejected_token(headers)
+
+                # Reintentar con nuevo token
+                headers = await self._get_headers_async(deadline)
+                if "Authorization" not in headers:
+                    logger.error("No se pudo renovar el token, omitiendo reintento")
+                    return None, None
+                response = await async_http_transport.request(
+                    method,
+                    url,
+                    headers=headers,
+                    timeout=timeout,
+                    retry_policy=retry_policy,
+                    deadline=deadline,
+                    rate_limiter=rate_limiter,
+                    latency_metric=sat_timeout_policy.attempt_metric(family),
+                    verify=False,
+                    **kwargs
+                )
+
+                if response.status_code == 200:
+                    logger.info("Reintento exitoso después de renovar token")
+                    return response.json(), True
+                else:
+                    logger.error(f"Error en reintento: {response.status_code}")
+                    return None, response.status_code < 500
+
+            else:
+                logger.error(f"Error API SAT: {response.status_code} - {response.text}")
+                return None, response.status_code < 500
+
+        except asyncio.TimeoutError:
+            logger.error("Timeout en petición a API SAT")
+            # Un timeout por agotar el plazo del action no indica que el SAT esté degradado
+            return None, None if deadline is not None and deadline.expired() else False
+        except aiohttp.ClientConnectionError:
+            logger.error("Error de conexión con API SAT")
+            return None, False
+        except Exception as e:
+            # Fallo local (p. ej. JSON inválido en un 200 o un error de código):
+            # no dice nada de la salud del SAT y no debe abrir el breaker
+            logger.error(f"Error inesperado en API SAT: {e}")
+            return None, None
+
+
+# Instancia global del cliente API asíncrono
+async_sat_client = AsyncSATAPIClient()
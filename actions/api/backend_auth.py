@@ -3,19 +3,26 @@ Manejo de autenticación con el backend
 """
 import requests
 import logging
-from datetime import datetime, timedelta
-from typing import Optional
+from typing import Optional, Tuple
+from actions.utils.deadline import Deadline
 from .backend_config import BackendConfig
+from .http_transport import http_transport
+from .token_auth import TokenAuthManager
 
 logger = logging.getLogger(__name__)
 
 
-class BackendAuthManager:
+class BackendAuthManager(TokenAuthManager):
     """Maneja la autenticación JWT con el backend"""
 
     def __init__(self):
-        self.access_token = None
-        self.token_expiry = None
+        super().__init__(
+            store_key="backend",
+            expiry_margin=BackendConfig.AUTH_EXPIRY_MARGIN,
+            refresh_margin=BackendConfig.AUTH_REFRESH_MARGIN,
+            backoff_base=BackendConfig.AUTH_FAILURE_BACKOFF_BASE,
+            backoff_max=BackendConfig.AUTH_FAILURE_BACKOFF_MAX
+        )
         self.auth_url = f"{BackendConfig.BASE_URL}{BackendConfig.AUTH_LOGIN_ENDPOINT}"
         self.credentials = {
             "email": BackendConfig.AUTH_EMAIL,
@@ -23,67 +30,58 @@ class BackendAuthManager:
             "rememberMe": False
         }
 
-    def get_valid_token(self) -> Optional[str]:
-        """Obtiene un token válido, renovándolo si es necesario"""
-        if self.access_token is None or self.is_token_expired():
-            self.refresh_token()
-        return self.access_token
+    @property
+    def access_token(self) -> Optional[str]:
+        """Token JWT vigente (alias de token)"""
+        return self.token
 
-    def is_token_expired(self) -> bool:
-        """Verifica si el token ha expirado"""
-        if self.token_expiry is None:
-            return True
-        # Renovar 5 minutos antes de expirar
-        return datetime.now() >= (self.token_expiry - timedelta(minutes=5))
-
-    def refresh_token(self) -> bool:
+    def _request_token(self, timeout: float) -> Optional[Tuple[str, float]]:
         """Obtiene un nuevo token de autenticación"""
         try:
             logger.info("Renovando token de autenticación del backend...")
 
-            response = requests.post(
+            response = http_transport.post(
                 self.auth_url,
                 json=self.credentials,
                 headers={"Content-Type": "application/json"},
-                timeout=30
+                timeout=timeout
             )
 
             if response.status_code == 200 or response.status_code == 201:
                 data = response.json()
-                self.access_token = data.get("accessToken")
 
                 # Calcular expiración (1 día si rememberMe=False)
                 expires_in_hours = 24 if not self.credentials["rememberMe"] else 24 * 30
-                self.token_expiry = datetime.now() + timedelta(hours=expires_in_hours)
 
                 logger.info(f"Token renovado exitosamente, expira en {expires_in_hours} horas")
-                return True
+                return data.get("accessToken"), expires_in_hours * 3600
             else:
                 logger.error(f"Error obteniendo token: {response.status_code} - {response.text}")
-                self.access_token = None
-                return False
+                return None
 
         except requests.exceptions.Timeout:
             logger.error("Timeout en autenticación del backend")
-            self.access_token = None
-            return False
+            return None
         except requests.exceptions.ConnectionError:
             logger.error("Error de conexión en autenticación del backend")
-            self.access_token = None
-            return False
+            return None
         except Exception as e:
             logger.error(f"Error inesperado en autenticación: {e}")
-            self.access_token = None
-            return False
-
-    def clear_token(self):
-        """Limpia el token actual para forzar renovación"""
-        self.access_token = None
-        self.token_expiry = None
+            return None
 
-    def get_auth_headers(self) -> dict:
+    def get_auth_headers(self, deadline: Optional[Deadline] = None) -> dict:
         """Obtiene headers con token de autenticación"""
-        token = self.get_valid_token()
+        token = self.get_valid_token(deadline)
+        if token:
+            return {
+                "Content-Type": "application/json",
+                "Authorization": f"Bearer {token}"
+            }
+        return {"Content-Type": "application/json"}
+
+    async def get_auth_headers_async(self, deadline: Optional[Deadline] = None) -> dict:
+        """Obtiene headers con token de autenticación sin bloquear el event loop"""
+        token = await self.get_valid_token_async(deadline)
         if token:
             return {
                 "Content-Type": "application/json",
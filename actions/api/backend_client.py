@@ -16,25 +16,65 @@ import logging
 from typing import Optional, Dict, Any, Tuple, List
 from .backend_config import BackendConfig
 from .backend_auth import backend_auth
+from .retry_policy import retry_policy
+from .bulkhead import backend_bulkheads
+from .timeout_policy import backend_timeout_policy
+from .http_transport import http_transport
+from actions.utils.deadline import Deadline
+from actions.utils.ttl_cache import TTLCache
 
 logger = logging.getLogger(__name__)
 
+# Caché de datos básicos del ciudadano (clave: número de teléfono)
+citizen_profile_cache = TTLCache(
+    "backend.citizen_cache",
+    ttl=BackendConfig.CITIZEN_CACHE_TTL,
+    max_entries=BackendConfig.CITIZEN_CACHE_MAX_ENTRIES
+)
+
+
+class WriteResult(tuple):
+    """
+    Resultado (éxito, mensaje) de una escritura al backend
+
+    Se desempaqueta igual que la tupla de siempre; status_code guarda el
+    código HTTP de la respuesta (None si no hubo respuesta) para que el
+    outbox distinga los rechazos definitivos de los errores reintentables.
+    """
+
+    def __new__(cls, success: bool, message: str, status_code: Optional[int] = None):
+        result = super().__new__(cls, (success, message))
+        result.status_code = status_code
+        return result
+
 
 class BackendAPIClient:
     """Cliente para APIs del backend del sistema con autenticación"""
 
     def __init__(self):
         self.base_url = BackendConfig.BASE_URL
-        self.timeout = 30
 
-    def _get_headers(self) -> Dict[str, str]:
+    def _get_headers(self, extra_headers: Optional[Dict[str, str]] = None,
+                     deadline: Optional[Deadline] = None) -> Dict[str, str]:
         """Obtiene headers con token de autenticación"""
-        return backend_auth.get_auth_headers()
+        headers = backend_auth.get_auth_headers(deadline)
+        if extra_headers:
+            headers.update(extra_headers)
+        return headers
+
+    @staticmethod
+    def _idempotency_headers(idempotency_key: Optional[str]) -> Optional[Dict[str, str]]:
+        """Header de idempotencia para escrituras que pueden reenviarse"""
+        if idempotency_key:
+            return {"Idempotency-Key": idempotency_key}
+        return None
 
     def _make_authenticated_request(
             self,
             method: str,
             url: str,
+            extra_headers: Optional[Dict[str, str]] = None,
+            deadline: Optional[Deadline] = None,
             **kwargs
     ) -> Optional[requests.Response]:
         """
@@ -43,36 +83,57 @@ class BackendAPIClient:
         Args:
             method: HTTP (GET, POST, PUT, etc.)
             url: URL completa del endpoint
+            extra_headers: Headers adicionales (p. ej. Idempotency-Key)
+            deadline: Plazo del action; las llamadas solo reciben el tiempo restante
             **kwargs: Argumentos adicionales para requests
 
         Returns:
             Response object o None si hay error
         """
-        headers = self._get_headers()
+        headers = self._get_headers(extra_headers, deadline)
+        if "Authorization" not in headers:
+            # Sin token (login fallido y en backoff): fallar rápido
+            logger.error(f"Sin token de autenticación para backend, omitiendo petición: {url}")
+            return None
+
+        # Ocupar un cupo del bulkhead de la familia (y del backend) mientras dure la petición
+        family = BackendConfig.endpoint_family(url)
+        bulkhead = backend_bulkheads.get(family)
+        wait = BackendConfig.BULKHEAD_MAX_WAIT
+        if not bulkhead.acquire(min(wait, deadline.remaining()) if deadline is not None else wait):
+            logger.warning(f"Bulkhead de backend {family} lleno, omitiendo petición: {url}")
+            return None
 
         try:
             logger.info(f"{method} {url}")
 
-            response = requests.request(
+            response = http_transport.request(
                 method=method,
                 url=url,
                 headers=headers,
-                timeout=self.timeout,
+                timeout=backend_timeout_policy.timeout_for(family),
+                retry_policy=retry_policy,
+                deadline=deadline,
                 **kwargs
             )
 
             # Si el token expiró (401), renovar e intentar de nuevo
             if response.status_code == 401:
                 logger.warning("Token expirado, renovando...")
-                backend_auth.clear_token()
+                backend_auth.clear_rejected_token(headers)
 
                 # Reintentar con nuevo token
-                headers = self._get_headers()
-                response = requests.request(
+                headers = self._get_headers(extra_headers, deadline)
+                if "Authorization" not in headers:
+                    logger.error("No se pudo renovar el token, omitiendo reintento")
+                    return None
+                response = http_transport.request(
                     method=method,
                     url=url,
                     headers=headers,
-                    timeout=self.timeout,
+                    timeout=backend_timeout_policy.timeout_for(family),
+                    retry_policy=retry_policy,
+                    deadline=deadline,
                     **kwargs
                 )
 
@@ -93,22 +154,39 @@ class BackendAPIClient:
         except Exception as e:
             logger.error(f"Error inesperado en petición {url}: {e}")
             return None
+        finally:
+            bulkhead.release()
 
-    def get_citizen_data(self, phone_number: str) -> Optional[Dict[str, Any]]:
+    def get_citizen_data(self, phone_number: str,
+                         deadline: Optional[Deadline] = None) -> Optional[Dict[str, Any]]:
         """
         Obtiene datos básicos de un ciudadano por número de teléfono
 
         Args:
             phone_number: Número de teléfono del ciudadano
+            deadline: Plazo del action para la llamada (opcional)
 
         Returns:
             Dict con datos del ciudadano o None si hay error/no existe
         """
+        cached = citizen_profile_cache.get(phone_number)
+        if cached is not None:
+            return cached
+
         endpoint = BackendConfig.CITIZEN_GET_INFO.format(phone=phone_number)
         url = f"{self.base_url}{endpoint}"
 
-        response = self._make_authenticated_request("GET", url)
+        response = self._make_authenticated_request("GET", url, deadline=deadline)
+        data = self._parse_citizen_data_response(response, phone_number)
+        citizen_profile_cache.put(phone_number, data)
+        return data
 
+    def invalidate_citizen_data(self, phone_number: str):
+        """Descarta los datos del ciudadano guardados en caché"""
+        citizen_profile_cache.invalidate(phone_number)
+
+    def _parse_citizen_data_response(self, response, phone_number: str) -> Optional[Dict[str, Any]]:
+        """Interpreta la respuesta de datos del ciudadano"""
         if response is None:
             return None
 
@@ -122,12 +200,15 @@ class BackendAPIClient:
             logger.error(f"Error obteniendo ciudadano {phone_number}: {response.status_code} - {response.text}")
             return None
 
-    def close_assistance(self, phone_number: str) -> Tuple[bool, str]:
+    def close_assistance(self, phone_number: str, idempotency_key: Optional[str] = None,
+                         deadline: Optional[Deadline] = None) -> Tuple[bool, str]:
         """
         Cierra la asistencia activa para un ciudadano
 
         Args:
             phone_number: Número de teléfono del ciudadano
+            idempotency_key: Clave para que el backend ignore reenvíos duplicados
+            deadline: Plazo del action para la llamada (opcional)
 
         Returns:
             Tuple[bool, str]: (éxito, mensaje)
@@ -141,9 +222,14 @@ class BackendAPIClient:
         response = self._make_authenticated_request(
             "PUT",
             url,
+            extra_headers=self._idempotency_headers(idempotency_key),
+            deadline=deadline,
             json=payload
         )
+        return self._parse_close_assistance_response(response, phone_number)
 
+    def _parse_close_assistance_response(self, response, phone_number: str) -> Tuple[bool, str]:
+        """Interpreta la respuesta de cierre de asistencia"""
         if response is None:
             return False, "Error de conexión"
 
@@ -154,20 +240,25 @@ class BackendAPIClient:
 
             if success:
                 logger.info(f"Asistencia cerrada: {phone_number}")
+                # El estado del ciudadano en el backend cambió
+                self.invalidate_citizen_data(phone_number)
                 return True, message
             else:
                 logger.warning(f"Backend reportó fallo: {phone_number}")
-                return False, message
+                return WriteResult(False, message, response.status_code)
         else:
             logger.error(f"Error cerrando asistencia {phone_number}: {response.status_code}")
-            return False, f"Error del servidor: {response.status_code}"
+            return WriteResult(False, f"Error del servidor: {response.status_code}", response.status_code)
 
-    def request_advisor(self, phone_number: str) -> Tuple[bool, str]:
+    def request_advisor(self, phone_number: str, idempotency_key: Optional[str] = None,
+                        deadline: Optional[Deadline] = None) -> Tuple[bool, str]:
         """
         Solicita un asesor humano para el ciudadano
 
         Args:
             phone_number: Número de teléfono del ciudadano
+            idempotency_key: Clave para que el backend ignore reenvíos duplicados
+            deadline: Plazo del action para la llamada (opcional)
 
         Returns:
             Tuple[bool, str]: (éxito, mensaje)
@@ -175,8 +266,16 @@ class BackendAPIClient:
         endpoint = BackendConfig.CITIZEN_REQUEST_ADVISOR.format(phone=phone_number)
         url = f"{self.base_url}{endpoint}"
 
-        response = self._make_authenticated_request("POST", url)
+        response = self._make_authenticated_request(
+            "POST",
+            url,
+            extra_headers=self._idempotency_headers(idempotency_key),
+            deadline=deadline
+        )
+        return self._parse_request_advisor_response(response, phone_number)
 
+    def _parse_request_advisor_response(self, response, phone_number: str) -> Tuple[bool, str]:
+        """Interpreta la respuesta de solicitud de asesor"""
         if response is None:
             return False, "Error de conexión con el servidor"
 
@@ -184,20 +283,23 @@ class BackendAPIClient:
             data = response.json()
             message = data.get('message', 'Asesor solicitado exitosamente')
             logger.info(f"Asesor solicitado: {phone_number}")
+            self.invalidate_citizen_data(phone_number)
             return True, message
         elif response.status_code == 404:
             logger.warning(f"Chat no encontrado: {phone_number}")
-            return False, "No se encontró una conversación activa"
+            return WriteResult(False, "No se encontró una conversación activa", response.status_code)
         else:
             logger.error(f"Error solicitando asesor {phone_number}: {response.status_code}")
-            return False, f"Error del servidor: {response.status_code}"
+            return WriteResult(False, f"Error del servidor: {response.status_code}", response.status_code)
 
     def log_bot_query(
             self,
             phone_number: str,
             query_type: str,
             document_type: str,
-            document_value: str
+            document_value: str,
+            idempotency_key: Optional[str] = None,
+            deadline: Optional[Deadline] = None
     ) -> Tuple[bool, str]:
         """
         Registra una consulta del bot a la API del SAT en el backend
@@ -207,6 +309,8 @@ class BackendAPIClient:
             query_type: Tipo de consulta (tickets_by_plate, taxes_by_dni, etc.)
             document_type: Tipo de documento (plate, dni, ruc, etc.)
             document_value: Valor del documento
+            idempotency_key: Clave para que el backend ignore reenvíos duplicados
+            deadline: Plazo del action para la llamada (opcional)
 
         Returns:
             Tuple[bool, str]: (éxito, mensaje)
@@ -223,26 +327,37 @@ class BackendAPIClient:
         response = self._make_authenticated_request(
             "POST",
             url,
+            extra_headers=self._idempotency_headers(idempotency_key),
+            deadline=deadline,
             json=payload
         )
+        return self._parse_bot_query_response(response, phone_number, payload)
 
+    def _parse_bot_query_response(self, response, phone_number: str,
+                                  payload: Dict[str, str]) -> Tuple[bool, str]:
+        """Interpreta la respuesta del registro de consulta del bot"""
         if response is None:
             logger.warning(f"No se pudo registrar consulta del bot para {phone_number}")
             return False, "Error de conexión al registrar consulta"
 
         if response.status_code in [200, 201]:
-            logger.info(f"Consulta registrada: {query_type} - {document_type}:{document_value} para {phone_number}")
+            logger.info(
+                f"Consulta registrada: {payload['queryType']} - "
+                f"{payload['documentType']}:{payload['documentValue']} para {phone_number}"
+            )
             return True, "Consulta registrada exitosamente"
         else:
             logger.warning(f"Error registrando consulta {phone_number}: {response.status_code}")
-            return False, f"Error del servidor: {response.status_code}"
+            return WriteResult(False, f"Error del servidor: {response.status_code}", response.status_code)
 
-    def get_farewell_messages(self, category_id: int = None) -> Optional[List[str]]:
+    def get_farewell_messages(self, category_id: int = None,
+                              deadline: Optional[Deadline] = None) -> Optional[List[str]]:
         """
         Obtiene los mensajes de despedida configurados para el canal
 
         Args:
             category_id: ID de categoría del canal (por defecto usa el configurado)
+            deadline: Plazo del action para la llamada (opcional)
 
         Returns:
             Lista de mensajes de despedida o None si hay error
@@ -253,8 +368,11 @@ class BackendAPIClient:
         endpoint = BackendConfig.FAREWELL_MESSAGES.format(categoryId=category_id)
         url = f"{self.base_url}{endpoint}"
 
-        response = self._make_authenticated_request("GET", url)
+        response = self._make_authenticated_request("GET", url, deadline=deadline)
+        return self._parse_farewell_messages_response(response, category_id)
 
+    def _parse_farewell_messages_response(self, response, category_id: int) -> Optional[List[str]]:
+        """Interpreta la respuesta de mensajes de despedida"""
         if response is None:
             logger.warning(f"No se pudieron obtener mensajes de despedida para categoryId: {category_id}")
             return None
@@ -2,7 +2,9 @@
 Configuración para el backend del sistema de ciudadanos
 """
 import os
+from urllib.parse import urlparse
 from dotenv import load_dotenv
+from .sat_config import parse_family_values
 
 # Cargar variables de entorno
 load_dotenv()
@@ -17,6 +19,36 @@ class BackendConfig:
     AUTH_EMAIL = os.getenv('BACKEND_AUTH_EMAIL', 'rasa-bot@mail.com')
     AUTH_PASSWORD = os.getenv('BACKEND_AUTH_PASSWORD', 'QiMAL5JDP8sfzfom')
 
+    # Timeouts de conexión y lectura (segundos) de las peticiones al backend; el
+    # de lectura se puede ajustar por familia con BACKEND_READ_TIMEOUTS='familia=segundos,...'
+    CONNECT_TIMEOUT = float(os.getenv('BACKEND_CONNECT_TIMEOUT', '3'))
+    READ_TIMEOUT = float(os.getenv('BACKEND_READ_TIMEOUT', '15'))
+    READ_TIMEOUTS = parse_family_values(os.getenv('BACKEND_READ_TIMEOUTS', ''))
+
+    # Familias de endpoints (prefijo de ruta -> nombre), cada una con su bulkhead
+    ENDPOINT_FAMILIES = [
+        ("/v1/channel-citizen/", "citizen"),
+        ("/v1/channel-room/", "room"),
+        ("/v1/automatic-messages/", "messages"),
+    ]
+
+    # Bulkheads: peticiones en curso al backend como máximo (en total y por
+    # familia, sobrescribible con BACKEND_BULKHEAD_FAMILY_LIMITS='familia=n,...')
+    BULKHEAD_LIMIT = int(os.getenv('BACKEND_BULKHEAD_LIMIT', '20'))
+    BULKHEAD_FAMILY_LIMITS = parse_family_values(os.getenv('BACKEND_BULKHEAD_FAMILY_LIMITS', ''))
+    BULKHEAD_DEFAULT_FAMILY_LIMIT = int(os.getenv('BACKEND_BULKHEAD_DEFAULT_FAMILY_LIMIT', '10'))
+    BULKHEAD_MAX_WAIT = float(os.getenv('BACKEND_BULKHEAD_MAX_WAIT', '1'))
+
+    # Renovación del token: deja de usarse EXPIRY_MARGIN s antes de expirar y
+    # el hilo de fondo lo renueva REFRESH_MARGIN s antes
+    AUTH_EXPIRY_MARGIN = float(os.getenv('BACKEND_AUTH_EXPIRY_MARGIN', '300'))
+    AUTH_REFRESH_MARGIN = float(os.getenv('BACKEND_AUTH_REFRESH_MARGIN', '600'))
+
+    # Backoff exponencial (segundos) tras un login fallido; mientras dura, las
+    # peticiones fallan de inmediato en lugar de intentar otro login
+    AUTH_FAILURE_BACKOFF_BASE = float(os.getenv('BACKEND_AUTH_FAILURE_BACKOFF_BASE', '5'))
+    AUTH_FAILURE_BACKOFF_MAX = float(os.getenv('BACKEND_AUTH_FAILURE_BACKOFF_MAX', '120'))
+
     # Endpoints de autenticación
     AUTH_LOGIN_ENDPOINT = os.getenv(
         'BACKEND_AUTH_LOGIN_ENDPOINT',
@@ -51,4 +83,28 @@ class BackendConfig:
     )
 
     # Category ID para el canal (por defecto 4)
-    CHANNEL_CATEGORY_ID = int(os.getenv('CHANNEL_CATEGORY_ID', '4'))
\ No newline at end of file
+    CHANNEL_CATEGORY_ID = int(os.getenv('CHANNEL_CATEGORY_ID', '4'))
+
+    # Caché de datos básicos del ciudadano por teléfono (TTL en segundos; 0 la
+    # desactiva). Se invalida al solicitar asesor o cerrar la asistencia
+    CITIZEN_CACHE_TTL = float(os.getenv('CITIZEN_CACHE_TTL', '600'))
+    CITIZEN_CACHE_MAX_ENTRIES = int(os.getenv('CITIZEN_CACHE_MAX_ENTRIES', '5000'))
+
+    # Precargar los datos del ciudadano al iniciar la sesión (action_session_start).
+    # Solo sirve a los actions que leen get_citizen_data; sin ellos es una petición
+    # extra al backend por sesión, por eso está desactivado por defecto
+    CITIZEN_PREFETCH_ON_SESSION_START = os.getenv('CITIZEN_PREFETCH_ON_SESSION_START', 'false').lower() == 'true'
+
+    # Caché de mensajes de despedida: se revalida en segundo plano pasados
+    # FRESH_SECONDS y deja de servirse pasados MAX_STALE_SECONDS
+    FAREWELL_CACHE_FRESH_SECONDS = float(os.getenv('FAREWELL_CACHE_FRESH_SECONDS', '3600'))
+    FAREWELL_CACHE_MAX_STALE_SECONDS = float(os.getenv('FAREWELL_CACHE_MAX_STALE_SECONDS', '604800'))
+
+    @classmethod
+    def endpoint_family(cls, url: str) -> str:
+        """Nombre de la familia a la que pertenece una URL del backend"""
+        path = urlparse(url).path
+        for prefix, family in cls.ENDPOINT_FAMILIES:
+            if path.startswith(prefix):
+                return family
+        return "otros"
@@ -0,0 +1,307 @@
+"""
+Outbox durable (SQLite) para las escrituras al backend
+
+Las escrituras se registran localmente en microsegundos y un hilo en segundo
+plano las reenvía al backend con reintentos y clave de idempotencia. La
+entrega es al-menos-una-vez, incluso si el action server se reinicia.
+"""
+import os
+import json
+import uuid
+import random
+import sqlite3
+import threading
+import time
+import logging
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+from dotenv import load_dotenv
+from actions.utils.metrics import metrics
+from actions.utils.data_dir import data_path, ensure_parent_dir
+from .backend_client import backend_client
+
+# Cargar variables de entorno
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+
+class OutboxConfig:
+    """Configuración del outbox de escrituras al backend"""
+
+    # Si es False, las escrituras se envían directamente al backend
+    ENABLED = os.getenv('BACKEND_OUTBOX_ENABLED', 'true').lower() == 'true'
+
+    # Archivo SQLite del outbox (por defecto en ACTIONS_DATA_DIR, que debe ser
+    # un volumen persistente y escribible por el usuario del contenedor)
+    PATH = os.getenv('BACKEND_OUTBOX_PATH', data_path('backend_outbox.db'))
+
+    # Antigüedad (segundos) a partir de la cual un registro que sigue fallando
+    # pasa a estado 'dead'; cubre caídas largas del backend (72 h por defecto)
+    MAX_AGE_SECONDS = float(os.getenv('BACKEND_OUTBOX_MAX_AGE_SECONDS', '259200'))
+
+    # Códigos 4xx que se reintentan; el resto de 4xx es un rechazo definitivo
+    # del backend (payload inválido, recurso inexistente) y pasa a 'dead' de inmediato
+    RETRYABLE_CLIENT_ERRORS = {
+        int(code) for code in os.getenv('BACKEND_OUTBOX_RETRYABLE_CLIENT_ERRORS', '408,429').split(',') if code.strip()
+    }
+
+    # Backoff exponencial entre reintentos (segundos)
+    RETRY_BASE = float(os.getenv('BACKEND_OUTBOX_RETRY_BASE', '2'))
+    RETRY_MAX = float(os.getenv('BACKEND_OUTBOX_RETRY_MAX', '300'))
+
+    # Segundos entre revisiones del outbox cuando no hay trabajo
+    POLL_INTERVAL = float(os.getenv('BACKEND_OUTBOX_POLL_INTERVAL', '1'))
+
+    # Registros que el hilo reclama en cada vuelta
+    BATCH_SIZE = int(os.getenv('BACKEND_OUTBOX_BATCH_SIZE', '50'))
+
+    # Segundos que un registro reclamado queda reservado para un proceso
+    CLAIM_LEASE = float(os.getenv('BACKEND_OUTBOX_CLAIM_LEASE', '120'))
+
+
+# Operaciones que el outbox sabe reenviar: nombre -> función(payload, idempotency_key)
+OUTBOX_OPERATIONS: Dict[str, Callable[[Dict[str, Any], str], Tuple[bool, str]]] = {
+    "log_bot_query": lambda payload, key: backend_client.log_bot_query(**payload, idempotency_key=key),
+    "close_assistance": lambda payload, key: backend_client.close_assistance(**payload, idempotency_key=key),
+    "request_advisor": lambda payload, key: backend_client.request_advisor(**payload, idempotency_key=key),
+}
+
+
+class BackendOutbox:
+    """Cola durable de escrituras al backend con reenvío en segundo plano"""
+
+    _SCHEMA = """
+        CREATE TABLE IF NOT EXISTS outbox (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            idempotency_key TEXT NOT NULL UNIQUE,
+            operation TEXT NOT NULL,
+            payload TEXT NOT NULL,
+            ordering_key TEXT,
+            status TEXT NOT NULL DEFAULT 'pending',
+            attempts INTEGER NOT NULL DEFAULT 0,
+            next_attempt_at REAL NOT NULL,
+            created_at REAL NOT NULL,
+            last_error TEXT
+        )
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+        self._pid = None
+        self._sender: Optional[threading.Thread] = None
+        self._wakeup = threading.Event()
+
+    def _connection(self) -> sqlite3.Connection:
+        """Conexión del proceso actual (se reabre tras un fork). Llamar con _lock tomado"""
+        pid = os.getpid()
+        if self._conn is None or self._pid != pid:
+            ensure_parent_dir(self.path)
+            conn = sqlite3.connect(self.path, timeout=10, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(self._SCHEMA)
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_outbox_pending ON outbox (status, next_attempt_at)"
+            )
+            self._conn = conn
+            self._pid = pid
+            self._sender = None
+        return self._conn
+
+    def submit(self, operation: str, payload: Dict[str, Any],
+               ordering_key: Optional[str] = None) -> Tuple[bool, str]:
+        """
+        Registra una escritura en el outbox o, si está deshabilitado, la envía directamente
+
+        Returns:
+            Tuple[bool, str]: (éxito, mensaje) con el mismo contrato que backend_client
+        """
+        if OutboxConfig.ENABLED:
+            try:
+                self.enqueue(operation, payload, ordering_key)
+                return True, "Registrado para envío al backend"
+            except (sqlite3.Error, OSError) as e:
+                logger.error(f"No se pudo registrar {operation} en el outbox, enviando directamente: {e}")
+
+        return OUTBOX_OPERATIONS[operation](payload, None)
+
+    def enqueue(self, operation: str, payload: Dict[str, Any],
+                ordering_key: Optional[str] = None) -> str:
+        """
+        Registra una escritura para su envío al backend
+
+        Args:
+            operation: Nombre de la operación (ver OUTBOX_OPERATIONS)
+            payload: Argumentos de la operación
+            ordering_key: Las escrituras con la misma clave se entregan en orden
+
+        Returns:
+            str: Clave de idempotencia asignada
+        """
+        return self.enqueue_many([(operation, payload, ordering_key)])[0]
+
+    def enqueue_many(self, records: Iterable[Tuple[str, Dict[str, Any], Optional[str]]]) -> List[str]:
+        """Registra varias escrituras en una sola transacción"""
+        now = time.time()
+        rows = []
+        for operation, payload, ordering_key in records:
+            if operation not in OUTBOX_OPERATIONS:
+                raise ValueError(f"Operación de outbox desconocida: {operation}")
+            key = str(uuid.uuid4())
+            rows.append((key, operation, json.dumps(payload, ensure_ascii=False), ordering_key, now, now))
+
+        with self._lock:
+            conn = self._connection()
+            conn.execute("BEGIN")
+            try:
+                conn.executemany(
+                    "INSERT INTO outbox (idempotency_key, operation, payload, ordering_key, next_attempt_at, created_at) "
+                    "VALUES (?, ?, ?, ?, ?, ?)",
+                    rows
+                )
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+
+        metrics.increment("backend_outbox.enqueued", len(rows))
+        self.start()
+        self._wakeup.set()
+        return [row[0] for row in rows]
+
+    def resume(self) -> bool:
+        """
+        Abre el outbox al arrancar el action server y reanuda las entregas pendientes
+
+        Returns:
+            bool: False si el outbox está deshabilitado o no se pudo abrir
+                  (las escrituras se enviarán directamente al backend)
+        """
+        if not OutboxConfig.ENABLED:
+            logger.warning("Outbox del backend deshabilitado: las escrituras se envían directamente al backend")
+            return False
+
+        try:
+            self.start()
+            logger.info(f"Outbox del backend en {self.path}: {self.pending_count()} escrituras pendientes")
+            return True
+        except (sqlite3.Error, OSError) as e:
+            logger.warning(
+                f"Outbox del backend no disponible en {self.path}, "
+                f"las escrituras se enviarán directamente al backend: {e}"
+            )
+            return False
+
+    def start(self):
+        """Inicia el hilo de reenvío si no existe en este proceso"""
+        with self._lock:
+            self._connection()
+            if self._sender is None or not self._sender.is_alive():
+                self._sender = threading.Thread(target=self._run, name="backend-outbox", daemon=True)
+                self._sender.start()
+
+    def _run(self):
+        """Bucle del hilo: reclama registros vencidos y los entrega"""
+        while True:
+            claimed = []
+            try:
+                claimed = self._claim_batch()
+                for row in claimed:
+                    self._deliver(*row)
+            except sqlite3.Error as e:
+                logger.error(f"Error procesando outbox del backend: {e}")
+
+            if len(claimed) < OutboxConfig.BATCH_SIZE:
+                self._wakeup.wait(OutboxConfig.POLL_INTERVAL)
+                self._wakeup.clear()
+
+    def _claim_batch(self) -> List[Tuple[int, str, str, str, int, float]]:
+        """Reserva registros listos para envío, respetando el orden por ordering_key"""
+        now = time.time()
+
+        with self._lock:
+            conn = self._connection()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                rows = conn.execute(
+                    """
+                    SELECT id, idempotency_key, operation, payload, attempts, created_at FROM outbox o
+                    WHERE status = 'pending' AND next_attempt_at <= ?
+                      AND (ordering_key IS NULL OR id = (
+                          SELECT MIN(id) FROM outbox p
+                          WHERE p.ordering_key = o.ordering_key AND p.status = 'pending'))
+                    ORDER BY id
+                    LIMIT ?
+                    """,
+                    (now, OutboxConfig.BATCH_SIZE)
+                ).fetchall()
+
+                conn.executemany(
+                    "UPDATE outbox SET next_attempt_at = ? WHERE id = ?",
+                    [(now + OutboxConfig.CLAIM_LEASE, row[0]) for row in rows]
+                )
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+
+        return rows
+
+    @staticmethod
+    def _is_permanent_failure(status_code: Optional[int]) -> bool:
+        """True si el backend rechazó la escritura de forma definitiva (4xx no reintentable)"""
+        return (status_code is not None and 400 <= status_code < 500
+                and status_code not in OutboxConfig.RETRYABLE_CLIENT_ERRORS)
+
+    def _deliver(self, row_id: int, key: str, operation: str, payload: str, attempts: int, created_at: float):
+        """Entrega un registro y actualiza su estado según el resultado"""
+        status_code = None
+        try:
+            result = OUTBOX_OPERATIONS[operation](json.loads(payload), key)
+            success, message = result
+            status_code = getattr(result, "status_code", None)
+        except Exception as e:
+            success, message = False, str(e)
+
+        with self._lock:
+            conn = self._connection()
+            if success:
+                conn.execute("DELETE FROM outbox WHERE id = ?", (row_id,))
+                metrics.increment("backend_outbox.delivered")
+                return
+
+            attempts += 1
+            permanent = self._is_permanent_failure(status_code)
+            if permanent or time.time() - created_at >= OutboxConfig.MAX_AGE_SECONDS:
+                conn.execute(
+                    "UPDATE outbox SET status = 'dead', attempts = ?, last_error = ? WHERE id = ?",
+                    (attempts, message, row_id)
+                )
+                metrics.increment("backend_outbox.dead")
+                reason = f"rechazo definitivo ({status_code})" if permanent else "antigüedad máxima superada"
+                logger.error(f"Outbox: {operation} descartado tras {attempts} intentos, {reason}: {message}")
+                return
+
+            delay = min(OutboxConfig.RETRY_MAX, OutboxConfig.RETRY_BASE * (2 ** (attempts - 1)))
+            delay = random.uniform(delay / 2, delay)
+            conn.execute(
+                "UPDATE outbox SET attempts = ?, next_attempt_at = ?, last_error = ? WHERE id = ?",
+                (attempts, time.time() + delay, message, row_id)
+            )
+            metrics.increment("backend_outbox.retried")
+            logger.warning(f"Outbox: {operation} falló (intento {attempts}), reintento en {delay:.1f}s: {message}")
+
+    def pending_count(self) -> int:
+        """Cantidad de escrituras pendientes de entrega"""
+        with self._lock:
+            row = self._connection().execute(
+                "SELECT COUNT(*) FROM outbox WHERE status = 'pending'"
+            ).fetchone()
+        return row[0]
+
+
+# Instancia global del outbox
+backend_outbox = BackendOutbox(OutboxConfig.PATH)
+
@@ -0,0 +1,139 @@
+"""
+Bulkheads: límites de concurrencia por servicio externo y familia de endpoints
+
+Cada servicio (SAT, backend) tiene su propio cupo de peticiones en curso y,
+dentro de él, cada familia de endpoints tiene otro. Si un servicio o una
+familia se degrada, sus peticiones lentas solo ocupan su propio cupo y las
+demás siguen teniendo conexiones y tiempo disponibles.
+"""
+import asyncio
+import threading
+import time
+import logging
+from typing import Dict, Optional
+from actions.utils.metrics import metrics
+from .sat_config import SATConfig
+from .backend_config import BackendConfig
+
+logger = logging.getLogger(__name__)
+
+
+class Bulkhead:
+    """
+    Semáforo de peticiones en curso, usable desde hilos y desde el event loop
+
+    Si tiene un bulkhead padre (el del servicio), ocupar un cupo de la
+    familia también ocupa uno del servicio.
+    """
+
+    def __init__(self, name: str, limit: int, parent: Optional["Bulkhead"] = None):
+        self.name = name
+        self.limit = limit
+        self.parent = parent
+        self._in_use = 0
+        self._condition = threading.Condition()
+
+    @property
+    def in_use(self) -> int:
+        """Peticiones en curso"""
+        return self._in_use
+
+    def _try_acquire(self) -> bool:
+        """Ocupa un cupo (y uno del padre) sin esperar"""
+        with self._condition:
+            if self._in_use >= self.limit:
+                return False
+            if self.parent is not None and not self.parent._try_acquire():
+                return False
+            self._in_use += 1
+            metrics.set_gauge(f"bulkhead.{self.name}.in_use", self._in_use)
+            return True
+
+    def release(self):
+        """Libera el cupo ocupado (y el del padre)"""
+        with self._condition:
+            self._in_use -= 1
+            metrics.set_gauge(f"bulkhead.{self.name}.in_use", self._in_use)
+            self._condition.notify()
+        if self.parent is not None:
+            self.parent.release()
+
+    def _reject(self, waited_ms: float) -> bool:
+        """Registra el rechazo de una petición por falta de cupo"""
+        metrics.increment(f"bulkhead.{self.name}.rejected")
+        logger.warning(f"Bulkhead {self.name} sin cupo, petición rechazada tras {waited_ms:.0f} ms")
+        return False
+
+    def acquire(self, timeout: float) -> bool:
+        """
+        Ocupa un cupo esperando como máximo timeout segundos (bloquea el hilo)
+
+        Returns:
+            bool: True si se obtuvo el cupo; quien lo obtiene debe llamar a release()
+        """
+        started = time.monotonic()
+        wait_until = started + timeout
+        while not self._try_acquire():
+            remaining = wait_until - time.monotonic()
+            if remaining <= 0:
+                return self._reject((time.monotonic() - started) * 1000)
+            with self._condition:
+                # Se despierta al liberarse un cupo propio; el del padre se revisa cada 50 ms
+                self._condition.wait(min(remaining, 0.05))
+
+        metrics.observe(f"bulkhead.{self.name}.wait_ms", (time.monotonic() - started) * 1000)
+        return True
+
+    async def acquire_async(self, timeout: float) -> bool:
+        """Ocupa un cupo sin bloquear el event loop (mismos argumentos que acquire)"""
+        started = time.monotonic()
+        wait_until = started + timeout
+        while not self._try_acquire():
+            remaining = wait_until - time.monotonic()
+            if remaining <= 0:
+                return self._reject((time.monotonic() - started) * 1000)
+            await asyncio.sleep(min(remaining, 0.01))
+
+        metrics.observe(f"bulkhead.{self.name}.wait_ms", (time.monotonic() - started) * 1000)
+        return True
+
+
+class BulkheadRegistry:
+    """Bulkhead de un servicio y de cada una de sus familias, creados bajo demanda"""
+
+    def __init__(self, name: str, limit: int, family_limits: Dict[str, float], default_family_limit: int):
+        self.upstream = Bulkhead(name, limit)
+        self.family_limits = family_limits
+        self.default_family_limit = default_family_limit
+        self._bulkheads: Dict[str, Bulkhead] = {}
+        self._lock = threading.Lock()
+
+    def get(self, family: str) -> Bulkhead:
+        """Bulkhead de la familia (ocupa también el cupo del servicio)"""
+        bulkhead = self._bulkheads.get(family)
+        if bulkhead is None:
+            with self._lock:
+                bulkhead = self._bulkheads.get(family)
+                if bulkhead is None:
+                    limit = int(self.family_limits.get(family, self.default_family_limit))
+                    bulkhead = self._bulkheads[family] = Bulkhead(
+                        f"{self.upstream.name}.{family}", limit, parent=self.upstream
+                    )
+        return bulkhead
+
+
+# Instancia global de bulkheads de la API del SAT
+sat_bulkheads = BulkheadRegistry(
+    "sat",
+    limit=SATConfig.BULKHEAD_LIMIT,
+    family_limits=SATConfig.BULKHEAD_FAMILY_LIMITS,
+    default_family_limit=SATConfig.BULKHEAD_DEFAULT_FAMILY_LIMIT
+)
+
+# Instancia global de bulkheads del backend
+backend_bulkheads = BulkheadRegistry(
+    "backend",
+    limit=BackendConfig.BULKHEAD_LIMIT,
+    family_limits=BackendConfig.BULKHEAD_FAMILY_LIMITS,
+    default_family_limit=BackendConfig.BULKHEAD_DEFAULT_FAMILY_LIMIT
+)
@@ -0,0 +1,154 @@
+"""
+Circuit breaker para llamadas a APIs externas
+
+Tras una tasa alta de errores o timeouts el breaker se abre y las llamadas
+se rechazan de inmediato; pasado un tiempo deja pasar unas pocas peticiones
+de prueba (half-open) y vuelve a cerrarse si tienen éxito.
+"""
+import threading
+import time
+import logging
+from collections import deque
+from typing import Dict, Optional
+from actions.utils.metrics import metrics
+from .sat_config import SATConfig
+from .rate_limiter import current_priority, PRIORITY_BACKGROUND
+
+logger = logging.getLogger(__name__)
+
+
+class CircuitBreaker:
+    """Breaker de ventana deslizante por cantidad de llamadas"""
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, name: str, window: int, min_calls: int, failure_rate: float,
+                 open_seconds: float, half_open_probes: int):
+        self.name = name
+        self.min_calls = min_calls
+        self.failure_rate = failure_rate
+        self.open_seconds = open_seconds
+        self.half_open_probes = half_open_probes
+        self.state = self.CLOSED
+        self._outcomes = deque(maxlen=window)
+        self._opened_at = 0.0
+        self._probes_in_flight = 0
+        self._probe_successes = 0
+        self._lock = threading.Lock()
+
+    def allow_request(self) -> bool:
+        """True si la llamada puede hacerse; False si debe cortarse de inmediato"""
+        with self._lock:
+            if self.state == self.OPEN:
+                if time.monotonic() - self._opened_at < self.open_seconds:
+                    metrics.increment(f"circuit.{self.name}.rejected")
+                    return False
+                self._transition(self.HALF_OPEN)
+
+            if self.state == self.HALF_OPEN:
+                if self._probes_in_flight >= self.half_open_probes:
+                    metrics.increment(f"circuit.{self.name}.rejected")
+                    return False
+                self._probes_in_flight += 1
+
+            return True
+
+    def record(self, success: Optional[bool]):
+        """
+        Registra el resultado de una llamada permitida
+
+        Args:
+            success: True si el servicio respondió sano, False ante error o
+                timeout, None si la llamada no llegó a evaluar al servicio
+        """
+        with self._lock:
+            if self.state == self.HALF_OPEN:
+                self._probes_in_flight = max(0, self._probes_in_flight - 1)
+                if success is False:
+                    self._transition(self.OPEN)
+                elif success:
+                    self._probe_successes += 1
+                    if self._probe_successes >= self.half_open_probes:
+                        self._transition(self.CLOSED)
+                return
+
+            if success is None or self.state != self.CLOSED:
+                return
+
+            self._outcomes.append(success)
+            failures = self._outcomes.count(False)
+            if len(self._outcomes) >= self.min_calls and failures / len(self._outcomes) >= self.failure_rate:
+                self._transition(self.OPEN)
+
+    def _transition(self, state: str):
+        """Cambia de estado (llamar con _lock tomado)"""
+        previous, self.state = self.state, state
+        if state == self.OPEN:
+            self._opened_at = time.monotonic()
+        elif state == self.HALF_OPEN:
+            self._probes_in_flight = 0
+            self._probe_successes = 0
+        elif state == self.CLOSED:
+            self._outcomes.clear()
+
+        metrics.set_gauge(f"circuit.{self.name}.open", 1 if state == self.OPEN else 0)
+        log = logger.warning if state == self.OPEN else logger.info
+        log(f"Circuit breaker {self.name}: {previous} -> {state}")
+
+
+class CircuitBreakerRegistry:
+    """Breakers creados bajo demanda, uno por nombre"""
+
+    def __init__(self, prefix: str = "", **breaker_kwargs):
+        self.prefix = prefix
+        self._breaker_kwargs = breaker_kwargs
+        self._breakers: Dict[str, CircuitBreaker] = {}
+        self._lock = threading.Lock()
+
+    def get(self, name: str) -> CircuitBreaker:
+        """Breaker asociado a name (se crea la primera vez)"""
+        breaker = self._breakers.get(name)
+        if breaker is None:
+            with self._lock:
+                breaker = self._breakers.get(name)
+                if breaker is None:
+                    breaker = self._breakers[name] = CircuitBreaker(f"{self.prefix}{name}", **self._breaker_kwargs)
+        return breaker
+
+
+# Instancia global de breakers por familia de endpoints del SAT
+sat_circuit_breakers = CircuitBreakerRegistry(
+    window=SATConfig.BREAKER_WINDOW,
+    min_calls=SATConfig.BREAKER_MIN_CALLS,
+    failure_rate=SATConfig.BREAKER_FAILURE_RATE,
+    open_seconds=SATConfig.BREAKER_OPEN_SECONDS,
+    half_open_probes=SATConfig.BREAKER_HALF_OPEN_PROBES
+)
+
+# Instancia global de breakers del trabajo en segundo plano (barridos de catálogos, prefetch)
+sat_background_breakers = CircuitBreakerRegistry(
+    prefix="background.",
+    window=SATConfig.BREAKER_WINDOW,
+    min_calls=SATConfig.BREAKER_MIN_CALLS,
+    failure_rate=SATConfig.BREAKER_FAILURE_RATE,
+    open_seconds=SATConfig.BREAKER_OPEN_SECONDS,
+    half_open_probes=SATConfig.BREAKER_HALF_OPEN_PROBES
+)
+
+
+def sat_breaker_for(family: str) -> Optional[CircuitBreaker]:
+    """
+    Breaker que evalúa las peticiones del contexto actual a una familia del SAT
+
+    El trabajo en segundo plano usa breakers propios para que sus fallas no
+    abran el breaker de las consultas del usuario. Mientras ese breaker no
+    esté cerrado el trabajo en segundo plano no se hace (None), así tampoco
+    ocupa las pruebas half-open.
+    """
+    if current_priority() != PRIORITY_BACKGROUND:
+        return sat_circuit_breakers.get(family)
+    if sat_circuit_breakers.get(family).state != CircuitBreaker.CLOSED:
+        return None
+    return sat_background_breakers.get(family)
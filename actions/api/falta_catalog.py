@@ -0,0 +1,160 @@
+"""
+Catálogo en memoria de códigos de falta (infracciones de tránsito)
+
+El catálogo del SAT es casi estático: los códigos consultados quedan en
+memoria, se refrescan periódicamente en segundo plano y las consultas se
+responden desde el índice. Solo un código que aún no está en el índice va
+a la red. Si el SAT cae, los códigos ya cargados se siguen sirviendo.
+
+El SAT no expone un endpoint con el catálogo completo, así que el refresco
+recorre los códigos ya conocidos más las semillas configuradas (una lista
+fija y, si se activa la precarga, el barrido de prefijos × números), con
+prioridad de segundo plano en el límite de tasa y en el circuit breaker.
+"""
+import copy
+import os
+import threading
+import time
+import logging
+from typing import Any, Callable, Dict, Iterable, List, Optional
+from actions.utils.metrics import metrics
+from actions.utils.validators import validator
+from .rate_limiter import background_priority
+from .sat_config import SATConfig
+
+logger = logging.getLogger(__name__)
+
+
+def seed_codes(prefixes: Iterable[str], max_number: int) -> List[str]:
+    """Códigos semilla con el formato del SAT (p. ej. G01 ... G99)"""
+    return [f"{prefix}{number:02d}" for prefix in prefixes for number in range(1, max_number + 1)]
+
+
+class FaltaCatalog:
+    """Índice código -> respuesta del SAT, con refresco en un hilo de fondo"""
+
+    def __init__(self, seeds: List[str], refresh_seconds: float, retry_seconds: float):
+        self.seeds = seeds
+        self.refresh_seconds = refresh_seconds
+        self.retry_seconds = retry_seconds
+        # Se reemplaza entero al refrescar; las lecturas no necesitan lock
+        self._index: Dict[str, Any] = {}
+        self._lock = threading.Lock()
+        self._fetch: Optional[Callable[[str], Optional[Any]]] = None
+        self._worker: Optional[threading.Thread] = None
+        self._pid = None
+        self.loaded_at: Optional[float] = None
+
+    @staticmethod
+    def normalize(codigo: str) -> str:
+        """Código normalizado con DataValidator (g 40 -> G40, G5 -> G05)"""
+        _, codigo_limpio = validator.validate_codigo_falta(codigo)
+        if len(codigo_limpio) == 2 and codigo_limpio[0].isalpha() and codigo_limpio[1].isdigit():
+            codigo_limpio = f"{codigo_limpio[0]}0{codigo_limpio[1]}"
+        return codigo_limpio
+
+    def get(self, codigo: str) -> Optional[Any]:
+        """Copia de la respuesta guardada para el código o None si no está en el índice"""
+        entry = self._index.get(self.normalize(codigo))
+        if entry is None:
+            metrics.increment("falta_catalog.misses")
+            return None
+        metrics.increment("falta_catalog.hits")
+        return copy.deepcopy(entry)
+
+    def put(self, codigo: str, result: Optional[Any]):
+        """Agrega al índice la respuesta obtenida de la red (las vacías se ignoran)"""
+        if not result:
+            return
+        key = self.normalize(codigo)
+        if not key:
+            return
+        with self._lock:
+            index = dict(self._index)
+            index[key] = copy.deepcopy(result)
+            self._index = index
+        metrics.set_gauge("falta_catalog.entries", len(self._index))
+
+    def __contains__(self, codigo: str) -> bool:
+        return self.normalize(codigo) in self._index
+
+    def __len__(self) -> int:
+        return len(self._index)
+
+    def start(self, fetch: Callable[[str], Optional[Any]]):
+        """
+        Inicia el refresco periódico en segundo plano (y la precarga de las semillas)
+
+        Args:
+            fetch: Consulta de red de un código (sin pasar por el catálogo)
+        """
+        self._fetch = fetch
+        pid = os.getpid()
+        if self._worker is not None and self._pid == pid and self._worker.is_alive():
+            return
+
+        with self._lock:
+            if self._worker is None or self._pid != pid or not self._worker.is_alive():
+                self._worker = threading.Thread(
+                    target=self._run,
+                    name="falta-catalog-refresher",
+                    daemon=True
+                )
+                self._pid = pid
+                self._worker.start()
+
+    def _run(self):
+        """Bucle del hilo: recarga el catálogo y espera al próximo refresco"""
+        while True:
+            if not self.seeds and not self._index:
+                # Nada que refrescar aún: los códigos consultados se suman al índice
+                time.sleep(self.refresh_seconds)
+                continue
+            try:
+                loaded = self.refresh()
+            except Exception as e:
+                logger.error(f"Error refrescando el catálogo de faltas: {e}")
+                loaded = 0
+            # Si el SAT no respondió nada, reintentar antes del refresco normal
+            time.sleep(self.refresh_seconds if loaded else self.retry_seconds)
+
+    def refresh(self) -> int:
+        """
+        Consulta los códigos semilla y los ya conocidos y publica el nuevo índice
+
+        Los códigos que fallan conservan su respuesta anterior.
+
+        Returns:
+            int: Códigos obtenidos del SAT en esta pasada
+        """
+        started = time.monotonic()
+        codes = list(dict.fromkeys(self.seeds + sorted(self._index)))
+        fresh: Dict[str, Any] = {}
+
+        with background_priority():
+            for codigo in codes:
+                result = self._fetch(codigo)
+                if result:
+                    fresh[codigo] = result
+
+        with self._lock:
+            index = dict(self._index)
+            index.update(fresh)
+            self._index = index
+        self.loaded_at = time.time()
+
+        metrics.set_gauge("falta_catalog.entries", len(self._index))
+        metrics.observe("falta_catalog.refresh_ms", (time.monotonic() - started) * 1000)
+        logger.info(f"Catálogo de faltas refrescado: {len(fresh)}/{len(codes)} códigos, {len(self._index)} en el índice")
+        return len(fresh)
+
+
+# Instancia global del catálogo de faltas
+falta_catalog = FaltaCatalog(
+    seeds=SATConfig.FALTA_CATALOG_SEEDS + (
+        seed_codes(SATConfig.FALTA_CATALOG_PREFIXES, SATConfig.FALTA_CATALOG_MAX_NUMBER)
+        if SATConfig.FALTA_CATALOG_PRELOAD else []
+    ),
+    refresh_seconds=SATConfig.FALTA_CATALOG_REFRESH_SECONDS,
+    retry_seconds=SATConfig.FALTA_CATALOG_RETRY_SECONDS
+)
@@ -0,0 +1,103 @@
+"""
+Caché stale-while-revalidate de los mensajes de despedida del backend
+
+Los mensajes de despedida cambian muy de vez en cuando: se guardan por
+categoría de canal y el cierre de chat los lee siempre de memoria. Si la
+copia pasó de FRESH_SECONDS se sigue sirviendo mientras un hilo de fondo la
+revalida; si pasó de MAX_STALE_SECONDS (o aún no se cargó) ya no se usa y el
+action responde con el mensaje por defecto hasta que llegue la nueva.
+"""
+import threading
+import time
+import logging
+from typing import Callable, Dict, List, Optional, Tuple
+from actions.utils.metrics import metrics
+from .backend_config import BackendConfig
+
+logger = logging.getLogger(__name__)
+
+
+class FarewellMessagesCache:
+    """Mensajes de despedida por categoría, revalidados en segundo plano"""
+
+    def __init__(self, fresh_seconds: float, max_stale_seconds: float):
+        self.fresh_seconds = fresh_seconds
+        self.max_stale_seconds = max(max_stale_seconds, fresh_seconds)
+        # categoría -> (mensajes, obtenidos_en)
+        self._entries: Dict[int, Tuple[List[str], float]] = {}
+        self._revalidating = set()
+        self._lock = threading.Lock()
+        self._fetch: Optional[Callable[[int], Optional[List[str]]]] = None
+
+    def start(self, fetch: Callable[[int], Optional[List[str]]], category_id: int = None):
+        """
+        Configura la consulta al backend y precarga la categoría en segundo plano
+
+        Args:
+            fetch: Consulta de red de los mensajes de una categoría
+            category_id: Categoría a precargar (por defecto la del canal)
+        """
+        self._fetch = fetch
+        self._revalidate(BackendConfig.CHANNEL_CATEGORY_ID if category_id is None else category_id)
+
+    def get(self, category_id: int = None) -> Optional[List[str]]:
+        """
+        Mensajes guardados de la categoría, sin llamadas a la red
+
+        Returns:
+            Lista de mensajes o None si no hay copia o es más vieja que MAX_STALE_SECONDS
+        """
+        if category_id is None:
+            category_id = BackendConfig.CHANNEL_CATEGORY_ID
+
+        entry = self._entries.get(category_id)
+        age = None if entry is None else time.monotonic() - entry[1]
+
+        if age is None or age > self.fresh_seconds:
+            self._revalidate(category_id)
+
+        if age is None or age > self.max_stale_seconds:
+            metrics.increment("farewell_cache.misses")
+            return None
+
+        metrics.increment("farewell_cache.hits" if age <= self.fresh_seconds else "farewell_cache.stale_hits")
+        return list(entry[0])
+
+    def _revalidate(self, category_id: int):
+        """Lanza una recarga de la categoría en un hilo de fondo (una a la vez por categoría)"""
+        if self._fetch is None:
+            return
+        with self._lock:
+            if category_id in self._revalidating:
+                return
+            self._revalidating.add(category_id)
+
+        threading.Thread(
+            target=self._reload,
+            args=(category_id,),
+            name=f"farewell-revalidate-{category_id}",
+            daemon=True
+        ).start()
+
+    def _reload(self, category_id: int):
+        """Consulta el backend y reemplaza la copia; si falla se conserva la anterior"""
+        try:
+            messages = self._fetch(category_id)
+            if messages:
+                self._entries[category_id] = (list(messages), time.monotonic())
+                metrics.increment("farewell_cache.revalidated")
+            else:
+                metrics.increment("farewell_cache.revalidate_errors")
+        except Exception as e:
+            metrics.increment("farewell_cache.revalidate_errors")
+            logger.error(f"Error revalidando mensajes de despedida (categoryId {category_id}): {e}")
+        finally:
+            with self._lock:
+                self._revalidating.discard(category_id)
+
+
+# Instancia global de la caché de mensajes de despedida
+farewell_cache = FarewellMessagesCache(
+    fresh_seconds=BackendConfig.FAREWELL_CACHE_FRESH_SECONDS,
+    max_stale_seconds=BackendConfig.FAREWELL_CACHE_MAX_STALE_SECONDS
+)
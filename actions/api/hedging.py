@@ -0,0 +1,99 @@
+"""
+Peticiones con cobertura (hedging) para recortar la latencia de cola
+
+Si la petición original no respondió tras un retardo adaptativo (p. ej. el
+p95 observado), se lanza un duplicado idéntico, se usa la primera respuesta
+y se cancela la otra. Un presupuesto limita los duplicados.
+"""
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, Optional
+from actions.utils.metrics import metrics
+from .retry_policy import RequestBudget
+from .rate_limiter import TokenBucket, PRIORITY_BACKGROUND
+from .sat_config import SATConfig
+
+logger = logging.getLogger(__name__)
+
+
+def adaptive_hedge_delay(latency_metric: str, percentile: float, min_samples: int,
+                         default_delay: float, min_delay: float) -> float:
+    """
+    Segundos a esperar antes de lanzar el duplicado
+
+    Args:
+        latency_metric: Nombre de la latencia registrada en metrics (ms)
+        percentile: Percentil de la latencia observada a usar como retardo
+        min_samples: Observaciones necesarias para confiar en el percentil
+        default_delay: Retardo mientras no hay suficientes observaciones
+        min_delay: Retardo mínimo
+    """
+    if metrics.sample_count(latency_metric) < min_samples:
+        return default_delay
+
+    observed_ms = metrics.percentile(latency_metric, percentile)
+    return max(min_delay, observed_ms / 1000)
+
+
+async def hedged_call(make_call: Callable[[], Awaitable[Any]], delay: float, budget: RequestBudget,
+                      name: str, is_acceptable: Optional[Callable[[Any], bool]] = None,
+                      rate_limiter: Optional[TokenBucket] = None) -> Any:
+    """
+    Ejecuta make_call() y, si tarda más de delay, lanza un duplicado
+
+    Args:
+        make_call: Función que crea la corrutina de la petición (se llama una o dos veces)
+        delay: Segundos antes de lanzar el duplicado
+        budget: Presupuesto de duplicados
+        name: Prefijo de las métricas
+        is_acceptable: Si la primera respuesta no es aceptable (p. ej. un 503 rápido)
+            se espera la otra en lugar de usarla
+        rate_limiter: Límite de tasa del que el duplicado toma una ficha (sin esperar y
+            con prioridad de segundo plano); si no hay ficha no se duplica
+
+    Returns:
+        El resultado de la petición que respondió primero
+    """
+    budget.record_request()
+    primary = asyncio.ensure_future(make_call())
+    tasks = {primary}
+
+    try:
+        done, _ = await asyncio.wait(tasks, timeout=delay)
+        if done or not budget.try_spend():
+            return await primary
+        if rate_limiter is not None and not await rate_limiter.acquire_async(0, priority=PRIORITY_BACKGROUND):
+            return await primary
+
+        metrics.increment(f"{name}.hedged")
+        logger.info(f"Petición lenta tras {delay:.2f}s, lanzando duplicado ({name})")
+        hedge = asyncio.ensure_future(make_call())
+        tasks.add(hedge)
+
+        while True:
+            done, pending = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+            winner = done.pop()
+            tasks.discard(winner)
+
+            failed = winner.exception() is not None or (is_acceptable and not is_acceptable(winner.result()))
+            if failed and tasks:
+                continue
+
+            if winner is hedge:
+                metrics.increment(f"{name}.hedge_won")
+            return winner.result()
+
+    finally:
+        # Cancelar la petición perdedora (o ambas si el llamador fue cancelado)
+        for task in tasks:
+            if not task.done():
+                task.cancel()
+
+
+# Instancia global del presupuesto de duplicados para la API del SAT
+sat_hedge_budget = RequestBudget(
+    "sat_hedge",
+    ratio=SATConfig.HEDGE_BUDGET_RATIO,
+    min_per_second=0,
+    max_tokens=SATConfig.HEDGE_BUDGET_MAX_TOKENS
+)
@@ -0,0 +1,315 @@
+"""
+Transporte HTTP compartido con pool de conexiones keep-alive
+"""
+import os
+import json
+import asyncio
+import threading
+import time
+import logging
+import aiohttp
+import requests
+from requests.adapters import HTTPAdapter
+from typing import Optional, Tuple, Union
+from dotenv import load_dotenv
+from actions.utils.deadline import Deadline, cap_timeout
+from actions.utils.metrics import metrics
+from .retry_policy import RetryPolicy
+from .rate_limiter import TokenBucket, PRIORITY_BACKGROUND
+
+# Cargar variables de entorno
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+
+class TransportConfig:
+    """Configuración del pool de conexiones HTTP"""
+
+    # Cantidad de pools por host que se mantienen en caché
+    POOL_CONNECTIONS = int(os.getenv('HTTP_POOL_CONNECTIONS', '10'))
+
+    # Máximo de conexiones reutilizables por host
+    POOL_MAXSIZE = int(os.getenv('HTTP_POOL_MAXSIZE', '20'))
+
+    # Si es True, las peticiones esperan una conexión libre en lugar de abrir una nueva
+    POOL_BLOCK = os.getenv('HTTP_POOL_BLOCK', 'false').lower() == 'true'
+
+    # Mantener conexiones abiertas entre peticiones (evita handshake TCP+TLS)
+    KEEP_ALIVE = os.getenv('HTTP_KEEP_ALIVE', 'true').lower() == 'true'
+
+    # Segundos que una conexión ociosa permanece abierta (cliente asíncrono)
+    KEEP_ALIVE_TIMEOUT = float(os.getenv('HTTP_KEEP_ALIVE_TIMEOUT', '30'))
+
+    # Máximo total de conexiones simultáneas del cliente asíncrono
+    ASYNC_POOL_LIMIT = int(os.getenv('HTTP_ASYNC_POOL_LIMIT', '100'))
+
+
+def retry_allowed(delay: Optional[float], deadline: Optional[Deadline],
+                  rate_limiter: Optional[TokenBucket]) -> bool:
+    """
+    True si el reintento cabe en el plazo y obtiene ficha del límite de tasa
+
+    Un reintento es tráfico extra: toma la ficha con prioridad de segundo plano
+    y sin esperar, así nunca pasa delante de las consultas del usuario en cola.
+    """
+    if delay is None or (deadline is not None and delay >= deadline.remaining()):
+        return False
+    return rate_limiter is None or rate_limiter.acquire(0, priority=PRIORITY_BACKGROUND)
+
+
+def observe_attempt(latency_metric: Optional[str], started: float):
+    """Registra la latencia (ms) de un intento HTTP si se pidió una métrica"""
+    if latency_metric is not None:
+        metrics.observe(latency_metric, (time.monotonic() - started) * 1000)
+
+
+class HTTPTransport:
+    """Sesión HTTP compartida por proceso para todos los clientes"""
+
+    def __init__(self):
+        self._session = None
+        self._pid = None
+        self._lock = threading.Lock()
+
+    def get_session(self) -> requests.Session:
+        """Obtiene la sesión del proceso actual, creándola si es necesario"""
+        pid = os.getpid()
+
+        # Tras un fork el pool del proceso padre no se puede reutilizar
+        if self._session is None or self._pid != pid:
+            with self._lock:
+                if self._session is None or self._pid != pid:
+                    self._session = self._build_session()
+                    self._pid = pid
+
+        return self._session
+
+    def _build_session(self) -> requests.Session:
+        """Construye una sesión con el adaptador de pool configurado"""
+        session = requests.Session()
+
+        adapter = HTTPAdapter(
+            pool_connections=TransportConfig.POOL_CONNECTIONS,
+            pool_maxsize=TransportConfig.POOL_MAXSIZE,
+            pool_block=TransportConfig.POOL_BLOCK
+        )
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+
+        if not TransportConfig.KEEP_ALIVE:
+            session.headers["Connection"] = "close"
+
+        logger.info(
+            f"Sesión HTTP creada (pool_connections={TransportConfig.POOL_CONNECTIONS}, "
+            f"pool_maxsize={TransportConfig.POOL_MAXSIZE}, keep_alive={TransportConfig.KEEP_ALIVE})"
+        )
+        return session
+
+    def request(self, method: str, url: str, retry_policy: Optional[RetryPolicy] = None,
+                deadline: Optional[Deadline] = None, rate_limiter: Optional[TokenBucket] = None,
+                latency_metric: Optional[str] = None, **kwargs) -> requests.Response:
+        """
+        Realiza una petición reutilizando las conexiones del pool
+
+        Args:
+            method: Método HTTP (GET, POST, etc.)
+            url: URL completa del endpoint
+            retry_policy: Política de reintentos ante fallas transitorias (None = sin reintentos)
+            deadline: Plazo del action; recorta el timeout y evita reintentos que no caben
+            rate_limiter: Límite de tasa del que cada reintento toma una ficha (None = sin límite)
+            latency_metric: Métrica donde registrar la latencia de cada intento (ms)
+            **kwargs: Argumentos adicionales para requests
+        """
+        timeout = kwargs.pop("timeout", None)
+        if retry_policy is None:
+            return self._send(method, url, timeout, deadline, latency_metric, **kwargs)
+
+        retry_policy.budget.record_request()
+        attempt = 1
+        while True:
+            try:
+                response = self._send(method, url, timeout, deadline, latency_metric, **kwargs)
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
+                delay = retry_policy.next_delay(method, attempt, f"{type(e).__name__} en {url}")
+                if not retry_allowed(delay, deadline, rate_limiter):
+                    raise
+            else:
+                if not retry_policy.is_retryable_status(response.status_code):
+                    return response
+                delay = retry_policy.next_delay(method, attempt, f"HTTP {response.status_code} en {url}")
+                if not retry_allowed(delay, deadline, rate_limiter):
+                    return response
+                response.close()
+
+            time.sleep(delay)
+            attempt += 1
+
+    def _send(self, method: str, url: str, timeout: Union[float, Tuple[float, float], None],
+              deadline: Optional[Deadline], latency_metric: Optional[str], **kwargs) -> requests.Response:
+        """Envía un único intento y registra su latencia"""
+        started = time.monotonic()
+        try:
+            response = self.get_session().request(
+                method=method, url=url, timeout=cap_timeout(timeout, deadline), **kwargs
+            )
+        except requests.exceptions.Timeout:
+            # Un intento agotado cuenta con su duración para que el timeout no se encoja
+            # en una degradación, salvo que lo haya cortado el plazo del action
+            if deadline is None or not deadline.expired():
+                observe_attempt(latency_metric, started)
+            raise
+        observe_attempt(latency_metric, started)
+        return response
+
+    def post(self, url: str, **kwargs) -> requests.Response:
+        """Realiza una petición POST reutilizando las conexiones del pool"""
+        return self.request("POST", url, **kwargs)
+
+    def close(self):
+        """Cierra la sesión y libera las conexiones del pool"""
+        with self._lock:
+            if self._session is not None:
+                self._session.close()
+            self._session = None
+            self._pid = None
+
+
+class AsyncResponse:
+    """Respuesta HTTP ya leída, con la misma interfaz básica que requests.Response"""
+
+    def __init__(self, status_code: int, text: str):
+        self.status_code = status_code
+        self.text = text
+
+    def json(self):
+        """Decodifica el cuerpo de la respuesta como JSON"""
+        return json.loads(self.text)
+
+
+class AsyncHTTPTransport:
+    """Sesión aiohttp compartida por event loop para los clientes asíncronos"""
+
+    def __init__(self):
+        self._session = None
+        self._loop = None
+
+    async def get_session(self) -> aiohttp.ClientSession:
+        """Obtiene la sesión del event loop actual, creándola si es necesario"""
+        loop = asyncio.get_running_loop()
+
+        # Una sesión aiohttp solo puede usarse en el loop donde fue creada
+        if self._session is None or self._session.closed or self._loop is not loop:
+            connector = aiohttp.TCPConnector(
+                limit=TransportConfig.ASYNC_POOL_LIMIT,
+                limit_per_host=TransportConfig.POOL_MAXSIZE,
+                keepalive_timeout=TransportConfig.KEEP_ALIVE_TIMEOUT,
+                force_close=not TransportConfig.KEEP_ALIVE
+            )
+            self._session = aiohttp.ClientSession(connector=connector)
+            self._loop = loop
+
+            logger.info(
+                f"Sesión HTTP asíncrona creada (limit={TransportConfig.ASYNC_POOL_LIMIT}, "
+                f"limit_per_host={TransportConfig.POOL_MAXSIZE}, keep_alive={TransportConfig.KEEP_ALIVE})"
+            )
+
+        return self._session
+
+    async def request(self, method: str, url: str, timeout: Union[float, Tuple[float, float]] = 30,
+                      verify: bool = True, retry_policy: Optional[RetryPolicy] = None,
+                      deadline: Optional[Deadline] = None, rate_limiter: Optional[TokenBucket] = None,
+                      latency_metric: Optional[str] = None, **kwargs) -> AsyncResponse:
+        """
+        Realiza una petición sin bloquear el event loop
+
+        Args:
+            method: Método HTTP (GET, POST, etc.)
+            url: URL completa del endpoint
+            timeout: Timeout total en segundos o tupla (connect, read) como en requests
+            verify: Verificar certificado TLS
+            retry_policy: Política de reintentos ante fallas transitorias (None = sin reintentos)
+            deadline: Plazo del action; recorta el timeout y evita reintentos que no caben
+            rate_limiter: Límite de tasa del que cada reintento toma una ficha (None = sin límite)
+            latency_metric: Métrica donde registrar la latencia de cada intento (ms)
+            **kwargs: Argumentos adicionales para aiohttp (json, headers, etc.)
+
+        Returns:
+            AsyncResponse con el cuerpo ya leído
+        """
+        if not verify:
+            kwargs["ssl"] = False
+
+        if retry_policy is None:
+            return await self._send(method, url, timeout, deadline, latency_metric, **kwargs)
+
+        retry_policy.budget.record_request()
+        attempt = 1
+        while True:
+            try:
+                response = await self._send(method, url, timeout, deadline, latency_metric, **kwargs)
+            except (asyncio.TimeoutError, aiohttp.ClientConnectionError) as e:
+                delay = retry_policy.next_delay(method, attempt, f"{type(e).__name__} en {url}")
+                if not retry_allowed(delay, deadline, rate_limiter):
+                    raise
+            else:
+                if not retry_policy.is_retryable_status(response.status_code):
+                    return response
+                delay = retry_policy.next_delay(method, attempt, f"HTTP {response.status_code} en {url}")
+                if not retry_allowed(delay, deadline, rate_limiter):
+                    return response
+
+            await asyncio.sleep(delay)
+            attempt += 1
+
+    async def _send(self, method: str, url: str, timeout: Union[float, Tuple[float, float]],
+                    deadline: Optional[Deadline], latency_metric: Optional[str], **kwargs) -> AsyncResponse:
+        """Envía un único intento, lee el cuerpo completo y registra su latencia"""
+        session = await self.get_session()
+        timeout = cap_timeout(timeout, deadline)
+
+        if isinstance(timeout, tuple):
+            connect_timeout, read_timeout = timeout
+            client_timeout = aiohttp.ClientTimeout(
+                total=connect_timeout + read_timeout,
+                sock_connect=connect_timeout,
+                sock_read=read_timeout
+            )
+        else:
+            client_timeout = aiohttp.ClientTimeout(total=timeout)
+
+        started = time.monotonic()
+        try:
+            async with session.request(
+                method,
+                url,
+                timeout=client_timeout,
+                **kwargs
+            ) as response:
+                text = await response.text()
+        except asyncio.TimeoutError:
+            # Un intento agotado cuenta con su duración para que el timeout no se encoja
+            # en una degradación, salvo que lo haya cortado el plazo del action
+            if deadline is None or not deadline.expired():
+                observe_attempt(latency_metric, started)
+            raise
+        observe_attempt(latency_metric, started)
+        return AsyncResponse(response.status, text)
+
+    async def post(self, url: str, **kwargs) -> AsyncResponse:
+        """Realiza una petición POST sin bloquear el event loop"""
+        return await self.request("POST", url, **kwargs)
+
+    async def close(self):
+        """Cierra la sesión y libera las conexiones del pool"""
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+        self._loop = None
+
+
+# Instancia global del transporte HTTP
+http_transport = HTTPTransport()
+
+# Instancia global del transporte HTTP asíncrono
+async_http_transport = AsyncHTTPTransport()
@@ -0,0 +1,153 @@
+"""
+Registro en segundo plano de las consultas del bot en el backend
+
+Las consultas se encolan en memoria y un hilo las envía por lotes, de modo
+que la latencia del backend nunca se suma a la respuesta al usuario.
+"""
+import os
+import json
+import queue
+import threading
+import time
+import logging
+from typing import Dict, List, Optional
+from dotenv import load_dotenv
+from actions.utils.metrics import metrics
+from .backend_client import backend_client
+from .backend_outbox import backend_outbox, OutboxConfig
+
+# Cargar variables de entorno
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+
+class QueryLoggerConfig:
+    """Configuración del registro de consultas en segundo plano"""
+
+    # Máximo de registros pendientes en memoria
+    MAX_QUEUE = int(os.getenv('BOT_QUERY_LOG_MAX_QUEUE', '1000'))
+
+    # Registros que se envían como máximo en cada lote
+    BATCH_SIZE = int(os.getenv('BOT_QUERY_LOG_BATCH_SIZE', '20'))
+
+    # Segundos máximos que un registro espera antes de enviarse
+    FLUSH_INTERVAL = float(os.getenv('BOT_QUERY_LOG_FLUSH_INTERVAL', '2'))
+
+    # Archivo JSONL donde se vuelcan los registros si la cola está llena (vacío = descartar)
+    SPILL_PATH = os.getenv('BOT_QUERY_LOG_SPILL_PATH', '')
+
+
+class BotQueryLogger:
+    """Cola acotada con envío por lotes de las consultas del bot"""
+
+    def __init__(self):
+        self._queue = queue.Queue(maxsize=QueryLoggerConfig.MAX_QUEUE)
+        self._lock = threading.Lock()
+        self._worker: Optional[threading.Thread] = None
+        self._pid = None
+
+    def submit(self, phone_number: str, query_type: str,
+               document_type: str, document_value: str) -> bool:
+        """
+        Encola una consulta para registrarla en el backend (nunca bloquea)
+
+        Returns:
+            bool: True si se encoló, False si se descartó o volcó a disco
+        """
+        self._ensure_worker()
+
+        record = {
+            "phone_number": phone_number,
+            "query_type": query_type,
+            "document_type": document_type,
+            "document_value": document_value
+        }
+
+        try:
+            self._queue.put_nowait(record)
+            metrics.increment("bot_query_log.enqueued")
+            return True
+        except queue.Full:
+            self._spill(record)
+            return False
+
+    def _spill(self, record: Dict[str, str]):
+        """Descarta el registro o lo vuelca a disco cuando la cola está llena"""
+        if not QueryLoggerConfig.SPILL_PATH:
+            metrics.increment("bot_query_log.dropped")
+            logger.warning(f"Cola de registro llena, descartando consulta de {record['phone_number']}")
+            return
+
+        try:
+            with self._lock, open(QueryLoggerConfig.SPILL_PATH, "a", encoding="utf-8") as spill_file:
+                spill_file.write(json.dumps(record, ensure_ascii=False) + "\n")
+            metrics.increment("bot_query_log.spilled")
+        except OSError as e:
+            metrics.increment("bot_query_log.dropped")
+            logger.error(f"No se pudo volcar consulta a {QueryLoggerConfig.SPILL_PATH}: {e}")
+
+    def _ensure_worker(self):
+        """Inicia el hilo de envío si no existe en este proceso"""
+        pid = os.getpid()
+        if self._worker is not None and self._pid == pid and self._worker.is_alive():
+            return
+
+        with self._lock:
+            if self._worker is None or self._pid != pid or not self._worker.is_alive():
+                self._worker = threading.Thread(
+                    target=self._run,
+                    name="bot-query-logger",
+                    daemon=True
+                )
+                self._pid = pid
+                self._worker.start()
+
+    def _run(self):
+        """Bucle del hilo: agrupa registros por tamaño o intervalo y los envía"""
+        while True:
+            batch = self._next_batch()
+            if batch:
+                self._send_batch(batch)
+
+    def _next_batch(self) -> List[Dict[str, str]]:
+        """Espera el primer registro y agrupa los siguientes hasta llenar el lote o vencer el intervalo"""
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + QueryLoggerConfig.FLUSH_INTERVAL
+
+        while len(batch) < QueryLoggerConfig.BATCH_SIZE:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+
+        return batch
+
+    def _send_batch(self, batch: List[Dict[str, str]]):
+        """Envía un lote de registros al backend (vía outbox durable si está habilitado)"""
+        if OutboxConfig.ENABLED:
+            try:
+                backend_outbox.enqueue_many([("log_bot_query", record, None) for record in batch])
+                return
+            except Exception as e:
+                logger.error(f"No se pudo registrar lote en el outbox, enviando directamente: {e}")
+
+        sent = 0
+        for record in batch:
+            try:
+                success, _ = backend_client.log_bot_query(**record)
+                if success:
+                    sent += 1
+            except Exception as e:
+                logger.warning(f"No se pudo registrar consulta en backend: {e}")
+
+        metrics.increment("bot_query_log.sent", sent)
+        metrics.increment("bot_query_log.failed", len(batch) - sent)
+        logger.debug(f"Lote de consultas enviado: {sent}/{len(batch)}")
+
+
+# Instancia global del registro de consultas
+bot_query_logger = BotQueryLogger()
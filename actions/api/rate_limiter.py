@@ -0,0 +1,222 @@
+"""
+Limitador de tasa de salida (token bucket) con cola de espera por prioridad
+
+El SAT limita las peticiones por credencial: cada familia de endpoints tiene
+un bucket compartido por todo el proceso. Cuando no hay fichas, las
+peticiones esperan en una cola acotada donde las consultas del usuario pasan
+antes que el trabajo en segundo plano (precalentado de caché, prefetch).
+"""
+import heapq
+import asyncio
+import itertools
+import threading
+import time
+import logging
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, List, Optional, Tuple
+from actions.utils.metrics import metrics
+from .sat_config import SATConfig
+
+logger = logging.getLogger(__name__)
+
+# Prioridades (menor = se atiende antes)
+PRIORITY_INTERACTIVE = 0
+PRIORITY_BACKGROUND = 1
+
+# Prioridad de las peticiones del contexto actual (hilo o tarea asyncio)
+_request_priority: ContextVar[int] = ContextVar("request_priority", default=PRIORITY_INTERACTIVE)
+
+
+@contextmanager
+def background_priority():
+    """Marca como trabajo en segundo plano las peticiones hechas dentro del bloque"""
+    token = _request_priority.set(PRIORITY_BACKGROUND)
+    try:
+        yield
+    finally:
+        _request_priority.reset(token)
+
+
+def current_priority() -> int:
+    """Prioridad de las peticiones del contexto actual"""
+    return _request_priority.get()
+
+
+class TokenBucket:
+    """
+    Token bucket con cola de espera ordenada por (prioridad, llegada)
+
+    Se usa tanto desde hilos (acquire) como desde el event loop
+    (acquire_async); el estado se protege con un lock que nunca se retiene
+    mientras se espera.
+    """
+
+    def __init__(self, name: str, rate: float, burst: float, max_queue: int):
+        self.name = name
+        self.rate = rate
+        self.burst = max(1.0, burst)
+        self.max_queue = max_queue
+        self._tokens = self.burst
+        self._updated_at = time.monotonic()
+        self._lock = threading.Lock()
+        # Heap de (prioridad, orden de llegada) de las peticiones en espera
+        self._waiters: List[Tuple[int, int]] = []
+        self._sequence = itertools.count()
+
+    def _refill(self):
+        """Suma las fichas por tiempo transcurrido (llamar con _lock tomado)"""
+        now = time.monotonic()
+        self._tokens = min(self.burst, self._tokens + (now - self._updated_at) * self.rate)
+        self._updated_at = now
+
+    def _enqueue(self, priority: int) -> Optional[Tuple[int, int]]:
+        """Entra en la cola de espera; None si la cola está llena"""
+        with self._lock:
+            if len(self._waiters) >= self.max_queue:
+                return None
+            entry = (priority, next(self._sequence))
+            heapq.heappush(self._waiters, entry)
+            return entry
+
+    def _try_take(self, entry: Tuple[int, int]) -> float:
+        """Toma una ficha si entry encabeza la cola; si no, segundos sugeridos de espera"""
+        with self._lock:
+            self._refill()
+            if self._waiters[0] == entry and self._tokens >= 1:
+                heapq.heappop(self._waiters)
+                self._tokens -= 1
+                return 0.0
+            if self._tokens >= 1:
+                # Hay fichas pero otra petición va primero
+                return 0.01
+            return (1 - self._tokens) / self.rate
+
+    def _leave(self, entry: Tuple[int, int]):
+        """Abandona la cola sin ficha (plazo agotado o cancelación)"""
+        with self._lock:
+            if entry in self._waiters:
+                self._waiters.remove(entry)
+                heapq.heapify(self._waiters)
+
+    def _start(self, priority: int) -> Tuple[bool, Optional[Tuple[int, int]]]:
+        """Camino rápido sin cola; devuelve (ficha obtenida, entrada en la cola o None)"""
+        with self._lock:
+            self._refill()
+            if not self._waiters and self._tokens >= 1:
+                self._tokens -= 1
+                return True, None
+        return False, self._enqueue(priority)
+
+    def _reject(self, priority: int, reason: str) -> bool:
+        """Registra el rechazo de una petición"""
+        kind = "background" if priority == PRIORITY_BACKGROUND else "interactive"
+        metrics.increment(f"{self.name}.rate_limited.{kind}")
+        logger.warning(f"Límite de tasa de {self.name}: petición {kind} descartada ({reason})")
+        return False
+
+    def acquire(self, timeout: float, priority: Optional[int] = None) -> bool:
+        """
+        Espera una ficha bloqueando el hilo actual
+
+        Args:
+            timeout: Segundos máximos de espera en la cola
+            priority: Prioridad de la petición (por defecto la del contexto)
+
+        Returns:
+            bool: True si se obtuvo la ficha, False si la cola está llena o se agotó la espera
+        """
+        priority = current_priority() if priority is None else priority
+        taken, entry = self._start(priority)
+        if taken:
+            return True
+        if entry is None:
+            return self._reject(priority, "cola llena")
+
+        started = time.monotonic()
+        wait_until = started + timeout
+        try:
+            while True:
+                wait = self._try_take(entry)
+                if wait == 0:
+                    metrics.observe(f"{self.name}.queue_wait_ms", (time.monotonic() - started) * 1000)
+                    entry = None
+                    return True
+                remaining = wait_until - time.monotonic()
+                if remaining <= 0:
+                    return self._reject(priority, "espera agotada")
+                time.sleep(min(wait, remaining))
+        finally:
+            if entry is not None:
+                self._leave(entry)
+
+    async def acquire_async(self, timeout: float, priority: Optional[int] = None) -> bool:
+        """Espera una ficha sin bloquear el event loop (mismos argumentos que acquire)"""
+        priority = current_priority() if priority is None else priority
+        taken, entry = self._start(priority)
+        if taken:
+            return True
+        if entry is None:
+            return self._reject(priority, "cola llena")
+
+        started = time.monotonic()
+        wait_until = started + timeout
+        try:
+            while True:
+                wait = self._try_take(entry)
+                if wait == 0:
+                    metrics.observe(f"{self.name}.queue_wait_ms", (time.monotonic() - started) * 1000)
+                    entry = None
+                    return True
+                remaining = wait_until - time.monotonic()
+                if remaining <= 0:
+                    return self._reject(priority, "espera agotada")
+                await asyncio.sleep(min(wait, remaining))
+        finally:
+            # También si la tarea se cancela mientras espera
+            if entry is not None:
+                self._leave(entry)
+
+
+class RateLimiterRegistry:
+    """Buckets por familia de endpoints, creados bajo demanda"""
+
+    def __init__(self, prefix: str, rates: Dict[str, float], default_rate: float,
+                 burst_seconds: float, max_queue: int):
+        self.prefix = prefix
+        self.rates = rates
+        self.default_rate = default_rate
+        self.burst_seconds = burst_seconds
+        self.max_queue = max_queue
+        self._buckets: Dict[str, TokenBucket] = {}
+        self._lock = threading.Lock()
+
+    def get(self, family: str) -> Optional[TokenBucket]:
+        """Bucket de la familia o None si no tiene límite (tasa <= 0)"""
+        bucket = self._buckets.get(family)
+        if bucket is not None:
+            return bucket
+
+        rate = self.rates.get(family, self.default_rate)
+        if rate <= 0:
+            return None
+
+        with self._lock:
+            if family not in self._buckets:
+                self._buckets[family] = TokenBucket(
+                    f"{self.prefix}.{family}",
+                    rate=rate,
+                    burst=rate * self.burst_seconds,
+                    max_queue=self.max_queue
+                )
+            return self._buckets[family]
+
+
+# Instancia global de límites de tasa por familia de endpoints del SAT
+sat_rate_limiters = RateLimiterRegistry(
+    "sat.rate_limit",
+    rates=SATConfig.RATE_LIMITS,
+    default_rate=SATConfig.DEFAULT_RATE_LIMIT,
+    burst_seconds=SATConfig.RATE_LIMIT_BURST_SECONDS,
+    max_queue=SATConfig.RATE_LIMIT_MAX_QUEUE
+)
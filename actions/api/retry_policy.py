@@ -0,0 +1,143 @@
+"""
+Política de reintentos para peticiones HTTP idempotentes
+
+Reintenta GETs ante fallas transitorias (errores de conexión, timeouts de
+lectura, 502/503/504) con backoff exponencial y jitter. Un presupuesto
+global limita los reintentos a una fracción de las peticiones para que no
+amplifiquen una caída.
+"""
+import os
+import random
+import threading
+import time
+import logging
+from typing import FrozenSet, Optional
+from dotenv import load_dotenv
+from actions.utils.metrics import metrics
+
+# Cargar variables de entorno
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+
+class RetryConfig:
+    """Configuración de reintentos HTTP"""
+
+    # Intentos totales por petición (1 = sin reintentos)
+    MAX_ATTEMPTS = int(os.getenv('HTTP_RETRY_MAX_ATTEMPTS', '3'))
+
+    # Backoff exponencial entre intentos (segundos)
+    BASE_DELAY = float(os.getenv('HTTP_RETRY_BASE_DELAY', '0.2'))
+    MAX_DELAY = float(os.getenv('HTTP_RETRY_MAX_DELAY', '2'))
+
+    # Códigos HTTP considerados transitorios
+    RETRYABLE_STATUSES = frozenset(
+        int(code) for code in os.getenv('HTTP_RETRY_STATUSES', '502,503,504').split(',') if code.strip()
+    )
+
+    # Presupuesto: reintentos como fracción de las peticiones (0.1 = 10% extra)
+    BUDGET_RATIO = float(os.getenv('HTTP_RETRY_BUDGET_RATIO', '0.1'))
+
+    # Reintentos por segundo siempre permitidos aunque haya poco tráfico
+    BUDGET_MIN_PER_SECOND = float(os.getenv('HTTP_RETRY_BUDGET_MIN_PER_SECOND', '1'))
+
+    # Reintentos acumulables como máximo
+    BUDGET_MAX_TOKENS = float(os.getenv('HTTP_RETRY_BUDGET_MAX_TOKENS', '10'))
+
+
+class RequestBudget:
+    """
+    Presupuesto de peticiones extra (reintentos, duplicados) sobre el tráfico real
+
+    Cada petición original deposita `ratio` fichas y cada petición extra
+    consume una. Además se acumulan `min_per_second` fichas por segundo.
+    """
+
+    def __init__(self, name: str, ratio: float, min_per_second: float, max_tokens: float):
+        self.name = name
+        self.ratio = ratio
+        self.min_per_second = min_per_second
+        self.max_tokens = max_tokens
+        self._tokens = max_tokens
+        self._updated_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self):
+        """Suma las fichas por tiempo transcurrido (llamar con _lock tomado)"""
+        now = time.monotonic()
+        self._tokens = min(self.max_tokens, self._tokens + (now - self._updated_at) * self.min_per_second)
+        self._updated_at = now
+
+    def record_request(self):
+        """Registra una petición original"""
+        with self._lock:
+            self._refill()
+            self._tokens = min(self.max_tokens, self._tokens + self.ratio)
+
+    def try_spend(self) -> bool:
+        """Consume una ficha para una petición extra; False si el presupuesto está agotado"""
+        with self._lock:
+            self._refill()
+            if self._tokens < 1:
+                metrics.increment(f"{self.name}.budget_exhausted")
+                return False
+            self._tokens -= 1
+            return True
+
+
+class RetryPolicy:
+    """Decide si un intento fallido se reintenta y cuánto esperar"""
+
+    IDEMPOTENT_METHODS = frozenset({"GET", "HEAD", "OPTIONS"})
+
+    def __init__(self, max_attempts: int, base_delay: float, max_delay: float,
+                 retryable_statuses: FrozenSet[int], budget: RequestBudget):
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.retryable_statuses = retryable_statuses
+        self.budget = budget
+
+    def is_retryable_status(self, status_code: int) -> bool:
+        """True si el código HTTP indica una falla transitoria"""
+        return status_code in self.retryable_statuses
+
+    def next_delay(self, method: str, attempt: int, reason: str) -> Optional[float]:
+        """
+        Segundos a esperar antes del siguiente intento o None si no se reintenta
+
+        Args:
+            method: Método HTTP de la petición
+            attempt: Número del intento que acaba de fallar (desde 1)
+            reason: Descripción de la falla (para logs)
+        """
+        if method.upper() not in self.IDEMPOTENT_METHODS or attempt >= self.max_attempts:
+            return None
+        if not self.budget.try_spend():
+            logger.warning(f"Presupuesto de reintentos agotado, no se reintenta ({reason})")
+            return None
+
+        # Full jitter sobre el backoff exponencial
+        delay = random.uniform(0, min(self.max_delay, self.base_delay * (2 ** (attempt - 1))))
+        metrics.increment("http_retry.retried")
+        logger.info(f"Reintentando petición (intento {attempt + 1}/{self.max_attempts}) en {delay:.2f}s: {reason}")
+        return delay
+
+
+# Instancia global del presupuesto de reintentos (compartido por todos los clientes)
+retry_budget = RequestBudget(
+    "http_retry",
+    ratio=RetryConfig.BUDGET_RATIO,
+    min_per_second=RetryConfig.BUDGET_MIN_PER_SECOND,
+    max_tokens=RetryConfig.BUDGET_MAX_TOKENS
+)
+
+# Instancia global de la política de reintentos
+retry_policy = RetryPolicy(
+    max_attempts=RetryConfig.MAX_ATTEMPTS,
+    base_delay=RetryConfig.BASE_DELAY,
+    max_delay=RetryConfig.MAX_DELAY,
+    retryable_statuses=RetryConfig.RETRYABLE_STATUSES,
+    budget=retry_budget
+)
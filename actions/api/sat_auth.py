@@ -1,20 +1,45 @@
 """
 Manejo de autenticación automática con la API del SAT
 """
-import requests
+import os
 import logging
-from datetime import datetime, timedelta
-from typing import Optional
+from typing import Optional, Tuple
+from dotenv import load_dotenv
+from .http_transport import http_transport
+from .token_auth import TokenAuthManager
+
+# Cargar variables de entorno
+load_dotenv()
 
 logger = logging.getLogger(__name__)
 
 
-class SATAuthManager:
+class SATAuthConfig:
+    """Configuración de la renovación del token SAT"""
+
+    # Segundos antes de la expiración en que el hilo de fondo renueva el token
+    REFRESH_MARGIN = float(os.getenv('SAT_AUTH_REFRESH_MARGIN', '120'))
+
+    # Segundos antes de la expiración en que el token deja de usarse
+    EXPIRY_MARGIN = float(os.getenv('SAT_AUTH_EXPIRY_MARGIN', '60'))
+
+    # Backoff exponencial (segundos) tras un login fallido; mientras dura, las
+    # peticiones fallan de inmediato en lugar de intentar otro login
+    FAILURE_BACKOFF_BASE = float(os.getenv('SAT_AUTH_FAILURE_BACKOFF_BASE', '5'))
+    FAILURE_BACKOFF_MAX = float(os.getenv('SAT_AUTH_FAILURE_BACKOFF_MAX', '120'))
+
+
+class SATAuthManager(TokenAuthManager):
     """Maneja la autenticación automática con la API del SAT"""
 
     def __init__(self):
-        self.token = None
-        self.token_expiry = None
+        super().__init__(
+            store_key="sat",
+            expiry_margin=SATAuthConfig.EXPIRY_MARGIN,
+            refresh_margin=SATAuthConfig.REFRESH_MARGIN,
+            backoff_base=SATAuthConfig.FAILURE_BACKOFF_BASE,
+            backoff_max=SATAuthConfig.FAILURE_BACKOFF_MAX
+        )
         self.auth_url = "https://ws.sat.gob.pe/auth/login"
         self.credentials = {
             "client_id": "ChatBootSat",
@@ -23,53 +48,32 @@ class SATAuthManager:
             "clave": "PQb%qd72E@%4cCnmkyT*"
         }
 
-    def get_valid_token(self) -> Optional[str]:
-        """Obtiene un token válido, renovándolo si es necesario"""
-        if self.token is None or self.is_token_expired():
-            self.refresh_token()
-        return self.token
-
-    def is_token_expired(self) -> bool:
-        """Verifica si el token ha expirado"""
-        if self.token_expiry is None:
-            return True
-        return datetime.now() >= (self.token_expiry - timedelta(minutes=1))
-
-    def refresh_token(self) -> bool:
+    def _request_token(self, timeout: float) -> Optional[Tuple[str, float]]:
         """Obtiene un nuevo token de la API"""
         try:
             logger.info(" Renovando token de autenticación SAT...")
 
-            response = requests.post(
+            response = http_transport.post(
                 self.auth_url,
                 json=self.credentials,
                 headers={"Content-Type": "application/json"},
-                timeout=30,
+                timeout=timeout,
                 verify=False
             )
 
             if response.status_code == 200:
                 data = response.json()
-                self.token = data.get("access_token")
                 expires_in = data.get("expires_in", 900)  # Default 15 min
-                self.token_expiry = datetime.now() + timedelta(seconds=expires_in)
 
                 logger.info(f" Token renovado exitosamente, expira en {expires_in} segundos")
-                return True
+                return data.get("access_token"), expires_in
             else:
                 logger.error(f" Error obteniendo token: {response.status_code} - {response.text}")
-                self.token = None
-                return False
+                return None
 
         except Exception as e:
             logger.error(f" Error en autenticación: {e}")
-            self.token = None
-            return False
-
-    def clear_token(self):
-        """Limpia el token actual para forzar renovación"""
-        self.token = None
-        self.token_expiry = None
+            return None
 
 
 # Instancia global del manejador de autenticación
@@ -1,186 +1,387 @@
 """
 Cliente base para APIs del SAT con manejo automático de autenticación
 """
+import re
 import requests
+import time
 import logging
 from typing import Optional, Dict, Any, Tuple
+from actions.utils.metrics import metrics
+from actions.utils.deadline import Deadline
+from actions.utils.ttl_cache import TTLCache
+from actions.utils.validators import validator
 from .sat_auth import auth_manager
+from .sat_config import SATConfig
+from .circuit_breaker import sat_breaker_for
+from .bulkhead import sat_bulkheads
+from .rate_limiter import sat_rate_limiters, current_priority, PRIORITY_BACKGROUND
+from .timeout_policy import sat_timeout_policy
+from .single_flight import sat_single_flight
+from .retry_policy import retry_policy
+from .http_transport import http_transport
+from .falta_catalog import falta_catalog
+from .tupa_catalog import tupa_catalog
 
 logger = logging.getLogger(__name__)
 
+# Caché de consultas de deuda (clave: tipo de documento y documento normalizado)
+sat_result_cache = TTLCache(
+    "sat.result_cache",
+    ttl=SATConfig.RESULT_CACHE_TTL,
+    max_entries=SATConfig.RESULT_CACHE_MAX_ENTRIES,
+    max_bytes=SATConfig.RESULT_CACHE_MAX_BYTES
+)
+
 class SATAPIClient:
     """Cliente base para todas las APIs del SAT"""
 
     def __init__(self):
         self.base_url = "https://ws.sat.gob.pe"
-        self.timeout = 30
         self.default_headers = {
             "Content-Type": "application/json",
             "IP": "172.168.1.1"
         }
 
-    def _get_headers(self) -> Dict[str, str]:
+    def _get_headers(self, deadline: Optional[Deadline] = None) -> Dict[str, str]:
         """Obtiene headers con token de autenticación"""
         headers = self.default_headers.copy()
 
-        token = auth_manager.get_valid_token()
+        token = auth_manager.get_valid_token(deadline)
         if token:
             headers["Authorization"] = f"Bearer {token}"
 
         return headers
 
-    def _make_request(self, method: str, endpoint: str, **kwargs) -> Optional[Dict[str, Any]]:
+    @staticmethod
+    def _coalesce_key(method: str, endpoint: str) -> str:
+        """Clave de deduplicación: método y endpoint normalizado (documento incluido)"""
+        normalized = re.sub(r'/+', '/', endpoint.strip()).rstrip('/')
+        return f"{method.upper()} {normalized}"
+
+    @staticmethod
+    def _result_cache_key(tipo: str, documento: str) -> Optional[str]:
+        """Clave de caché con el documento normalizado por DataValidator (None si queda vacío)"""
+        normalizers = {
+            "placa": validator.validate_placa,
+            "dni": validator.validate_dni,
+            "ruc": validator.validate_ruc,
+            "codigo_contribuyente": validator.validate_codigo_contribuyente,
+        }
+        _, normalizado = normalizers[tipo](documento)
+        return f"{tipo}:{normalizado}" if normalizado else None
+
+    def _cached_request(self, tipo: str, documento: str, endpoint: str,
+                        deadline: Optional[Deadline] = None) -> Optional[Dict[str, Any]]:
+        """
+        Consulta de deuda con caché LRU+TTL por documento normalizado
+
+        Solo se guardan respuestas exitosas; un error siempre vuelve a consultar.
+        """
+        key = self._result_cache_key(tipo, documento)
+        if key is not None:
+            cached = sat_result_cache.get(key)
+            if cached is not None:
+                logger.info(f"Consulta de deuda servida desde caché: {key}")
+                return cached
+
+        result = self._make_request("GET", endpoint, deadline=deadline)
+        if key is not None:
+            sat_result_cache.put(key, result)
+        return result
+
+    @staticmethod
+    def _rate_limit_wait(deadline: Optional[Deadline]) -> float:
+        """Segundos que la petición puede esperar en la cola del límite de tasa"""
+        if current_priority() == PRIORITY_BACKGROUND:
+            wait = SATConfig.RATE_LIMIT_BACKGROUND_MAX_WAIT
+        else:
+            wait = SATConfig.RATE_LIMIT_MAX_WAIT
+        return min(wait, deadline.remaining()) if deadline is not None else wait
+
+    @staticmethod
+    def _bulkhead_wait(deadline: Optional[Deadline]) -> float:
+        """Segundos que la petición puede esperar un cupo del bulkhead"""
+        wait = SATConfig.BULKHEAD_MAX_WAIT
+        return min(wait, deadline.remaining()) if deadline is not None else wait
+
+    def _make_request(self, method: str, endpoint: str, deadline: Optional[Deadline] = None,
+                      **kwargs) -> Optional[Dict[str, Any]]:
+        """
+        Realiza una petición a la API del SAT, compartiendo las consultas idénticas en curso
+
+        Args:
+            method: Método HTTP (GET, POST, etc.)
+            endpoint: Endpoint de la API
+            deadline: Plazo del action; las llamadas solo reciben el tiempo restante
+            **kwargs: Argumentos adicionales para requests
+
+        Returns:
+            Dict con la respuesta o None si hay error
+        """
+        if SATConfig.COALESCE_REQUESTS and method.upper() == "GET" and not kwargs:
+            return sat_single_flight.do(
+                self._coalesce_key(method, endpoint), self._execute_request, method, endpoint, deadline
+            )
+        return self._execute_request(method, endpoint, deadline=deadline, **kwargs)
+
+    def _execute_request(self, method: str, endpoint: str, deadline: Optional[Deadline] = None,
+                         **kwargs) -> Optional[Dict[str, Any]]:
         """
         Realiza una petición HTTP con manejo de errores y reintentos
 
         Args:
             method: Método HTTP (GET, POST, etc.)
             endpoint: Endpoint de la API
+            deadline: Plazo del action; las llamadas solo reciben el tiempo restante
             **kwargs: Argumentos adicionales para requests
 
         Returns:
             Dict con la respuesta o None si hay error
         """
+        headers = self._get_headers(deadline)
+        if "Authorization" not in headers:
+            # Sin token (login fallido y en backoff): fallar rápido
+            logger.error(f"Sin token de autenticación para API SAT, omitiendo petición: {endpoint}")
+            return None
+
+        if deadline is not None and deadline.expired():
+            logger.warning(f"Plazo del action agotado, omitiendo petición: {endpoint}")
+            metrics.increment("sat.deadline_exceeded")
+            return None
+
+        family = SATConfig.endpoint_family(endpoint)
+
+        # Cortar de inmediato si la familia del endpoint está degradada, antes de
+        # esperar fichas o cupos que una petición rechazada no va a usar
+        breaker = sat_breaker_for(family)
+        if breaker is None or not breaker.allow_request():
+            logger.warning(f"Circuit breaker abierto para {family}, omitiendo petición: {endpoint}")
+            return None
+
+        # Esperar turno en el límite de tasa de la familia (las consultas del usuario van primero)
+        limiter = sat_rate_limiters.get(family)
+        if limiter is not None and not limiter.acquire(self._rate_limit_wait(deadline)):
+            # Devolver la prueba half-open (si lo era) sin evaluar al SAT
+            breaker.record(None)
+            logger.warning(f"Límite de tasa de {family} alcanzado, omitiendo petición: {endpoint}")
+            return None
+
+        # Ocupar un cupo del bulkhead de la familia (y del SAT) mientras dure la petición
+        bulkhead = sat_bulkheads.get(family)
+        if not bulkhead.acquire(self._bulkhead_wait(deadline)):
+            breaker.record(None)
+            logger.warning(f"Bulkhead de {family} lleno, omitiendo petición: {endpoint}")
+            return None
+
+        healthy = None
+        started = time.monotonic()
+        try:
+            result, healthy = self._send_request(method, endpoint, headers, deadline, **kwargs)
+        finally:
+            # Siempre liberar el resultado y el cupo (también si la tarea se cancela)
+            breaker.record(healthy)
+            bulkhead.release()
+
+        if healthy is not None:
+            # Latencia de la llamada completa (reintentos incluidos) para el hedging y los
+            # paneles; el timeout adaptativo usa la de cada intento, que mide el transporte
+            metrics.observe(f"sat.{family}.latency_ms", (time.monotonic() - started) * 1000)
+        return result
+
+    def _send_request(self, method: str, endpoint: str, headers: Dict[str, str],
+                      deadline: Optional[Deadline] = None,
+                      **kwargs) -> Tuple[Optional[Dict[str, Any]], Optional[bool]]:
+        """
+        Envía la petición (reintentando una vez ante 401) y evalúa la salud del servicio
+
+        Returns:
+            Tuple: (respuesta o None, True si el SAT respondió sano, False ante
+                error 5xx/timeout/conexión, None si no llegó a evaluarse o el
+                error fue local)
+        """
         url = f"{self.base_url}{endpoint}"
-        headers = self._get_headers()
+        family = SATConfig.endpoint_family(endpoint)
+        timeout = sat_timeout_policy.timeout_for(family)
+        # Los reintentos toman ficha del mismo límite de tasa que la petición original
+        rate_limiter = sat_rate_limiters.get(family)
 
         try:
             logger.info(f" {method} {endpoint}")
 
-            response = requests.request(
+            response = http_transport.request(
                 method=method,
                 url=url,
                 headers=headers,
-                timeout=self.timeout,
+                timeout=timeout,
+                retry_policy=retry_policy,
+                deadline=deadline,
+                rate_limiter=rate_limiter,
+                latency_metric=sat_timeout_policy.attempt_metric(family),
                 verify=False,
                 **kwargs
             )
 
             if response.status_code == 200:
                 logger.info(f"Respuesta exitosa: {response.status_code}")
-                return response.json()
+                return response.json(), True
 
             elif response.status_code == 401:
                 # Token expirado, renovar y reintentar
                 logger.warning("Token expirado, renovando...")
-                auth_manager.clear_token()
+                auth_manager.clear_rejected_token(headers)
 
                 # Reintentar con nuevo token
-                headers = self._get_headers()
-                response = requests.request(
+                headers = self._get_headers(deadline)
+                if "Authorization" not in headers:
+                    logger.error("No se pudo renovar el token, omitiendo reintento")
+                    return None, None
+                response = http_transport.request(
                     method=method,
                     url=url,
                     headers=headers,
-                    timeout=self.timeout,
+                    timeout=timeout,
+                    retry_policy=retry_policy,
+                    deadline=deadline,
+                    rate_limiter=rate_limiter,
+                    latency_metric=sat_timeout_policy.attempt_metric(family),
                     verify=False,
                     **kwargs
                 )
 
                 if response.status_code == 200:
                     logger.info("Reintento exitoso después de renovar token")
-                    return response.json()
+                    return response.json(), True
                 else:
                     logger.error(f"Error en reintento: {response.status_code}")
-                    return None
+                    return None, response.status_code < 500
 
             else:
                 logger.error(f"Error API SAT: {response.status_code} - {response.text}")
-                return None
+                return None, response.status_code < 500
 
         except requests.exceptions.Timeout:
             logger.error("Timeout en petición a API SAT")
-            return None
+            # Un timeout por agotar el plazo del action no indica que el SAT esté degradado
+            return None, None if deadline is not None and deadline.expired() else False
         except requests.exceptions.ConnectionError:
             logger.error("Error de conexión con API SAT")
-            return None
+            return None, False
         except Exception as e:
+            # Fallo local (p. ej. JSON inválido en un 200 o un error de código):
+            # no dice nada de la salud del SAT y no debe abrir el breaker
             logger.error(f"Error inesperado en API SAT: {e}")
-            return None
+            return None, None
 
-    def consultar_papeletas_por_ruc(self, ruc: str) -> Optional[Dict[str, Any]]:
+    def consultar_papeletas_por_ruc(self, ruc: str,
+                                    deadline: Optional[Deadline] = None) -> Optional[Dict[str, Any]]:
         """
         Consulta papeletas por RUC
 
         Args:
             ruc: Número de RUC
+            deadline: Plazo del action para la llamada (opcional)
 
         Returns:
             Dict con resultado de la consulta
         """
         endpoint = f"/saldomatico/saldomatico/chatboot/1/{ruc}/0/10/11"
-        return self._make_request("GET", endpoint)
+        return self._cached_request("ruc", ruc, endpoint, deadline)
 
-    def consultar_papeletas_por_dni(self, dni: str) -> Optional[Dict[str, Any]]:
+    def consultar_papeletas_por_dni(self, dni: str,
+                                    deadline: Optional[Deadline] = None) -> Optional[Dict[str, Any]]:
         """
         Consulta papeletas por DNI
 
         Args:
             dni: Número de DNI
+            deadline: Plazo del action para la llamada (opcional)
 
         Returns:
             Dict con resultado de la consulta
         """
         endpoint = f"/saldomatico/saldomatico/chatboot/2/{dni}/0/10/11"
-        return self._make_request("GET", endpoint)
+        return self._cached_request("dni", dni, endpoint, deadline)
 
-    def consultar_papeletas_por_placa(self, placa: str) -> Optional[Dict[str, Any]]:
+    def consultar_papeletas_por_placa(self, placa: str,
+                                      deadline: Optional[Deadline] = None) -> Optional[Dict[str, Any]]:
         """
         Consulta papeletas por placa
 
         Args:
             placa: Número de placa vehicular
+            deadline: Plazo del action para la llamada (opcional)
 
         Returns:
             Dict con resultado de la consulta
         """
         endpoint = f"/saldomatico/saldomatico/chatboot/3/{placa}/0/10/11"
-        return self._make_request("GET", endpoint)
+        return self._cached_request("placa", placa, endpoint, deadline)
 
-    def consultar_codigo_falta(self, codigo: str) -> Optional[Dict[str, Any]]:
+    def consultar_codigo_falta(self, codigo: str,
+                               deadline: Optional[Deadline] = None) -> Optional[Dict[str, Any]]:
         """
         Consulta información de código de falta
 
         Args:
             codigo: Código de falta (ej: G40)
+            deadline: Plazo del action para la llamada (opcional)
 
         Returns:
             Dict con información del código
         """
+        # Catálogo precargado en memoria; la red solo para códigos que no están
+        cached = falta_catalog.get(codigo)
+        if cached is not None:
+            return cached
+
+        result = self.fetch_codigo_falta(codigo, deadline)
+        falta_catalog.put(codigo, result)
+        return result
+
+    def fetch_codigo_falta(self, codigo: str,
+                           deadline: Optional[Deadline] = None) -> Optional[Dict[str, Any]]:
+        """Consulta un código de falta en el SAT sin pasar por el catálogo en memoria"""
         endpoint = f"/saldomatico/falta/{codigo}"
-        return self._make_request("GET", endpoint)
+        return self._make_request("GET", endpoint, deadline=deadline)
 
-    def consultar_por_codigo_contribuyente(self, codigo: str) -> Optional[Dict[str, Any]]:
+    def consultar_por_codigo_contribuyente(self, codigo: str,
+                                           deadline: Optional[Deadline] = None) -> Optional[Dict[str, Any]]:
         """
         Consulta deuda por código de contribuyente
 
         Args:
             codigo: Código de contribuyente (ej: 94539)
+            deadline: Plazo del action para la llamada (opcional)
 
         Returns:
             Dict con resultado de la consulta
         """
         endpoint = f"/saldomatico/saldomatico/chatboot/5/{codigo}/0/10/10"
-        return self._make_request("GET", endpoint)
+        return self._cached_request("codigo_contribuyente", codigo, endpoint, deadline)
 
-    def consultar_orden_captura_por_placa(self, placa: str) -> Optional[Dict[str, Any]]:
+    def consultar_orden_captura_por_placa(self, placa: str,
+                                          deadline: Optional[Deadline] = None) -> Optional[Dict[str, Any]]:
         """
         Consulta órdenes de captura por placa vehicular
 
         Args:
             placa: Número de placa vehicular
+            deadline: Plazo del action para la llamada (opcional)
 
         Returns:
             Dict con resultado de la consulta de órdenes de captura
         """
         endpoint = f"/saldomatico/papeleta/chatboot/{placa}"
-        return self._make_request("GET", endpoint)
+        return self._make_request("GET", endpoint, deadline=deadline)
 
-    def consultar_tramite(self, numero_tramite: str) -> Optional[Dict[str, Any]]:
+    def consultar_tramite(self, numero_tramite: str,
+                          deadline: Optional[Deadline] = None) -> Optional[Dict[str, Any]]:
         """
         Consulta estado de trámite por número
 
         Args:
             numero_tramite: Número de trámite (14 dígitos)
+            deadline: Plazo del action para la llamada (opcional)
 
         Returns:
             Dict con resultado de la consulta de trámite
@@ -196,7 +397,7 @@ class SATAPIClient:
             }
         """
         endpoint = f"/saldomatico/tramite/1/{numero_tramite}"
-        return self._make_request("GET", endpoint)
+        return self._make_request("GET", endpoint, deadline=deadline)
 
     @staticmethod
     def validate_numero_tramite(numero: str) -> Tuple[bool, str]:
@@ -263,13 +464,15 @@ class SATAPIClient:
         except Exception:
             return "No disponible"
 
-    def consultar_menu_opcion(self, titulo: str, tipo_tramite: str = "papeletas") -> Optional[Dict[str, Any]]:
+    def consultar_menu_opcion(self, titulo: str, tipo_tramite: str = "papeletas",
+                              deadline: Optional[Deadline] = None) -> Optional[Dict[str, Any]]:
         """
         Consulta el menú de opciones para obtener el ivalor de un trámite
 
         Args:
             titulo: Título del trámite en mayúsculas (ej: "RECURSO DE RECONSIDERACIÓN")
             tipo_tramite: "papeletas" (usa /9/) o "tributarios" (usa /8/)
+            deadline: Plazo del action para la llamada (opcional)
 
         Returns:
             Dict con la respuesta del menú o None si hay error
@@ -288,14 +491,16 @@ class SATAPIClient:
         opcion_id = "9" if tipo_tramite == "papeletas" else "8"
 
         endpoint = f"/saldomatico/menu/opciones/{opcion_id}/titulo/{titulo_encoded}"
-        return self._make_request("GET", endpoint)
+        return self._make_request("GET", endpoint, deadline=deadline)
 
-    def consultar_requisitos_tupa(self, ivalor: int) -> Optional[Dict[str, Any]]:
+    def consultar_requisitos_tupa(self, ivalor: int,
+                                  deadline: Optional[Deadline] = None) -> Optional[Dict[str, Any]]:
         """
         Consulta los requisitos del TUPA usando el ivalor obtenido del menú
 
         Args:
             ivalor: Valor obtenido del endpoint de menú de opciones
+            deadline: Plazo del action para la llamada (opcional)
 
         Returns:
             Lista con los requisitos o None si hay error
@@ -308,7 +513,58 @@ class SATAPIClient:
             }]
         """
         endpoint = f"/saldomatico/tupa/consultarrequisito/{ivalor}/1"
-        return self._make_request("GET", endpoint)
+        return self._make_request("GET", endpoint, deadline=deadline)
+
+    def consultar_requisitos_tramite(self, titulo: str, tipo_tramite: str = "papeletas",
+                                     deadline: Optional[Deadline] = None) -> Optional[str]:
+        """
+        Requisitos de un trámite ya formateados, desde el catálogo en memoria (la red solo si no está)
+
+        Args:
+            titulo: Título del trámite en mayúsculas
+            tipo_tramite: "papeletas" o "tributarios"
+            deadline: Plazo del action para las llamadas (opcional)
+
+        Returns:
+            str: Texto de requisitos para WhatsApp o None si hay error
+        """
+        cached = tupa_catalog.get(tipo_tramite, titulo)
+        if cached is not None:
+            return cached
+
+        entry = self.fetch_requisitos_tramite(titulo, tipo_tramite, deadline)
+        tupa_catalog.put(tipo_tramite, titulo, entry)
+        return entry["texto"] if entry else None
+
+    def fetch_requisitos_tramite(self, titulo: str, tipo_tramite: str = "papeletas",
+                                 deadline: Optional[Deadline] = None) -> Optional[Dict[str, Any]]:
+        """
+        Consulta menú y TUPA de un trámite sin pasar por el catálogo en memoria
+
+        Returns:
+            Dict con 'ivalor' y 'texto' (requisitos formateados) o None si hay error
+        """
+        menu_response = self.consultar_menu_opcion(titulo, tipo_tramite=tipo_tramite, deadline=deadline)
+        if not menu_response or 'ivalor' not in menu_response:
+            logger.error(f"No se pudo obtener ivalor para: {titulo}")
+            return None
+
+        ivalor = menu_response.get('ivalor')
+        requisitos_response = self.consultar_requisitos_tupa(ivalor, deadline=deadline)
+        return self._build_requisitos_entry(ivalor, requisitos_response)
+
+    def _build_requisitos_entry(self, ivalor: int, requisitos_response: Any) -> Optional[Dict[str, Any]]:
+        """Entrada {ivalor, texto} a partir de la respuesta del TUPA o None si está vacía"""
+        if not requisitos_response or not isinstance(requisitos_response, list) or len(requisitos_response) == 0:
+            logger.error(f"No se pudieron obtener requisitos para ivalor: {ivalor}")
+            return None
+
+        vdetalle = requisitos_response[0].get('vdetalle', '')
+        if not vdetalle:
+            logger.error(f"vdetalle vacío para ivalor: {ivalor}")
+            return None
+
+        return {"ivalor": ivalor, "texto": self.format_html_to_text(vdetalle)}
 
     @staticmethod
     def format_html_to_text(html_text: str) -> str:
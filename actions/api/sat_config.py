@@ -0,0 +1,149 @@
+"""
+Configuración de la API del SAT
+"""
+import os
+from dotenv import load_dotenv
+
+# Cargar variables de entorno
+load_dotenv()
+
+
+def parse_family_values(raw: str) -> dict:
+    """Convierte 'familia=valor,familia=valor' en un diccionario"""
+    values = {}
+    for item in raw.split(','):
+        family, _, value = item.partition('=')
+        if family.strip() and value.strip():
+            values[family.strip()] = float(value)
+    return values
+
+
+class SATConfig:
+    """Configuración centralizada para la API del SAT"""
+
+    # Familias de endpoints (prefijo de ruta -> nombre). Cada familia tiene su
+    # propio circuit breaker para que la degradación de una no afecte a las demás
+    ENDPOINT_FAMILIES = [
+        ("/saldomatico/saldomatico/chatboot/", "saldomatico"),
+        ("/saldomatico/falta/", "falta"),
+        ("/saldomatico/papeleta/chatboot/", "papeleta"),
+        ("/saldomatico/tramite/", "tramite"),
+        ("/saldomatico/menu/opciones/", "menu"),
+        ("/saldomatico/tupa/", "tupa"),
+    ]
+
+    # Timeout de conexión (segundos) para todas las familias
+    CONNECT_TIMEOUT = float(os.getenv('SAT_CONNECT_TIMEOUT', '3'))
+
+    # Timeout de lectura máximo por familia (segundos); se puede sobrescribir con
+    # SAT_READ_TIMEOUTS='familia=segundos,...'. Las consultas de deuda por RUC
+    # (saldomatico) son las más pesadas; catálogo de faltas y TUPA son ligeros
+    READ_TIMEOUTS = {
+        "saldomatico": 25.0,
+        "papeleta": 15.0,
+        "tramite": 10.0,
+        "falta": 5.0,
+        "menu": 5.0,
+        "tupa": 5.0,
+    }
+    READ_TIMEOUTS.update(parse_family_values(os.getenv('SAT_READ_TIMEOUTS', '')))
+    DEFAULT_READ_TIMEOUT = float(os.getenv('SAT_DEFAULT_READ_TIMEOUT', '30'))
+
+    # Timeout adaptativo: percentil × factor de la latencia observada, acotado
+    # entre MIN_READ_TIMEOUT y el timeout de la familia
+    ADAPTIVE_TIMEOUTS = os.getenv('SAT_ADAPTIVE_TIMEOUTS', 'true').lower() == 'true'
+    ADAPTIVE_TIMEOUT_PERCENTILE = float(os.getenv('SAT_ADAPTIVE_TIMEOUT_PERCENTILE', '99'))
+    ADAPTIVE_TIMEOUT_FACTOR = float(os.getenv('SAT_ADAPTIVE_TIMEOUT_FACTOR', '1.5'))
+    ADAPTIVE_TIMEOUT_MIN_SAMPLES = int(os.getenv('SAT_ADAPTIVE_TIMEOUT_MIN_SAMPLES', '50'))
+    MIN_READ_TIMEOUT = float(os.getenv('SAT_MIN_READ_TIMEOUT', '2'))
+
+    # Límite de tasa de salida por familia (peticiones/segundo; 0 = sin límite),
+    # sobrescribible con SAT_RATE_LIMITS='familia=req_s,...'
+    RATE_LIMITS = parse_family_values(os.getenv('SAT_RATE_LIMITS', ''))
+    DEFAULT_RATE_LIMIT = float(os.getenv('SAT_DEFAULT_RATE_LIMIT', '10'))
+
+    # Ráfaga permitida en segundos de tasa (2 = hasta 2 s de peticiones de golpe)
+    RATE_LIMIT_BURST_SECONDS = float(os.getenv('SAT_RATE_LIMIT_BURST_SECONDS', '2'))
+
+    # Peticiones que pueden esperar ficha por familia; el resto se descarta
+    RATE_LIMIT_MAX_QUEUE = int(os.getenv('SAT_RATE_LIMIT_MAX_QUEUE', '50'))
+
+    # Espera máxima en la cola (segundos) para consultas del usuario y trabajo en segundo plano
+    RATE_LIMIT_MAX_WAIT = float(os.getenv('SAT_RATE_LIMIT_MAX_WAIT', '5'))
+    RATE_LIMIT_BACKGROUND_MAX_WAIT = float(os.getenv('SAT_RATE_LIMIT_BACKGROUND_MAX_WAIT', '30'))
+
+    # Bulkheads: peticiones en curso al SAT como máximo (en total y por familia,
+    # sobrescribible con SAT_BULKHEAD_FAMILY_LIMITS='familia=n,...'); una
+    # petición espera un cupo hasta BULKHEAD_MAX_WAIT s antes de rechazarse
+    BULKHEAD_LIMIT = int(os.getenv('SAT_BULKHEAD_LIMIT', '40'))
+    BULKHEAD_FAMILY_LIMITS = {"saldomatico": 20.0}
+    BULKHEAD_FAMILY_LIMITS.update(parse_family_values(os.getenv('SAT_BULKHEAD_FAMILY_LIMITS', '')))
+    BULKHEAD_DEFAULT_FAMILY_LIMIT = int(os.getenv('SAT_BULKHEAD_DEFAULT_FAMILY_LIMIT', '10'))
+    BULKHEAD_MAX_WAIT = float(os.getenv('SAT_BULKHEAD_MAX_WAIT', '1'))
+
+    # Caché de consultas de deuda por documento normalizado (papeletas por
+    # placa/DNI/RUC y código de contribuyente); TTL 0 desactiva la caché
+    RESULT_CACHE_TTL = float(os.getenv('SAT_RESULT_CACHE_TTL', '300'))
+    RESULT_CACHE_MAX_ENTRIES = int(os.getenv('SAT_RESULT_CACHE_MAX_ENTRIES', '2000'))
+    RESULT_CACHE_MAX_BYTES = int(os.getenv('SAT_RESULT_CACHE_MAX_BYTES', str(20 * 1024 * 1024)))
+
+    # Catálogo de códigos de falta en memoria: se refrescan cada REFRESH_SECONDS
+    # los códigos ya consultados y los de SEEDS (RETRY_SECONDS si ninguno respondió).
+    # Con PRELOAD se suma el barrido de prefijos × números 01..MAX_NUMBER
+    # (cientos de GETs por worker), por eso es opcional
+    FALTA_CATALOG_SEEDS = [
+        code.strip().upper() for code in os.getenv('SAT_FALTA_CATALOG_SEEDS', '').split(',') if code.strip()
+    ]
+    FALTA_CATALOG_PRELOAD = os.getenv('SAT_FALTA_CATALOG_PRELOAD', 'false').lower() == 'true'
+    FALTA_CATALOG_PREFIXES = [
+        prefix.strip().upper() for prefix in os.getenv('SAT_FALTA_CATALOG_PREFIXES', 'M,G,L').split(',') if prefix.strip()
+    ]
+    FALTA_CATALOG_MAX_NUMBER = int(os.getenv('SAT_FALTA_CATALOG_MAX_NUMBER', '99'))
+    FALTA_CATALOG_REFRESH_SECONDS = float(os.getenv('SAT_FALTA_CATALOG_REFRESH_SECONDS', '86400'))
+    FALTA_CATALOG_RETRY_SECONDS = float(os.getenv('SAT_FALTA_CATALOG_RETRY_SECONDS', '300'))
+
+    # Catálogo de requisitos del TUPA: se precarga para los trámites
+    # registrados y se refresca cada REFRESH_SECONDS (RETRY_SECONDS mientras
+    # falte cargar algún trámite)
+    TUPA_CATALOG_PRELOAD = os.getenv('SAT_TUPA_CATALOG_PRELOAD', 'true').lower() == 'true'
+    TUPA_CATALOG_REFRESH_SECONDS = float(os.getenv('SAT_TUPA_CATALOG_REFRESH_SECONDS', '86400'))
+    TUPA_CATALOG_RETRY_SECONDS = float(os.getenv('SAT_TUPA_CATALOG_RETRY_SECONDS', '300'))
+
+    # Compartir una sola petición entre consultas GET idénticas en curso
+    COALESCE_REQUESTS = os.getenv('SAT_COALESCE_REQUESTS', 'true').lower() == 'true'
+
+    # Circuit breaker: se abre si, con al menos MIN_CALLS en la ventana de las
+    # últimas WINDOW llamadas, la tasa de errores/timeouts llega a FAILURE_RATE
+    BREAKER_WINDOW = int(os.getenv('SAT_BREAKER_WINDOW', '20'))
+    BREAKER_MIN_CALLS = int(os.getenv('SAT_BREAKER_MIN_CALLS', '10'))
+    BREAKER_FAILURE_RATE = float(os.getenv('SAT_BREAKER_FAILURE_RATE', '0.5'))
+
+    # Segundos que el breaker permanece abierto antes de probar (half-open)
+    BREAKER_OPEN_SECONDS = float(os.getenv('SAT_BREAKER_OPEN_SECONDS', '30'))
+
+    # Peticiones de prueba simultáneas (y exitosas necesarias) en half-open
+    BREAKER_HALF_OPEN_PROBES = int(os.getenv('SAT_BREAKER_HALF_OPEN_PROBES', '2'))
+
+    # Hedging: familias (separadas por coma) en las que un GET lento se duplica
+    HEDGE_FAMILIES = frozenset(
+        family.strip() for family in os.getenv('SAT_HEDGE_FAMILIES', 'saldomatico').split(',') if family.strip()
+    )
+
+    # El duplicado sale tras el percentil HEDGE_PERCENTILE de la latencia observada
+    # (con al menos HEDGE_MIN_SAMPLES observaciones; si no, tras HEDGE_DEFAULT_DELAY s)
+    HEDGE_PERCENTILE = float(os.getenv('SAT_HEDGE_PERCENTILE', '95'))
+    HEDGE_MIN_SAMPLES = int(os.getenv('SAT_HEDGE_MIN_SAMPLES', '20'))
+    HEDGE_DEFAULT_DELAY = float(os.getenv('SAT_HEDGE_DEFAULT_DELAY', '1.5'))
+    HEDGE_MIN_DELAY = float(os.getenv('SAT_HEDGE_MIN_DELAY', '0.05'))
+
+    # Presupuesto de duplicados: fracción de las peticiones elegibles (0.05 = 5% extra)
+    HEDGE_BUDGET_RATIO = float(os.getenv('SAT_HEDGE_BUDGET_RATIO', '0.05'))
+    HEDGE_BUDGET_MAX_TOKENS = float(os.getenv('SAT_HEDGE_BUDGET_MAX_TOKENS', '5'))
+
+    @classmethod
+    def endpoint_family(cls, endpoint: str) -> str:
+        """Nombre de la familia a la que pertenece un endpoint"""
+        for prefix, family in cls.ENDPOINT_FAMILIES:
+            if endpoint.startswith(prefix):
+                return family
+        return "otros"
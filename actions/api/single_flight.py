@@ -0,0 +1,86 @@
+"""
+Deduplicación de peticiones idénticas en curso (single-flight)
+
+Si varias conversaciones piden lo mismo a la vez, solo la primera llega al
+servicio externo; las demás esperan y reciben una copia de su resultado.
+"""
+import asyncio
+import copy
+import threading
+import logging
+from typing import Any, Awaitable, Callable, Dict, Tuple
+from actions.utils.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+
+class _Call:
+    """Petición en curso compartida por varios hilos"""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """Single-flight para código síncrono (hilos)"""
+
+    def __init__(self, name: str):
+        self.name = name
+        self._lock = threading.Lock()
+        self._calls: Dict[str, _Call] = {}
+
+    def do(self, key: str, func: Callable[..., Any], *args) -> Any:
+        """Ejecuta func(*args) o espera la ejecución en curso con la misma clave"""
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+
+        if not leader:
+            metrics.increment(f"{self.name}.coalesced")
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return copy.deepcopy(call.result)
+
+        try:
+            call.result = func(*args)
+            return call.result
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+            call.done.set()
+
+
+class AsyncSingleFlight:
+    """Single-flight para corrutinas (un mismo event loop)"""
+
+    def __init__(self, name: str):
+        self.name = name
+        self._calls: Dict[Tuple[int, str], asyncio.Future] = {}
+
+    async def do(self, key: str, func: Callable[..., Awaitable[Any]], *args) -> Any:
+        """Espera func(*args) o la ejecución en curso con la misma clave"""
+        loop_key = (id(asyncio.get_running_loop()), key)
+
+        task = self._calls.get(loop_key)
+        if task is not None:
+            metrics.increment(f"{self.name}.coalesced")
+            # shield: cancelar a un llamador no cancela la petición compartida
+            return copy.deepcopy(await asyncio.shield(task))
+
+        task = asyncio.ensure_future(func(*args))
+        self._calls[loop_key] = task
+        task.add_done_callback(lambda _: self._calls.pop(loop_key, None))
+        return await asyncio.shield(task)
+
+
+# Instancias globales para la API del SAT
+sat_single_flight = SingleFlight("sat.single_flight")
+async_sat_single_flight = AsyncSingleFlight("sat.single_flight")
@@ -0,0 +1,82 @@
+"""
+Timeouts por familia de endpoints con conexión y lectura separadas
+
+En modo adaptativo el timeout de lectura se deriva de la latencia observada
+de cada intento HTTP (p. ej. p99 × 1.5), acotado entre un mínimo y el valor
+configurado para la familia, de modo que las consultas ligeras no esperan lo
+mismo que las pesadas. Se mide por intento y no por llamada completa: los
+reintentos, backoffs y colas de espera no deben alargar el timeout.
+"""
+import logging
+from typing import Dict, Tuple
+from actions.utils.metrics import metrics
+from .sat_config import SATConfig
+from .backend_config import BackendConfig
+
+logger = logging.getLogger(__name__)
+
+
+class TimeoutPolicy:
+    """Calcula (connect, read) para cada familia de endpoints"""
+
+    def __init__(self, metric_prefix: str, connect_timeout: float, read_timeouts: Dict[str, float],
+                 default_read_timeout: float, adaptive: bool, percentile: float, factor: float,
+                 min_read_timeout: float, min_samples: int):
+        self.metric_prefix = metric_prefix
+        self.connect_timeout = connect_timeout
+        self.read_timeouts = read_timeouts
+        self.default_read_timeout = default_read_timeout
+        self.adaptive = adaptive
+        self.percentile = percentile
+        self.factor = factor
+        self.min_read_timeout = min_read_timeout
+        self.min_samples = min_samples
+
+    def attempt_metric(self, family: str) -> str:
+        """Métrica donde el transporte registra la latencia de cada intento (ms)"""
+        return f"{self.metric_prefix}.{family}.attempt_latency_ms"
+
+    def read_timeout(self, family: str) -> float:
+        """Timeout de lectura (segundos) para la familia"""
+        configured = self.read_timeouts.get(family, self.default_read_timeout)
+        if not self.adaptive:
+            return configured
+
+        latency_metric = self.attempt_metric(family)
+        if metrics.sample_count(latency_metric) < self.min_samples:
+            return configured
+
+        observed = metrics.percentile(latency_metric, self.percentile) / 1000 * self.factor
+        # El valor configurado actúa como máximo
+        return min(configured, max(self.min_read_timeout, observed))
+
+    def timeout_for(self, family: str) -> Tuple[float, float]:
+        """Tupla (connect, read) en segundos para la familia"""
+        return self.connect_timeout, self.read_timeout(family)
+
+
+# Instancia global de timeouts para la API del SAT
+sat_timeout_policy = TimeoutPolicy(
+    "sat",
+    connect_timeout=SATConfig.CONNECT_TIMEOUT,
+    read_timeouts=SATConfig.READ_TIMEOUTS,
+    default_read_timeout=SATConfig.DEFAULT_READ_TIMEOUT,
+    adaptive=SATConfig.ADAPTIVE_TIMEOUTS,
+    percentile=SATConfig.ADAPTIVE_TIMEOUT_PERCENTILE,
+    factor=SATConfig.ADAPTIVE_TIMEOUT_FACTOR,
+    min_read_timeout=SATConfig.MIN_READ_TIMEOUT,
+    min_samples=SATConfig.ADAPTIVE_TIMEOUT_MIN_SAMPLES
+)
+
+# Instancia global de timeouts para el backend (fijos por familia, sin adaptación)
+backend_timeout_policy = TimeoutPolicy(
+    "backend",
+    connect_timeout=BackendConfig.CONNECT_TIMEOUT,
+    read_timeouts=BackendConfig.READ_TIMEOUTS,
+    default_read_timeout=BackendConfig.READ_TIMEOUT,
+    adaptive=False,
+    percentile=SATConfig.ADAPTIVE_TIMEOUT_PERCENTILE,
+    factor=SATConfig.ADAPTIVE_TIMEOUT_FACTOR,
+    min_read_timeout=SATConfig.MIN_READ_TIMEOUT,
+    min_samples=SATConfig.ADAPTIVE_TIMEOUT_MIN_SAMPLES
+)
@@ -0,0 +1,297 @@
+"""
+Base común de los manejadores de autenticación por token (SAT y backend)
+
+Renovación single-flight dentro del proceso, coordinada entre workers a
+través del almacén de tokens, y renovación proactiva en segundo plano.
+"""
+import os
+import uuid
+import random
+import socket
+import asyncio
+import threading
+import time
+import logging
+from abc import ABC, abstractmethod
+from typing import Dict, Optional, Tuple
+from actions.utils.metrics import metrics
+from actions.utils.deadline import Deadline, cap_timeout
+from .token_store import TokenStore, TokenStoreConfig, token_store
+
+logger = logging.getLogger(__name__)
+
+
+class TokenAuthManager(ABC):
+    """
+    Clase base para manejadores de autenticación por token
+
+    Las clases hijas implementan _request_token(), que hace el login y
+    devuelve (token, segundos de vigencia) o None.
+
+    Los métodos aceptan un Deadline opcional: la espera por otra renovación
+    y el login mismo se recortan al tiempo que le queda al action.
+
+    Tras un login fallido no se reintenta hasta que vence un backoff
+    exponencial con jitter; mientras tanto get_valid_token() devuelve None
+    de inmediato y los clientes responden con su mensaje de error habitual.
+    """
+
+    def __init__(self, store_key: str, expiry_margin: float, refresh_margin: float,
+                 backoff_base: float, backoff_max: float, store: TokenStore = token_store):
+        self.token = None
+        self.token_expiry = None
+        self.refresh_at = None
+        # Último token rechazado con 401; no se vuelve a adoptar desde el almacén
+        self._rejected_token = None
+        self.store_key = store_key
+        self.store = store
+        self.expiry_margin = expiry_margin
+        self.refresh_margin = refresh_margin
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        # Logins fallidos consecutivos y momento (monotónico) del próximo intento permitido
+        self._failures = 0
+        self._retry_after = 0.0
+        # Una sola renovación en curso; el resto de hilos espera su resultado
+        self._refresh_lock = threading.Lock()
+        # Protege lecturas/escrituras breves del estado (nunca se retiene durante la red)
+        self._state_lock = threading.Lock()
+        self._refresher: Optional[threading.Thread] = None
+        self._refresher_pid = None
+        self._wakeup = threading.Event()
+        self._owner_suffix = uuid.uuid4().hex[:8]
+
+    # Timeout (segundos) del login cuando no hay deadline
+    LOGIN_TIMEOUT = 30
+
+    @abstractmethod
+    def _request_token(self, timeout: float) -> Optional[Tuple[str, float]]:
+        """Hace login y devuelve (token, segundos de vigencia) o None"""
+
+    def get_valid_token(self, deadline: Optional[Deadline] = None) -> Optional[str]:
+        """Obtiene un token válido, renovándolo si es necesario"""
+        self._ensure_refresher()
+
+        token = self.token
+        if token is None or self.is_token_expired():
+            if self.in_backoff():
+                metrics.increment(f"auth.{self.store_key}.backoff_rejected")
+                return None
+            self._refresh_single_flight(token, deadline)
+        return self.token
+
+    async def get_valid_token_async(self, deadline: Optional[Deadline] = None) -> Optional[str]:
+        """Obtiene un token válido sin bloquear el event loop durante la renovación"""
+        self._ensure_refresher()
+
+        token = self.token
+        if token is not None and not self.is_token_expired():
+            return token
+        if self.in_backoff():
+            metrics.increment(f"auth.{self.store_key}.backoff_rejected")
+            return None
+
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, self.get_valid_token, deadline)
+
+    def is_token_expired(self) -> bool:
+        """Verifica si el token ha expirado"""
+        expiry = self.token_expiry
+        if expiry is None:
+            return True
+        return time.monotonic() >= expiry - self.expiry_margin
+
+    def in_backoff(self) -> bool:
+        """True si un login falló hace poco y aún no corresponde reintentar"""
+        return time.monotonic() < self._retry_after
+
+    def refresh_token(self, deadline: Optional[Deadline] = None) -> bool:
+        """Obtiene un nuevo token y lo publica en el almacén compartido"""
+        result = self._request_token(cap_timeout(self.LOGIN_TIMEOUT, deadline))
+        if result is None:
+            # Un login cortado por el plazo del action no cuenta como falla del servicio
+            if deadline is None or not deadline.expired():
+                self._register_failure()
+            self._discard_expired_token()
+            return False
+
+        token, expires_in = result
+        now = time.monotonic()
+        # Renovar antes del margen, pero nunca antes de la mitad de la vida del token
+        refresh_in = max(expires_in - self.refresh_margin, expires_in / 2)
+        with self._state_lock:
+            self.token = token
+            self.token_expiry = now + expires_in
+            self.refresh_at = now + refresh_in
+            self._failures = 0
+            self._retry_after = 0.0
+
+        wall_now = time.time()
+        try:
+            self.store.put(self.store_key, token, wall_now + expires_in, wall_now + refresh_in)
+        except Exception as e:
+            logger.warning(f"No se pudo guardar el token {self.store_key} en el almacén: {e}")
+        return True
+
+    def clear_token(self, stale_token: Optional[str] = None):
+        """
+        Limpia el token actual para forzar renovación
+
+        Args:
+            stale_token: Token rechazado; si ya fue reemplazado no se limpia nada
+        """
+        with self._state_lock:
+            if stale_token is not None and stale_token != self.token:
+                return
+            self._rejected_token = self.token
+            self.token = None
+            self.token_expiry = None
+            self.refresh_at = None
+        self._wakeup.set()
+
+    def clear_rejected_token(self, headers: Dict[str, str]):
+        """Limpia el token enviado en headers tras una respuesta 401"""
+        authorization = headers.get("Authorization", "")
+        self.clear_token(authorization[len("Bearer "):] or None)
+
+    def _register_failure(self):
+        """Programa el próximo login permitido con backoff exponencial y jitter"""
+        with self._state_lock:
+            self._failures += 1
+            delay = min(self.backoff_max, self.backoff_base * (2 ** (self._failures - 1)))
+            delay = random.uniform(delay / 2, delay)
+            self._retry_after = time.monotonic() + delay
+            failures = self._failures
+
+        metrics.increment(f"auth.{self.store_key}.login_failed")
+        logger.warning(f"Login {self.store_key} fallido ({failures} seguidos), próximo intento en {delay:.1f}s")
+
+    def _discard_expired_token(self):
+        """Tras una renovación fallida conserva el token actual solo si sigue vigente"""
+        with self._state_lock:
+            if self.is_token_expired():
+                self.token = None
+                self.token_expiry = None
+                self.refresh_at = None
+
+    def _adopt_stored_token(self, stale_token: Optional[str]) -> bool:
+        """Adopta el token del almacén si es distinto de stale_token y sigue vigente"""
+        try:
+            stored = self.store.get(self.store_key)
+        except Exception as e:
+            logger.warning(f"No se pudo leer el token {self.store_key} del almacén: {e}")
+            return False
+
+        if stored is None or stored[0] in (stale_token, self._rejected_token):
+            return False
+
+        token, expires_at, refresh_at = stored
+        remaining = expires_at - time.time()
+        if remaining <= self.expiry_margin:
+            return False
+
+        # Convertir los vencimientos de tiempo de pared al reloj monotónico local
+        now = time.monotonic()
+        with self._state_lock:
+            self.token = token
+            self.token_expiry = now + remaining
+            self.refresh_at = now + max(0.0, refresh_at - time.time())
+            self._failures = 0
+            self._retry_after = 0.0
+        return True
+
+    def _refresh_single_flight(self, stale_token: Optional[str], deadline: Optional[Deadline] = None) -> bool:
+        """
+        Renueva el token si nadie lo hizo mientras se esperaba
+
+        Primero reutiliza un token renovado por otro hilo o worker; si no hay,
+        reserva la renovación en el almacén para que un solo worker haga login.
+
+        Args:
+            stale_token: Token que el llamador consideró inválido
+            deadline: Plazo del llamador (None = esperar lo necesario)
+        """
+        if not self._refresh_lock.acquire(timeout=deadline.remaining() if deadline is not None else -1):
+            logger.warning(f"Plazo agotado esperando la renovación del token {self.store_key}")
+            return False
+
+        try:
+            if self.token is not None and self.token != stale_token and not self.is_token_expired():
+                return True
+            if self._adopt_stored_token(stale_token):
+                return True
+            if self.in_backoff():
+                # Otro hilo acaba de fallar el login mientras se esperaba el lock
+                return False
+
+            owner = f"{socket.gethostname()}:{os.getpid()}:{self._owner_suffix}"
+            if not self._try_acquire_refresh(owner):
+                # Otro worker está renovando: esperar a que publique el token
+                wait_until = time.monotonic() + TokenStoreConfig.REFRESH_LEASE
+                if deadline is not None:
+                    wait_until = min(wait_until, deadline.expires_at)
+                while time.monotonic() < wait_until:
+                    time.sleep(0.2)
+                    if self._adopt_stored_token(stale_token):
+                        return True
+                    if self._try_acquire_refresh(owner):
+                        break
+                if deadline is not None and deadline.expired():
+                    return False
+
+            try:
+                return self.refresh_token(deadline)
+            finally:
+                self._release_refresh(owner)
+        finally:
+            self._refresh_lock.release()
+
+    def _try_acquire_refresh(self, owner: str) -> bool:
+        """Reserva la renovación en el almacén (si el almacén falla, renueva localmente)"""
+        try:
+            return self.store.try_acquire_refresh(self.store_key, owner, TokenStoreConfig.REFRESH_LEASE)
+        except Exception as e:
+            logger.warning(f"No se pudo reservar la renovación de {self.store_key}: {e}")
+            return True
+
+    def _release_refresh(self, owner: str):
+        """Libera la reserva de renovación en el almacén"""
+        try:
+            self.store.release_refresh(self.store_key, owner)
+        except Exception as e:
+            logger.warning(f"No se pudo liberar la renovación de {self.store_key}: {e}")
+
+    def _ensure_refresher(self):
+        """Inicia el hilo de renovación proactiva si no existe en este proceso"""
+        pid = os.getpid()
+        if self._refresher is not None and self._refresher_pid == pid and self._refresher.is_alive():
+            return
+
+        with self._state_lock:
+            if self._refresher is None or self._refresher_pid != pid or not self._refresher.is_alive():
+                self._refresher = threading.Thread(
+                    target=self._run_refresher,
+                    name=f"{self.store_key}-auth-refresher",
+                    daemon=True
+                )
+                self._refresher_pid = pid
+                self._refresher.start()
+
+    def _run_refresher(self):
+        """Bucle del hilo: renueva el token antes de que expire"""
+        while True:
+            refresh_at = self.refresh_at
+            if self.token is not None and refresh_at is not None:
+                wait = refresh_at - time.monotonic()
+                if wait > 0:
+                    self._wakeup.wait(wait)
+                    self._wakeup.clear()
+                    continue
+
+            wait = self._retry_after - time.monotonic()
+            if wait > 0:
+                self._wakeup.wait(wait)
+                self._wakeup.clear()
+                continue
+
+            self._refresh_single_flight(self.token)
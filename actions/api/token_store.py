@@ -0,0 +1,192 @@
+"""
+Almacenes de tokens compartidos entre workers del action server
+
+Permiten que varios procesos (o réplicas) reutilicen el mismo token y que
+solo uno de ellos haga login cuando hay que renovarlo. Los vencimientos se
+guardan en tiempo de pared (time.time()) para que sean comparables entre
+procesos; cada proceso los convierte a su reloj monotónico local.
+"""
+import os
+import time
+import sqlite3
+import threading
+import importlib
+import logging
+from abc import ABC, abstractmethod
+from typing import Dict, Optional, Tuple
+from dotenv import load_dotenv
+from actions.utils.data_dir import ensure_parent_dir
+
+# Cargar variables de entorno
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+# (token, expires_at, refresh_at) en segundos epoch
+StoredToken = Tuple[str, float, float]
+
+
+class TokenStoreConfig:
+    """Configuración del almacén de tokens"""
+
+    # 'memory' (por proceso), 'sqlite' (compartido en el host) o 'paquete.modulo:Clase'
+    BACKEND = os.getenv('TOKEN_STORE_BACKEND', 'memory')
+
+    # Archivo SQLite compartido por los workers del host (obligatorio con
+    # 'sqlite'). Guarda los bearer tokens en texto plano: debe estar en un
+    # volumen privado del servicio; el archivo se crea con permisos 0600
+    PATH = os.getenv('TOKEN_STORE_PATH', '')
+
+    # Segundos que un worker reserva la renovación de un token
+    REFRESH_LEASE = float(os.getenv('TOKEN_STORE_REFRESH_LEASE', '35'))
+
+
+class TokenStore(ABC):
+    """
+    Interfaz de almacén de tokens
+
+    Una implementación en red (p. ej. Redis con SET NX PX para la reserva)
+    solo necesita implementar estos métodos y configurarse con
+    TOKEN_STORE_BACKEND='paquete.modulo:Clase'.
+    """
+
+    @abstractmethod
+    def get(self, name: str) -> Optional[StoredToken]:
+        """Token guardado bajo name o None"""
+
+    @abstractmethod
+    def put(self, name: str, token: str, expires_at: float, refresh_at: float):
+        """Guarda el token vigente bajo name"""
+
+    @abstractmethod
+    def try_acquire_refresh(self, name: str, owner: str, lease: float) -> bool:
+        """Reserva la renovación de name para owner durante lease segundos"""
+
+    @abstractmethod
+    def release_refresh(self, name: str, owner: str):
+        """Libera la reserva de renovación si pertenece a owner"""
+
+
+class MemoryTokenStore(TokenStore):
+    """Almacén en memoria del proceso (sin compartir entre workers)"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._tokens: Dict[str, StoredToken] = {}
+        self._leases: Dict[str, Tuple[str, float]] = {}
+
+    def get(self, name: str) -> Optional[StoredToken]:
+        with self._lock:
+            return self._tokens.get(name)
+
+    def put(self, name: str, token: str, expires_at: float, refresh_at: float):
+        with self._lock:
+            self._tokens[name] = (token, expires_at, refresh_at)
+
+    def try_acquire_refresh(self, name: str, owner: str, lease: float) -> bool:
+        now = time.time()
+        with self._lock:
+            current = self._leases.get(name)
+            if current and current[0] != owner and current[1] > now:
+                return False
+            self._leases[name] = (owner, now + lease)
+            return True
+
+    def release_refresh(self, name: str, owner: str):
+        with self._lock:
+            current = self._leases.get(name)
+            if current and current[0] == owner:
+                del self._leases[name]
+
+
+class SQLiteTokenStore(TokenStore):
+    """
+    Almacén en un archivo SQLite compartido por los workers del host
+
+    Los tokens quedan en texto plano en el archivo: se crea legible solo por
+    el usuario del proceso (0600; SQLite usa los mismos permisos para los
+    archivos -wal y -shm) y debe ubicarse en un volumen privado.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+        self._pid = None
+
+    def _connection(self) -> sqlite3.Connection:
+        """Conexión del proceso actual (se reabre tras un fork). Llamar con _lock tomado"""
+        pid = os.getpid()
+        if self._conn is None or self._pid != pid:
+            ensure_parent_dir(self.path)
+            # Crear el archivo con permisos 0600 antes de que SQLite lo abra
+            os.close(os.open(self.path, os.O_CREAT | os.O_RDWR, 0o600))
+            os.chmod(self.path, 0o600)
+            conn = sqlite3.connect(self.path, timeout=10, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS tokens ("
+                "name TEXT PRIMARY KEY, token TEXT NOT NULL, expires_at REAL NOT NULL, refresh_at REAL NOT NULL)"
+            )
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS refresh_leases ("
+                "name TEXT PRIMARY KEY, owner TEXT NOT NULL, expires_at REAL NOT NULL)"
+            )
+            self._conn = conn
+            self._pid = pid
+        return self._conn
+
+    def get(self, name: str) -> Optional[StoredToken]:
+        with self._lock:
+            row = self._connection().execute(
+                "SELECT token, expires_at, refresh_at FROM tokens WHERE name = ?", (name,)
+            ).fetchone()
+        return tuple(row) if row else None
+
+    def put(self, name: str, token: str, expires_at: float, refresh_at: float):
+        with self._lock:
+            self._connection().execute(
+                "INSERT OR REPLACE INTO tokens (name, token, expires_at, refresh_at) VALUES (?, ?, ?, ?)",
+                (name, token, expires_at, refresh_at)
+            )
+
+    def try_acquire_refresh(self, name: str, owner: str, lease: float) -> bool:
+        now = time.time()
+        with self._lock:
+            cursor = self._connection().execute(
+                "INSERT INTO refresh_leases (name, owner, expires_at) VALUES (?, ?, ?) "
+                "ON CONFLICT(name) DO UPDATE SET owner = excluded.owner, expires_at = excluded.expires_at "
+                "WHERE refresh_leases.owner = excluded.owner OR refresh_leases.expires_at <= ?",
+                (name, owner, now + lease, now)
+            )
+            return cursor.rowcount > 0
+
+    def release_refresh(self, name: str, owner: str):
+        with self._lock:
+            self._connection().execute(
+                "DELETE FROM refresh_leases WHERE name = ? AND owner = ?", (name, owner)
+            )
+
+
+def create_token_store(backend: str, path: str) -> TokenStore:
+    """Crea el almacén configurado; ante un error usa memoria del proceso"""
+    try:
+        if backend == 'memory':
+            return MemoryTokenStore()
+        if backend == 'sqlite':
+            if not path:
+                raise ValueError("TOKEN_STORE_PATH es obligatorio con TOKEN_STORE_BACKEND='sqlite'")
+            store = SQLiteTokenStore(path)
+            store.get("__healthcheck__")
+            return store
+
+        module_name, _, class_name = backend.partition(':')
+        return getattr(importlib.import_module(module_name), class_name)()
+
+    except Exception as e:
+        logger.error(f"No se pudo crear el almacén de tokens '{backend}', usando memoria: {e}")
+        return MemoryTokenStore()
+
+
+# Instancia global del almacén de tokens
+token_store = create_token_store(TokenStoreConfig.BACKEND, TokenStoreConfig.PATH)
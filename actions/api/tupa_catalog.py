@@ -0,0 +1,144 @@
+"""
+Catálogo en memoria de requisitos del TUPA por trámite
+
+Los requisitos de cada trámite (título -> ivalor -> texto del TUPA) cambian
+pocas veces al año: se precargan al iniciar el action server para todos los
+trámites registrados, se refrescan periódicamente en segundo plano y la
+respuesta al usuario sale de memoria sin llamadas al SAT. Si un trámite aún
+no está cargado se consulta en línea y se agrega. Si el SAT cae, los
+requisitos ya cargados se siguen sirviendo.
+"""
+import copy
+import os
+import threading
+import time
+import logging
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+from actions.utils.metrics import metrics
+from .rate_limiter import background_priority
+from .sat_config import SATConfig
+
+logger = logging.getLogger(__name__)
+
+# (tipo_tramite, título del trámite)
+TramiteKey = Tuple[str, str]
+
+
+class TupaCatalog:
+    """Índice (tipo, título) -> {ivalor, texto}, con refresco en un hilo de fondo"""
+
+    def __init__(self, refresh_seconds: float, retry_seconds: float):
+        self.refresh_seconds = refresh_seconds
+        self.retry_seconds = retry_seconds
+        # Se reemplaza entero al refrescar; las lecturas no necesitan lock
+        self._index: Dict[TramiteKey, Dict[str, Any]] = {}
+        self._titles: List[TramiteKey] = []
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._fetch: Optional[Callable[[str, str], Optional[Dict[str, Any]]]] = None
+        self._worker: Optional[threading.Thread] = None
+        self._pid = None
+        self.loaded_at: Optional[float] = None
+
+    def get(self, tipo_tramite: str, titulo: str) -> Optional[str]:
+        """Texto de requisitos guardado para el trámite o None si no está en el índice"""
+        entry = self._index.get((tipo_tramite, titulo))
+        if entry is None:
+            metrics.increment("tupa_catalog.misses")
+            return None
+        metrics.increment("tupa_catalog.hits")
+        return entry["texto"]
+
+    def put(self, tipo_tramite: str, titulo: str, entry: Optional[Dict[str, Any]]):
+        """Agrega al índice los requisitos obtenidos de la red (los vacíos se ignoran)"""
+        if not entry or not entry.get("texto"):
+            return
+        with self._lock:
+            index = dict(self._index)
+            index[(tipo_tramite, titulo)] = copy.deepcopy(entry)
+            self._index = index
+        metrics.set_gauge("tupa_catalog.entries", len(self._index))
+
+    def __contains__(self, key: TramiteKey) -> bool:
+        return key in self._index
+
+    def __len__(self) -> int:
+        return len(self._index)
+
+    def start(self, titles: Iterable[TramiteKey], fetch: Callable[[str, str], Optional[Dict[str, Any]]]):
+        """
+        Registra trámites e inicia la precarga y el refresco periódico en segundo plano
+
+        Args:
+            titles: Pares (tipo_tramite, título) de los actions de requisitos
+            fetch: Consulta de red de un trámite (menú + TUPA, sin pasar por el catálogo)
+        """
+        if not SATConfig.TUPA_CATALOG_PRELOAD:
+            return
+
+        self._fetch = fetch
+        with self._lock:
+            added = [key for key in titles if key not in self._titles]
+            self._titles.extend(added)
+
+            pid = os.getpid()
+            if self._worker is None or self._pid != pid or not self._worker.is_alive():
+                self._worker = threading.Thread(
+                    target=self._run,
+                    name="tupa-catalog-refresher",
+                    daemon=True
+                )
+                self._pid = pid
+                self._worker.start()
+            elif added:
+                # Trámites de otro módulo registrados con el hilo ya en marcha
+                self._wake.set()
+
+    def _run(self):
+        """Bucle del hilo: recarga los trámites y espera al próximo refresco"""
+        while True:
+            self._wake.clear()
+            try:
+                self.refresh()
+            except Exception as e:
+                logger.error(f"Error refrescando el catálogo del TUPA: {e}")
+            # Si quedan trámites sin cargar, reintentar antes del refresco normal
+            complete = all(key in self._index for key in self._titles)
+            self._wake.wait(self.refresh_seconds if complete else self.retry_seconds)
+
+    def refresh(self) -> int:
+        """
+        Consulta los requisitos de todos los trámites registrados y publica el nuevo índice
+
+        Los trámites que fallan conservan sus requisitos anteriores.
+
+        Returns:
+            int: Trámites obtenidos del SAT en esta pasada
+        """
+        started = time.monotonic()
+        titles = list(self._titles)
+        fresh: Dict[TramiteKey, Dict[str, Any]] = {}
+
+        with background_priority():
+            for tipo_tramite, titulo in titles:
+                entry = self._fetch(titulo, tipo_tramite)
+                if entry and entry.get("texto"):
+                    fresh[(tipo_tramite, titulo)] = entry
+
+        with self._lock:
+            index = dict(self._index)
+            index.update(fresh)
+            self._index = index
+        self.loaded_at = time.time()
+
+        metrics.set_gauge("tupa_catalog.entries", len(self._index))
+        metrics.observe("tupa_catalog.refresh_ms", (time.monotonic() - started) * 1000)
+        logger.info(f"Catálogo del TUPA refrescado: {len(fresh)}/{len(titles)} trámites")
+        return len(fresh)
+
+
+# Instancia global del catálogo de requisitos del TUPA
+tupa_catalog = TupaCatalog(
+    refresh_seconds=SATConfig.TUPA_CATALOG_REFRESH_SECONDS,
+    retry_seconds=SATConfig.TUPA_CATALOG_RETRY_SECONDS
+)
@@ -8,11 +8,18 @@ from rasa_sdk.events import SlotSet
 import logging
 import re
 
+from actions.api.async_sat_client import async_sat_client
 from actions.api.sat_client import sat_client
-from actions.api.backend_client import backend_client
+from actions.api.falta_catalog import falta_catalog
+from actions.utils.deadline import Deadline
+from actions.api.query_logger import bot_query_logger
+from actions.handlers.shared.admission import document_query_admission
 
 logger = logging.getLogger(__name__)
 
+# Refrescar el catálogo de faltas en segundo plano desde el arranque del action server
+falta_catalog.start(sat_client.fetch_codigo_falta)
+
 class CodigoProcessor:
     """Procesador de códigos de falta"""
 
@@ -68,9 +75,9 @@ class ActionConsultarCodigoFalta(Action):
     def name(self) -> Text:
         return "action_consultar_codigo_falta"
 
-    def run(self, dispatcher: CollectingDispatcher,
-            tracker: Tracker,
-            domain: Dict[Text, Any]) -> List[Dict[Text, Any]]:
+    async def run(self, dispatcher: CollectingDispatcher,
+                  tracker: Tracker,
+                  domain: Dict[Text, Any]) -> List[Dict[Text, Any]]:
 
         logger.info("Iniciando consulta de código de falta")
 
@@ -86,11 +93,25 @@ class ActionConsultarCodigoFalta(Action):
         if not es_valido:
             return self._handle_invalid_codigo(dispatcher, codigo)
 
-        # 3. Ejecutar consulta API directamente
+        # 3. Los códigos del catálogo en memoria no esperan al SAT ni pasan por el control de admisión
+        if codigo_limpio in falta_catalog:
+            logger.info(f"Consultando código en catálogo: {codigo_limpio}")
+            return await self._execute_codigo_api_query(dispatcher, tracker, codigo_limpio)
+
+        # 4. Ejecutar consulta API directamente
+        # Con el servidor sobrecargado se responde de inmediato en lugar de encolar la consulta
+        ticket = document_query_admission.try_admit()
+        if ticket is None:
+            self._handle_api_error(dispatcher, codigo_limpio)
+            return []
+
         logger.info(f"Consultando código: {codigo_limpio}")
-        return self._execute_codigo_api_query(dispatcher, tracker, codigo_limpio)
+        try:
+            return await self._execute_codigo_api_query(dispatcher, tracker, codigo_limpio)
+        finally:
+            document_query_admission.release(ticket)
 
-    def _execute_codigo_api_query(self, dispatcher: CollectingDispatcher,
+    async def _execute_codigo_api_query(self, dispatcher: CollectingDispatcher,
                                   tracker: Tracker,
                                   codigo: str) -> List[Dict[Text, Any]]:
         """Ejecuta consulta a la API de códigos"""
@@ -98,18 +119,17 @@ class ActionConsultarCodigoFalta(Action):
         dispatcher.utter_message(text=f"🔍 Consultando información del código **{codigo}**...")
 
         try:
-            resultado = sat_client.consultar_codigo_falta(codigo)
-
-            # Registrar consulta de la conversación en el backend (no bloqueante)
-            try:
-                backend_client.log_bot_query(
-                    phone_number=tracker.sender_id,
-                    query_type='infraction_code',
-                    document_type='infraction_code',
-                    document_value=codigo
-                )
-            except Exception as e:
-                logger.warning(f"No se pudo registrar consulta en backend: {e}")
+            # Plazo común para las llamadas externas del action (respuesta antes que Rasa core corte)
+            deadline = Deadline.for_action()
+            resultado = await async_sat_client.consultar_codigo_falta(codigo, deadline=deadline)
+
+            # Registrar consulta de la conversación en el backend en segundo plano (no bloqueante)
+            bot_query_logger.submit(
+                phone_number=tracker.sender_id,
+                query_type='infraction_code',
+                document_type='infraction_code',
+                document_value=codigo
+            )
 
             # Procesar resultado de la API del SAT
             if resultado and isinstance(resultado, dict) and resultado:
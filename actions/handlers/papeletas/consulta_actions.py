@@ -8,8 +8,10 @@ from rasa_sdk.events import SlotSet
 import logging
 import re
 
-from actions.api.sat_client import sat_client
-from actions.api.backend_client import backend_client
+from actions.api.async_sat_client import async_sat_client
+from actions.utils.deadline import Deadline
+from actions.api.query_logger import bot_query_logger
+from actions.handlers.shared.admission import document_query_admission
 
 logger = logging.getLogger(__name__)
 
@@ -89,9 +91,9 @@ class ActionConsultarPapeletas(Action):
     def name(self) -> Text:
         return "action_consultar_papeletas"
 
-    def run(self, dispatcher: CollectingDispatcher,
-            tracker: Tracker,
-            domain: Dict[Text, Any]) -> List[Dict[Text, Any]]:
+    async def run(self, dispatcher: CollectingDispatcher,
+                  tracker: Tracker,
+                  domain: Dict[Text, Any]) -> List[Dict[Text, Any]]:
 
         logger.info("Iniciando consulta de papeletas")
 
@@ -108,10 +110,19 @@ class ActionConsultarPapeletas(Action):
             return self._handle_invalid_document(dispatcher, tipo, documento)
 
         # 3. Ejecutar consulta API directamente
+        # Con el servidor sobrecargado se responde de inmediato en lugar de encolar la consulta
+        ticket = document_query_admission.try_admit()
+        if ticket is None:
+            self._handle_api_error(dispatcher, tipo, documento_limpio)
+            return []
+
         logger.info(f"Consultando {tipo}: {documento_limpio}")
-        return self._execute_api_query(dispatcher, tracker, documento_limpio, tipo)
+        try:
+            return await self._execute_api_query(dispatcher, tracker, documento_limpio, tipo)
+        finally:
+            document_query_admission.release(ticket)
 
-    def _execute_api_query(self, dispatcher: CollectingDispatcher,
+    async def _execute_api_query(self, dispatcher: CollectingDispatcher,
                            tracker: Tracker,
                            documento: str, tipo: str) -> List[Dict[Text, Any]]:
         """Ejecuta consulta a la API del SAT"""
@@ -132,26 +143,26 @@ class ActionConsultarPapeletas(Action):
                 'ruc': 'ruc'
             }
 
+            # Plazo común para las llamadas externas del action (respuesta antes que Rasa core corte)
+            deadline = Deadline.for_action()
+
             # Llamar API según tipo
             if tipo == "placa":
-                resultado = sat_client.consultar_papeletas_por_placa(documento)
+                resultado = await async_sat_client.consultar_papeletas_por_placa(documento, deadline=deadline)
             elif tipo == "dni":
-                resultado = sat_client.consultar_papeletas_por_dni(documento)
+                resultado = await async_sat_client.consultar_papeletas_por_dni(documento, deadline=deadline)
             elif tipo == "ruc":
-                resultado = sat_client.consultar_papeletas_por_ruc(documento)
+                resultado = await async_sat_client.consultar_papeletas_por_ruc(documento, deadline=deadline)
             else:
                 return self._handle_api_error(dispatcher, tipo, documento)
 
-            # Registrar consulta de la conversación en el backend (no bloqueante)
-            try:
-                backend_client.log_bot_query(
-                    phone_number=tracker.sender_id,
-                    query_type=query_type_map.get(tipo, tipo),
-                    document_type=document_type_map.get(tipo, tipo),
-                    document_value=documento
-                )
-            except Exception as e:
-                logger.warning(f"No se pudo registrar consulta en backend: {e}")
+            # Registrar consulta de la conversación en el backend en segundo plano (no bloqueante)
+            bot_query_logger.submit(
+                phone_number=tracker.sender_id,
+                query_type=query_type_map.get(tipo, tipo),
+                document_type=document_type_map.get(tipo, tipo),
+                document_value=documento
+            )
 
             # Procesar resultado de la API del SAT
             if resultado is not None:
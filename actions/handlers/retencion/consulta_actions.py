@@ -8,8 +8,10 @@ from rasa_sdk.events import SlotSet
 import logging
 import re
 
-from actions.api.sat_client import sat_client
-from actions.api.backend_client import backend_client
+from actions.api.async_sat_client import async_sat_client
+from actions.utils.deadline import Deadline
+from actions.api.query_logger import bot_query_logger
+from actions.handlers.shared.admission import document_query_admission
 
 logger = logging.getLogger(__name__)
 
@@ -71,9 +73,9 @@ class ActionConsultarOrdenCaptura(Action):
     def name(self) -> Text:
         return "action_consultar_orden_captura"
 
-    def run(self, dispatcher: CollectingDispatcher,
-            tracker: Tracker,
-            domain: Dict[Text, Any]) -> List[Dict[Text, Any]]:
+    async def run(self, dispatcher: CollectingDispatcher,
+                  tracker: Tracker,
+                  domain: Dict[Text, Any]) -> List[Dict[Text, Any]]:
 
         logger.info("Iniciando consulta de orden de captura")
 
@@ -90,10 +92,19 @@ class ActionConsultarOrdenCaptura(Action):
             return self._handle_invalid_placa(dispatcher, placa)
 
         # 3. Ejecutar consulta API
+        # Con el servidor sobrecargado se responde de inmediato en lugar de encolar la consulta
+        ticket = document_query_admission.try_admit()
+        if ticket is None:
+            self._handle_api_error(dispatcher, placa_limpia)
+            return []
+
         logger.info(f"Consultando orden de captura para placa: {placa_limpia}")
-        return self._execute_api_query(dispatcher, tracker, placa_limpia)
+        try:
+            return await self._execute_api_query(dispatcher, tracker, placa_limpia)
+        finally:
+            document_query_admission.release(ticket)
 
-    def _execute_api_query(self, dispatcher: CollectingDispatcher,
+    async def _execute_api_query(self, dispatcher: CollectingDispatcher,
                           tracker: Tracker,
                           placa: str) -> List[Dict[Text, Any]]:
         """Ejecuta consulta a la API de órdenes de captura"""
@@ -101,18 +112,17 @@ class ActionConsultarOrdenCaptura(Action):
         dispatcher.utter_message(text=f"🔍 Consultando órdenes de captura para placa **{placa}**...")
 
         try:
-            resultado = sat_client.consultar_orden_captura_por_placa(placa)
-
-            # Registrar consulta de la conversación en el backend (no bloqueante)
-            try:
-                backend_client.log_bot_query(
-                    phone_number=tracker.sender_id,
-                    query_type='capture_order_by_plate',
-                    document_type='plate',
-                    document_value=placa
-                )
-            except Exception as e:
-                logger.warning(f"No se pudo registrar consulta en backend: {e}")
+            # Plazo común para las llamadas externas del action (respuesta antes que Rasa core corte)
+            deadline = Deadline.for_action()
+            resultado = await async_sat_client.consultar_orden_captura_por_placa(placa, deadline=deadline)
+
+            # Registrar consulta de la conversación en el backend en segundo plano (no bloqueante)
+            bot_query_logger.submit(
+                phone_number=tracker.sender_id,
+                query_type='capture_order_by_plate',
+                document_type='plate',
+                document_value=placa
+            )
 
             # Procesar resultado de la API del SAT
             if resultado is not None:
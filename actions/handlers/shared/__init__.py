@@ -6,4 +6,7 @@ Actions que se utilizan transversalmente:
 - advisor.py: Solicitud de asesor humano
 - fallback.py: Fallback progresivo inteligente
 - router.py: Router para disambiguar consultas (papeletas vs impuestos)
+- sync_offload.py: Pool de hilos acotado para actions síncronos heredados
+- admission.py: Control de admisión (load shedding) de las consultas de documentos
+- chaining.py: Ejecución de un action destino en el mismo request (sin FollowupAction)
 """
\ No newline at end of file
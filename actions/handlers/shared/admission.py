@@ -0,0 +1,118 @@
+"""
+Control de admisión (load shedding) para los actions de consulta de documentos
+
+Cuando hay demasiadas consultas en curso, el SAT ya tiene su cupo de
+peticiones ocupado o las consultas recientes están tardando demasiado, las
+nuevas consultas se responden de inmediato con el mensaje de error del
+action en lugar de encolarse hasta que todo venza. Los actions de
+información estática no pasan por aquí y se siguen atendiendo.
+"""
+import os
+import threading
+import time
+import logging
+from collections import deque
+from typing import Optional
+from dotenv import load_dotenv
+
+from actions.api.bulkhead import sat_bulkheads
+from actions.utils.metrics import metrics
+
+# Cargar variables de entorno
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+
+class AdmissionConfig:
+    """Configuración del control de admisión"""
+
+    # Consultas de documentos en curso como máximo en el proceso
+    MAX_INFLIGHT = int(os.getenv('ADMISSION_MAX_INFLIGHT', '40'))
+
+    # Fracción del cupo total del bulkhead del SAT a partir de la cual se rechaza
+    SAT_PENDING_RATIO = float(os.getenv('ADMISSION_SAT_PENDING_RATIO', '0.9'))
+
+    # Si el percentil 95 de las últimas consultas supera TARGET_LATENCY_MS, el
+    # máximo de consultas en curso baja a DEGRADED_MAX_INFLIGHT; las admitidas
+    # siguen midiendo la latencia, así que el límite se recupera solo
+    TARGET_LATENCY_MS = float(os.getenv('ADMISSION_TARGET_LATENCY_MS', '8000'))
+    DEGRADED_MAX_INFLIGHT = int(os.getenv('ADMISSION_DEGRADED_MAX_INFLIGHT', '8'))
+    LATENCY_WINDOW = int(os.getenv('ADMISSION_LATENCY_WINDOW', '50'))
+    LATENCY_MIN_SAMPLES = int(os.getenv('ADMISSION_LATENCY_MIN_SAMPLES', '10'))
+
+
+class AdmissionController:
+    """Decide si una consulta nueva se atiende o se rechaza por sobrecarga"""
+
+    def __init__(self, name: str, max_inflight: int, sat_pending_ratio: float, target_latency_ms: float,
+                 degraded_max_inflight: int, latency_window: int, latency_min_samples: int):
+        self.name = name
+        self.max_inflight = max_inflight
+        self.sat_pending_ratio = sat_pending_ratio
+        self.target_latency_ms = target_latency_ms
+        self.degraded_max_inflight = degraded_max_inflight
+        self.latency_min_samples = latency_min_samples
+        self._latencies = deque(maxlen=latency_window)
+        self._inflight = 0
+        self._lock = threading.Lock()
+
+    def _recent_p95(self) -> Optional[float]:
+        """Percentil 95 de las últimas consultas (llamar con _lock tomado)"""
+        if len(self._latencies) < self.latency_min_samples:
+            return None
+        ordered = sorted(self._latencies)
+        return ordered[int(0.95 * (len(ordered) - 1))]
+
+    def _overload_reason(self) -> Optional[str]:
+        """Motivo para rechazar una consulta nueva o None (llamar con _lock tomado)"""
+        limit = self.max_inflight
+        p95 = self._recent_p95()
+        if p95 is not None and p95 > self.target_latency_ms:
+            limit = min(limit, self.degraded_max_inflight)
+        if self._inflight >= limit:
+            return f"{self._inflight} consultas en curso (límite {limit}, p95 {p95 or 0:.0f} ms)"
+
+        sat = sat_bulkheads.upstream
+        if sat.in_use >= sat.limit * self.sat_pending_ratio:
+            return f"{sat.in_use}/{sat.limit} peticiones al SAT en curso"
+        return None
+
+    def try_admit(self) -> Optional[float]:
+        """
+        Intenta admitir una consulta
+
+        Returns:
+            Instante de inicio (para pasarlo a release() al terminar) o None si se rechaza
+        """
+        with self._lock:
+            reason = self._overload_reason()
+            if reason is None:
+                self._inflight += 1
+                metrics.set_gauge(f"admission.{self.name}.inflight", self._inflight)
+                return time.monotonic()
+
+        metrics.increment(f"admission.{self.name}.shed")
+        logger.warning(f"Sobrecarga en {self.name}, consulta rechazada: {reason}")
+        return None
+
+    def release(self, started: float):
+        """Marca el fin de una consulta admitida y registra su duración"""
+        elapsed_ms = (time.monotonic() - started) * 1000
+        with self._lock:
+            self._inflight -= 1
+            self._latencies.append(elapsed_ms)
+            metrics.set_gauge(f"admission.{self.name}.inflight", self._inflight)
+        metrics.observe(f"admission.{self.name}.latency_ms", elapsed_ms)
+
+
+# Instancia global para los actions de consulta de documentos
+document_query_admission = AdmissionController(
+    "document_query",
+    max_inflight=AdmissionConfig.MAX_INFLIGHT,
+    sat_pending_ratio=AdmissionConfig.SAT_PENDING_RATIO,
+    target_latency_ms=AdmissionConfig.TARGET_LATENCY_MS,
+    degraded_max_inflight=AdmissionConfig.DEGRADED_MAX_INFLIGHT,
+    latency_window=AdmissionConfig.LATENCY_WINDOW,
+    latency_min_samples=AdmissionConfig.LATENCY_MIN_SAMPLES
+)
@@ -2,33 +2,38 @@
 Actions relacionados con solicitud de asesor humano
 """
 from typing import Any, Text, Dict, List
-from rasa_sdk import Action, Tracker
+from rasa_sdk import Tracker
 from rasa_sdk.executor import CollectingDispatcher
 from rasa_sdk.events import SlotSet
 import logging
 
-from actions.api.backend_client import backend_client
+from actions.api.backend_outbox import backend_outbox
+from actions.handlers.shared.sync_offload import SyncOffloadAction
 
 logger = logging.getLogger(__name__)
 
 
-class ActionSolicitarAsesor(Action):
+class ActionSolicitarAsesor(SyncOffloadAction):
     """Solicita un asesor humano para atender al ciudadano"""
 
     def name(self) -> Text:
         return "action_solicitar_asesor"
 
-    def run(self, dispatcher: CollectingDispatcher,
-            tracker: Tracker,
-            domain: Dict[Text, Any]) -> List[Dict[Text, Any]]:
+    def run_sync(self, dispatcher: CollectingDispatcher,
+                 tracker: Tracker,
+                 domain: Dict[Text, Any]) -> List[Dict[Text, Any]]:
 
         phone_number = tracker.sender_id
 
         logger.info(f"Usuario {phone_number} solicita asesor humano")
 
         try:
-            # Llamar al endpoint para solicitar asesor
-            success, message = backend_client.request_advisor(phone_number)
+            # Registrar la solicitud en el outbox (se entrega en segundo plano)
+            success, message = backend_outbox.submit(
+                "request_advisor",
+                {"phone_number": phone_number},
+                ordering_key=phone_number
+            )
 
             if success:
                 # Éxito: El bot debe dejar de responder después de este mensaje
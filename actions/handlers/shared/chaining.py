@@ -0,0 +1,56 @@
+"""
+Encadenamiento de actions dentro del mismo request al action server
+
+En lugar de devolver FollowupAction (que obliga a Rasa core a predecir y
+hacer otra llamada al action server), un action puede ejecutar la lógica
+del action destino directamente sobre una copia del tracker con sus propios
+eventos ya aplicados. Se devuelven los eventos de ambos actions.
+"""
+from typing import Any, Text, Dict, List, Optional
+from rasa_sdk import Action, Tracker
+from rasa_sdk.executor import CollectingDispatcher
+import logging
+import time
+
+from actions.utils.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+
+def apply_events(tracker: Tracker, events: List[Dict[Text, Any]],
+                 entities: Optional[List[Dict[Text, Any]]] = None) -> Tracker:
+    """
+    Copia del tracker con los SlotSet de events aplicados
+
+    Args:
+        tracker: Tracker del request actual (no se modifica)
+        events: Eventos devueltos por el action que encadena
+        entities: Entities a agregar al último mensaje de la copia (opcional)
+    """
+    chained = tracker.copy()
+    for event in events:
+        if event.get("event") == "slot":
+            chained.slots[event["name"]] = event.get("value")
+    if entities:
+        chained.latest_message["entities"] = list(entities) + chained.latest_message.get("entities", [])
+    chained.events.extend(events)
+    return chained
+
+
+async def run_chained(action: Action, dispatcher: CollectingDispatcher, tracker: Tracker,
+                      domain: Dict[Text, Any], events: List[Dict[Text, Any]],
+                      entities: Optional[List[Dict[Text, Any]]] = None) -> List[Dict[Text, Any]]:
+    """
+    Ejecuta action en el mismo request, después de los eventos del action actual
+
+    Returns:
+        Eventos del action actual seguidos de los del action encadenado
+    """
+    chained = apply_events(tracker, events, entities)
+    started = time.monotonic()
+
+    chained_events = await action.run(dispatcher, chained, domain)
+
+    metrics.observe(f"chained_actions.{action.name()}.latency_ms", (time.monotonic() - started) * 1000)
+    logger.debug(f"Action {action.name()} ejecutado en el mismo request")
+    return list(events) + list(chained_events or [])
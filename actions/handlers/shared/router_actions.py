@@ -4,28 +4,39 @@ Router inteligente para disambiguar entre papeletas e impuestos
 from typing import Any, Text, Dict, List, Optional, Tuple
 from rasa_sdk import Action, Tracker
 from rasa_sdk.executor import CollectingDispatcher
-from rasa_sdk.events import SlotSet, FollowupAction
+from rasa_sdk.events import SlotSet
 import logging
 
+from actions.api.async_sat_client import async_sat_client
+from actions.handlers.papeletas.consulta_actions import ActionConsultarPapeletas
+from actions.handlers.impuestos.consulta_actions import ActionConsultarImpuestos
+from actions.handlers.shared.chaining import run_chained
+
 logger = logging.getLogger(__name__)
 
 
 class ActionRouteDocumentConsultation(Action):
     """Router que decide entre papeletas e impuestos basado en contexto"""
 
+    def __init__(self):
+        super().__init__()
+        # Actions destino, ejecutados en el mismo request en lugar de con FollowupAction
+        self.papeletas_action = ActionConsultarPapeletas()
+        self.impuestos_action = ActionConsultarImpuestos()
+
     def name(self) -> Text:
         return "action_route_document_consultation"
 
-    def run(self, dispatcher: CollectingDispatcher,
-            tracker: Tracker,
-            domain: Dict[Text, Any]) -> List[Dict[Text, Any]]:
+    async def run(self, dispatcher: CollectingDispatcher,
+                  tracker: Tracker,
+                  domain: Dict[Text, Any]) -> List[Dict[Text, Any]]:
 
         logger.info("Iniciando router para consulta de documentos")
 
         # Verificar si hay clarificación pendiente
         esperando_clarificacion = tracker.get_slot("esperando_clarificacion")
         if esperando_clarificacion:
-            return self._process_clarification(dispatcher, tracker)
+            return await self._process_clarification(dispatcher, tracker, domain)
 
         # Extraer documento y tipo
         documento, tipo_doc = self._extract_document_data(tracker)
@@ -40,9 +51,9 @@ class ActionRouteDocumentConsultation(Action):
         logger.info(f"Contexto determinado: {context} para {tipo_doc} {documento}")
 
         if context == "papeletas":
-            return self._route_to_papeletas(tracker, documento, tipo_doc)
+            return await self._route_to_papeletas(dispatcher, tracker, domain, documento, tipo_doc)
         elif context == "impuestos":
-            return self._route_to_impuestos(tracker, documento, tipo_doc)
+            return await self._route_to_impuestos(dispatcher, tracker, domain, documento, tipo_doc)
         else:
             return self._ask_clarification(dispatcher, documento, tipo_doc)
 
@@ -147,33 +158,43 @@ class ActionRouteDocumentConsultation(Action):
 
         return None
 
-    def _route_to_papeletas(self, tracker: Tracker, documento: str, tipo_doc: str) -> List[Dict[Text, Any]]:
-        """Rutea a action de papeletas existente"""
+    async def _route_to_papeletas(self, dispatcher: CollectingDispatcher, tracker: Tracker,
+                                  domain: Dict[Text, Any], documento: str, tipo_doc: str) -> List[Dict[Text, Any]]:
+        """Rutea a action de papeletas existente (en el mismo request)"""
 
         logger.info(f"Ruteando a papeletas: {tipo_doc} {documento}")
 
-        return [
-            SlotSet("documento_consulta", documento),
-            SlotSet("tipo_documento", tipo_doc),
-            SlotSet("contexto_actual", "papeletas"),
-            SlotSet("esperando_clarificacion", False),
-            SlotSet("fallback_count", 0),
-            FollowupAction("action_consultar_papeletas")
-        ]
+        return await self._route(dispatcher, tracker, domain, documento, tipo_doc,
+                                 "papeletas", self.papeletas_action)
 
-    def _route_to_impuestos(self, tracker: Tracker, documento: str, tipo_doc: str) -> List[Dict[Text, Any]]:
-        """Rutea a action de impuestos nuevo"""
+    async def _route_to_impuestos(self, dispatcher: CollectingDispatcher, tracker: Tracker,
+                                  domain: Dict[Text, Any], documento: str, tipo_doc: str) -> List[Dict[Text, Any]]:
+        """Rutea a action de impuestos nuevo (en el mismo request)"""
 
         logger.info(f"Ruteando a impuestos: {tipo_doc} {documento}")
 
-        return [
+        return await self._route(dispatcher, tracker, domain, documento, tipo_doc,
+                                 "impuestos", self.impuestos_action)
+
+    async def _route(self, dispatcher: CollectingDispatcher, tracker: Tracker, domain: Dict[Text, Any],
+                     documento: str, tipo_doc: str, contexto: str, action: Action) -> List[Dict[Text, Any]]:
+        """
+        Fija los slots de la consulta y ejecuta el action destino sin FollowupAction
+
+        El action destino lee el documento de las entities del último mensaje,
+        así que en su copia del tracker se agrega el documento ruteado (tras
+        una clarificación el último mensaje solo dice "papeletas" o "impuestos").
+        """
+        events = [
             SlotSet("documento_consulta", documento),
             SlotSet("tipo_documento", tipo_doc),
-            SlotSet("contexto_actual", "impuestos"),
+            SlotSet("contexto_actual", contexto),
             SlotSet("esperando_clarificacion", False),
-            SlotSet("fallback_count", 0),
-            FollowupAction("action_consultar_impuestos")
+            SlotSet("fallback_count", 0)
         ]
+        entities = [{"entity": tipo_doc, "value": documento}]
+
+        return await run_chained(action, dispatcher, tracker, domain, events, entities)
 
     def _ask_clarification(self, dispatcher: CollectingDispatcher,
                            documento: str, tipo_doc: str) -> List[Dict[Text, Any]]:
@@ -181,6 +202,10 @@ class ActionRouteDocumentConsultation(Action):
 
         logger.info(f"Solicitando clarificación para: {tipo_doc} {documento}")
 
+        # Mientras el usuario responde, consultar la deuda del documento: papeletas
+        # e impuestos por placa/DNI/RUC usan la misma consulta y la toman de la caché
+        async_sat_client.prefetch_deuda(tipo_doc, documento)
+
         doc_display = {
             'placa': 'PLACA',
             'dni': 'DNI',
@@ -205,8 +230,8 @@ Responde:
             SlotSet("esperando_clarificacion", True)
         ]
 
-    def _process_clarification(self, dispatcher: CollectingDispatcher,
-                               tracker: Tracker) -> List[Dict[Text, Any]]:
+    async def _process_clarification(self, dispatcher: CollectingDispatcher,
+                                     tracker: Tracker, domain: Dict[Text, Any]) -> List[Dict[Text, Any]]:
         """Procesa la clarificación del usuario"""
 
         intent = tracker.latest_message['intent']['name']
@@ -223,18 +248,18 @@ Responde:
         # Palabras que indican papeletas
         if any(word in text for word in ['papeleta', 'multa', 'infraccion', 'transito']):
             logger.info(f"Clarificación recibida: papeletas para {tipo_doc} {documento}")
-            return self._route_to_papeletas(tracker, documento, tipo_doc)
+            return await self._route_to_papeletas(dispatcher, tracker, domain, documento, tipo_doc)
 
         # Palabras que indican impuestos
         elif any(word in text for word in ['impuesto', 'tributario', 'deuda', 'tributo', 'predial', 'vehicular']):
             logger.info(f"Clarificación recibida: impuestos para {tipo_doc} {documento}")
-            return self._route_to_impuestos(tracker, documento, tipo_doc)
+            return await self._route_to_impuestos(dispatcher, tracker, domain, documento, tipo_doc)
 
         # Intent específicos
         elif intent == "clarify_papeletas":
-            return self._route_to_papeletas(tracker, documento, tipo_doc)
+            return await self._route_to_papeletas(dispatcher, tracker, domain, documento, tipo_doc)
         elif intent == "clarify_impuestos":
-            return self._route_to_impuestos(tracker, documento, tipo_doc)
+            return await self._route_to_impuestos(dispatcher, tracker, domain, documento, tipo_doc)
 
         else:
             # Usuario no respondió claramente, pedir de nuevo
@@ -4,15 +4,75 @@ Actions relacionados con el manejo de sesión
 from typing import Any, Text, Dict, List
 from rasa_sdk import Action, Tracker
 from rasa_sdk.executor import CollectingDispatcher
-from rasa_sdk.events import Restarted
+from rasa_sdk.events import ActionExecuted, EventType, Restarted, SessionStarted, SlotSet
+import asyncio
 import logging
 import random
+import time
 from datetime import datetime
 
 from actions.api.backend_client import backend_client
+from actions.api.backend_config import BackendConfig
+from actions.api.async_backend_client import async_backend_client
+from actions.api.farewell_cache import farewell_cache
+from actions.api.backend_outbox import backend_outbox, OutboxConfig
+from actions.handlers.shared.sync_offload import ActionPoolFullError, sync_action_executor
+from actions.utils.deadline import Deadline
+from actions.utils.metrics import metrics
 
 logger = logging.getLogger(__name__)
 
+# Precargar los mensajes de despedida al iniciar el action server (hilo de fondo)
+farewell_cache.start(lambda category_id: backend_client.get_farewell_messages(category_id))
+
+
+class ActionSessionStart(Action):
+    """
+    Inicio de sesión con el mismo comportamiento que el action por defecto de Rasa
+
+    Arrastra los slots de la sesión anterior si session_config lo pide y
+    conserva session_started_metadata. Opcionalmente precarga en segundo
+    plano los datos del ciudadano (CITIZEN_PREFETCH_ON_SESSION_START).
+    """
+
+    # Slot donde Rasa deja la metadata del mensaje que inició la sesión
+    SESSION_START_METADATA_SLOT = "session_started_metadata"
+
+    def name(self) -> Text:
+        return "action_session_start"
+
+    @classmethod
+    def fetch_slots(cls, tracker: Tracker) -> List[EventType]:
+        """Slots de la sesión anterior, en el orden en que se fijaron"""
+        return [
+            SlotSet(event["name"], event.get("value"))
+            for event in tracker.applied_events()
+            if event.get("event") == "slot" and event.get("name") != cls.SESSION_START_METADATA_SLOT
+        ]
+
+    async def run(self, dispatcher: CollectingDispatcher,
+                  tracker: Tracker,
+                  domain: Dict[Text, Any]) -> List[Dict[Text, Any]]:
+
+        if BackendConfig.CITIZEN_PREFETCH_ON_SESSION_START:
+            # No se espera: la respuesta del saludo no depende de estos datos
+            async_backend_client.prefetch_citizen_data(tracker.sender_id)
+
+        # La sesión empieza con session_started; los slots arrastrados van después
+        events = [SessionStarted()]
+
+        session_config = domain.get("session_config") or {}
+        if session_config.get("carry_over_slots_to_new_session"):
+            events.extend(self.fetch_slots(tracker))
+
+        metadata = tracker.get_slot(self.SESSION_START_METADATA_SLOT)
+        if metadata:
+            events.append(SlotSet(self.SESSION_START_METADATA_SLOT, metadata))
+
+        # Un action_listen al final: sigue un mensaje del usuario
+        events.append(ActionExecuted("action_listen"))
+        return events
+
 
 class ActionFinalizarChat(Action):
     """Finaliza la conversación con mensaje dinámico"""
@@ -20,35 +80,81 @@ class ActionFinalizarChat(Action):
     def name(self) -> Text:
         return "action_finalizar_chat"
 
-    def run(self, dispatcher: CollectingDispatcher,
-            tracker: Tracker,
-            domain: Dict[Text, Any]) -> List[Dict[Text, Any]]:
+    async def run(self, dispatcher: CollectingDispatcher,
+                  tracker: Tracker,
+                  domain: Dict[Text, Any]) -> List[Dict[Text, Any]]:
 
         sender_id = tracker.sender_id
+        started = time.monotonic()
+        deadline = Deadline.for_action()
 
-        # Llamar endpoint de cierre antes del mensaje
-        self._close_assistance_if_exists(sender_id)
-
-        # Obtener mensaje de despedida dinámico del backend
+        # Mensaje de despedida desde la caché en memoria (sin llamadas a la red)
         mensaje = self._get_farewell_message()
 
+        # Lo único que se espera es el registro del cierre, acotado por el plazo
+        close_task = asyncio.ensure_future(self._close_assistance(sender_id))
+        await self._wait_close(close_task, sender_id, deadline)
+
         dispatcher.utter_message(text=mensaje)
 
+        metrics.observe("session.finalizar_chat_ms", (time.monotonic() - started) * 1000)
+
         # Log para el sistema
         logger.info(f"Conversación finalizada para usuario: {sender_id} - {datetime.now()}")
 
         return [Restarted()]
 
+    async def _wait_close(self, close_task: "asyncio.Future", sender_id: str, deadline: Deadline) -> None:
+        """
+        Espera el cierre de la asistencia como máximo hasta el plazo del action
+
+        Si el plazo se agota el cierre sigue en su hilo y el chat se despide igual.
+        """
+        try:
+            await asyncio.wait_for(asyncio.shield(close_task), deadline.remaining())
+        except asyncio.TimeoutError:
+            metrics.increment("session.close_assistance_timeouts")
+            logger.warning(f"Cierre de asistencia para {sender_id} sin completar al agotarse el plazo")
+
+    async def _close_assistance(self, phone_number: str) -> None:
+        """
+        Registra el cierre de la asistencia sin descartarlo nunca
+
+        Con el outbox habilitado el cierre es una escritura local en SQLite; se
+        hace en el executor por defecto del event loop porque puede esperar el
+        lock del outbox o a SQLite ocupado. El hilo del outbox lo entrega al
+        backend. Sin outbox (o si SQLite falla) el envío directo es bloqueante
+        y va al pool de hilos o, si está lleno, al executor por defecto.
+        """
+        loop = asyncio.get_running_loop()
+        if OutboxConfig.ENABLED:
+            try:
+                await loop.run_in_executor(
+                    None, backend_outbox.enqueue, "close_assistance", {"phone_number": phone_number}, phone_number
+                )
+                logger.info(f"Cierre de asistencia registrado en el outbox para {phone_number}")
+                return
+            except Exception as e:
+                logger.error(f"No se pudo registrar el cierre en el outbox, enviando directamente: {e}")
+
+        try:
+            await sync_action_executor.run(self._close_assistance_if_exists, phone_number)
+        except ActionPoolFullError:
+            logger.warning(f"Pool de actions síncronos lleno, cerrando asistencia de {phone_number} fuera del pool")
+            await loop.run_in_executor(None, self._close_assistance_if_exists, phone_number)
+
     def _get_farewell_message(self) -> str:
         """
-        Obtiene mensaje de despedida dinámico desde el backend CRM
+        Obtiene mensaje de despedida dinámico desde la caché de mensajes del backend CRM
+
+        No hace llamadas a la red: la caché se revalida en segundo plano.
 
         Returns:
             str: Mensaje de despedida personalizado o mensaje por defecto si falla
         """
         try:
-            # Intentar obtener mensajes del backend
-            farewell_messages = backend_client.get_farewell_messages()
+            # Intentar obtener mensajes del backend (copia en memoria)
+            farewell_messages = farewell_cache.get()
 
             if farewell_messages and len(farewell_messages) > 0:
                 # Si hay múltiples mensajes, seleccionar uno aleatorio
@@ -83,7 +189,7 @@ class ActionFinalizarChat(Action):
 
     def _close_assistance_if_exists(self, phone_number: str) -> None:
         """
-        Intenta cerrar la asistencia activa para el usuario
+        Intenta cerrar la asistencia activa para el usuario (envío directo, bloqueante)
 
         Args:
             phone_number: Número de teléfono del usuario
@@ -91,7 +197,6 @@ class ActionFinalizarChat(Action):
         try:
             logger.info(f"Intentando cerrar asistencia para: {phone_number}")
 
-            # Llamar al endpoint de cierre
             success, message = backend_client.close_assistance(phone_number)
 
             if success:
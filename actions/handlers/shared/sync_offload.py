@@ -0,0 +1,139 @@
+"""
+Ejecución de actions síncronos en un pool de hilos acotado
+
+Evita que un run() síncrono con llamadas bloqueantes congele el event loop
+del action server y, con él, actions rápidos no relacionados.
+"""
+from abc import ABC, abstractmethod
+from typing import Any, Text, Dict, List, Callable
+from concurrent.futures import ThreadPoolExecutor
+from rasa_sdk import Action, Tracker
+from rasa_sdk.executor import CollectingDispatcher
+import asyncio
+import logging
+import os
+import threading
+import time
+
+from actions.utils.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+
+class OffloadConfig:
+    """Configuración del pool de hilos para actions síncronos"""
+
+    # Hilos que ejecutan actions síncronos en paralelo
+    MAX_WORKERS = int(os.getenv('SYNC_ACTIONS_MAX_WORKERS', '8'))
+
+    # Actions que pueden esperar turno antes de rechazar nuevos
+    MAX_QUEUE = int(os.getenv('SYNC_ACTIONS_MAX_QUEUE', '32'))
+
+
+class ActionPoolFullError(Exception):
+    """El pool de actions síncronos no admite más trabajo"""
+
+
+class BoundedActionExecutor:
+    """ThreadPoolExecutor con cola acotada y métricas de espera"""
+
+    def __init__(self, max_workers: int, max_queue: int):
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers,
+            thread_name_prefix="sync-action"
+        )
+        self._slots = threading.BoundedSemaphore(max_workers + max_queue)
+        self._lock = threading.Lock()
+        self._pending = 0
+
+    def _update_pending(self, delta: int):
+        """Actualiza el gauge de trabajos en cola o en ejecución"""
+        with self._lock:
+            self._pending += delta
+            metrics.set_gauge("sync_actions.pending", self._pending)
+
+    async def run(self, func: Callable, *args) -> Any:
+        """
+        Ejecuta func(*args) en el pool sin bloquear el event loop
+
+        Raises:
+            ActionPoolFullError: si el pool y su cola están llenos
+        """
+        if not self._slots.acquire(blocking=False):
+            metrics.increment("sync_actions.rejected")
+            raise ActionPoolFullError()
+
+        enqueued_at = time.monotonic()
+        self._update_pending(1)
+
+        def task():
+            metrics.observe("sync_actions.queue_wait_ms", (time.monotonic() - enqueued_at) * 1000)
+            try:
+                return func(*args)
+            finally:
+                self._slots.release()
+                self._update_pending(-1)
+
+        loop = asyncio.get_running_loop()
+        try:
+            future = loop.run_in_executor(self._executor, task)
+        except RuntimeError:
+            # El executor rechazó la tarea (p. ej. durante el apagado)
+            self._slots.release()
+            self._update_pending(-1)
+            raise
+
+        return await future
+
+
+# Instancia global del pool para actions síncronos
+sync_action_executor = BoundedActionExecutor(
+    max_workers=OffloadConfig.MAX_WORKERS,
+    max_queue=OffloadConfig.MAX_QUEUE
+)
+
+
+class SyncOffloadAction(Action, ABC):
+    """
+    Clase base para actions síncronos heredados
+
+    Las clases hijas implementan run_sync() en lugar de run(); la ejecución
+    ocurre en el pool acotado de hilos. Al ser abstracta, rasa_sdk no la
+    registra y una clase hija sin run_sync() no se puede instanciar.
+    """
+
+    def name(self) -> Text:
+        # Esta clase base NO debe ser registrada directamente
+        return "base_sync_offload_action"
+
+    @abstractmethod
+    def run_sync(self, dispatcher: CollectingDispatcher,
+                 tracker: Tracker,
+                 domain: Dict[Text, Any]) -> List[Dict[Text, Any]]:
+        """Lógica síncrona del action"""
+
+    async def run(self, dispatcher: CollectingDispatcher,
+                  tracker: Tracker,
+                  domain: Dict[Text, Any]) -> List[Dict[Text, Any]]:
+
+        try:
+            return await sync_action_executor.run(self.run_sync, dispatcher, tracker, domain)
+        except ActionPoolFullError:
+            logger.warning(f"Pool de actions síncronos lleno, rechazando {self.name()}")
+            return self._handle_pool_full(dispatcher)
+
+    def _handle_pool_full(self, dispatcher: CollectingDispatcher) -> List[Dict[Text, Any]]:
+        """Responde cuando no hay capacidad para ejecutar el action"""
+
+        message = """😔 **Tenemos alta demanda en este momento**
+
+No pudimos procesar tu solicitud.
+
+**🌐 Te recomendamos:**
+- Consultar en: www.sat.gob.pe
+- Intentar nuevamente en unos minutos
+
+¿Qué más necesitas?"""
+
+        dispatcher.utter_message(text=message)
+        return []
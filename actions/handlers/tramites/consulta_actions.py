@@ -8,8 +8,10 @@ from rasa_sdk.events import SlotSet
 import logging
 import re
 
-from actions.api.sat_client import sat_client
-from actions.api.backend_client import backend_client
+from actions.api.async_sat_client import async_sat_client
+from actions.utils.deadline import Deadline
+from actions.api.query_logger import bot_query_logger
+from actions.handlers.shared.admission import document_query_admission
 from actions.utils.validators import validator
 
 logger = logging.getLogger(__name__)
@@ -59,9 +61,9 @@ class ActionConsultarTramite(Action):
     def name(self) -> Text:
         return "action_consultar_tramite"
 
-    def run(self, dispatcher: CollectingDispatcher,
-            tracker: Tracker,
-            domain: Dict[Text, Any]) -> List[Dict[Text, Any]]:
+    async def run(self, dispatcher: CollectingDispatcher,
+                  tracker: Tracker,
+                  domain: Dict[Text, Any]) -> List[Dict[Text, Any]]:
 
         logger.info("Iniciando consulta de trámite administrativo")
 
@@ -78,10 +80,19 @@ class ActionConsultarTramite(Action):
             return self._handle_invalid_numero(dispatcher, numero_tramite)
 
         # 3. Ejecutar consulta API
+        # Con el servidor sobrecargado se responde de inmediato en lugar de encolar la consulta
+        ticket = document_query_admission.try_admit()
+        if ticket is None:
+            self._handle_api_error(dispatcher, numero_limpio)
+            return []
+
         logger.info(f"Consultando trámite: {numero_limpio}")
-        return self._execute_tramite_api_query(dispatcher, tracker, numero_limpio)
+        try:
+            return await self._execute_tramite_api_query(dispatcher, tracker, numero_limpio)
+        finally:
+            document_query_admission.release(ticket)
 
-    def _execute_tramite_api_query(self, dispatcher: CollectingDispatcher,
+    async def _execute_tramite_api_query(self, dispatcher: CollectingDispatcher,
                                    tracker: Tracker,
                                    numero_tramite: str) -> List[Dict[Text, Any]]:
         """Ejecuta consulta a la API de trámites"""
@@ -89,18 +100,17 @@ class ActionConsultarTramite(Action):
         dispatcher.utter_message(text=f"🔍 Consultando estado del trámite **{numero_tramite}**...")
 
         try:
-            resultado = sat_client.consultar_tramite(numero_tramite)
-
-            # Registrar consulta de la conversación en el backend (no bloqueante)
-            try:
-                backend_client.log_bot_query(
-                    phone_number=tracker.sender_id,
-                    query_type='procedure_by_number',
-                    document_type='procedure_number',
-                    document_value=numero_tramite
-                )
-            except Exception as e:
-                logger.warning(f"No se pudo registrar consulta en backend: {e}")
+            # Plazo común para las llamadas externas del action (respuesta antes que Rasa core corte)
+            deadline = Deadline.for_action()
+            resultado = await async_sat_client.consultar_tramite(numero_tramite, deadline=deadline)
+
+            # Registrar consulta de la conversación en el backend en segundo plano (no bloqueante)
+            bot_query_logger.submit(
+                phone_number=tracker.sender_id,
+                query_type='procedure_by_number',
+                document_type='procedure_number',
+                document_value=numero_tramite
+            )
 
             # Procesar resultado de la API del SAT
             if resultado and isinstance(resultado, list) and len(resultado) > 0:
@@ -143,9 +153,9 @@ class ActionConsultarTramite(Action):
             return self._format_no_tramite_found(numero_tramite)
 
         # Formatear fechas usando la función del cliente SAT
-        fecha_presentacion_fmt = sat_client.format_date(fecha_presentacion) if fecha_presentacion else "No disponible"
-        fecha_resolucion_fmt = sat_client.format_date(fecha_resolucion) if fecha_resolucion else "No disponible"
-        fecha_notifica_res_fmt = sat_client.format_date(fecha_notifica_res) if fecha_notifica_res else "No disponible"
+        fecha_presentacion_fmt = async_sat_client.format_date(fecha_presentacion) if fecha_presentacion else "No disponible"
+        fecha_resolucion_fmt = async_sat_client.format_date(fecha_resolucion) if fecha_resolucion else "No disponible"
+        fecha_notifica_res_fmt = async_sat_client.format_date(fecha_notifica_res) if fecha_notifica_res else "No disponible"
 
         # Construir mensaje
         message = f"""📋 **INFORMACIÓN DEL TRÁMITE**
@@ -6,7 +6,10 @@ from rasa_sdk import Action, Tracker
 from rasa_sdk.executor import CollectingDispatcher
 import logging
 
+from actions.api.async_sat_client import async_sat_client
 from actions.api.sat_client import sat_client
+from actions.api.tupa_catalog import tupa_catalog
+from actions.utils.deadline import Deadline
 
 logger = logging.getLogger(__name__)
 
@@ -23,46 +26,28 @@ class BaseTramiteRequisitos(Action):
         # Esta clase base NO debe ser registrada directamente
         return "base_tramite_requisitos_papeletas"
 
-    def run(self, dispatcher: CollectingDispatcher,
-            tracker: Tracker,
-            domain: Dict[Text, Any]) -> List[Dict[Text, Any]]:
+    async def run(self, dispatcher: CollectingDispatcher,
+                  tracker: Tracker,
+                  domain: Dict[Text, Any]) -> List[Dict[Text, Any]]:
 
         logger.info(f"Consultando requisitos para: {self.titulo_tramite}")
 
-        # Paso 1: Consultar menú de opciones para obtener ivalor
-        menu_response = sat_client.consultar_menu_opcion(
+        # Los requisitos salen del catálogo del TUPA en memoria; solo un trámite
+        # aún no cargado consulta menú y TUPA (plazo común para las dos llamadas)
+        texto_requisitos = await async_sat_client.consultar_requisitos_tramite(
             self.titulo_tramite,
-            tipo_tramite="papeletas"
+            tipo_tramite="papeletas",
+            deadline=Deadline.for_action()
         )
 
-        if not menu_response or 'ivalor' not in menu_response:
-            logger.error(f"No se pudo obtener ivalor para: {self.titulo_tramite}")
+        if not texto_requisitos:
+            logger.error(f"No se pudieron obtener requisitos para: {self.titulo_tramite}")
             return self._handle_api_error(dispatcher)
 
-        ivalor = menu_response.get('ivalor')
-        logger.info(f"ivalor obtenido: {ivalor}")
-
-        # Paso 2: Consultar requisitos del TUPA
-        requisitos_response = sat_client.consultar_requisitos_tupa(ivalor)
-
-        if not requisitos_response or not isinstance(requisitos_response, list) or len(requisitos_response) == 0:
-            logger.error(f"No se pudieron obtener requisitos para ivalor: {ivalor}")
-            return self._handle_api_error(dispatcher)
-
-        # Paso 3: Extraer y formatear el texto de requisitos
-        vdetalle = requisitos_response[0].get('vdetalle', '')
-
-        if not vdetalle:
-            logger.error(f"vdetalle vacío para ivalor: {ivalor}")
-            return self._handle_api_error(dispatcher)
-
-        # Convertir HTML a texto plano
-        texto_requisitos = sat_client.format_html_to_text(vdetalle)
-
-        # Paso 4: Enviar mensaje con los requisitos
+        # Enviar mensaje con los requisitos
         dispatcher.utter_message(text=texto_requisitos)
 
-        # Paso 5: Enviar mensaje con enlaces útiles
+        # Enviar mensaje con enlaces útiles
         mensaje_enlaces = self._get_enlaces_message()
         dispatcher.utter_message(text=mensaje_enlaces)
 
@@ -192,4 +177,11 @@ class ActionTramitesSuspensionRequisitos(BaseTramiteRequisitos):
         self.tipo_tramite = "papeletas"
 
     def name(self) -> Text:
-        return "action_tramites_suspension_requisitos"
\ No newline at end of file
+        return "action_tramites_suspension_requisitos"
+
+
+# Precargar los requisitos de los trámites de este módulo al iniciar el action server (hilo de fondo)
+tupa_catalog.start(
+    [(action.tipo_tramite, action.titulo_tramite) for action in (cls() for cls in BaseTramiteRequisitos.__subclasses__())],
+    sat_client.fetch_requisitos_tramite
+)
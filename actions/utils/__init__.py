@@ -3,6 +3,10 @@ Módulo de utilidades compartidas
 
 Contiene herramientas y funciones auxiliares reutilizables:
 - Validadores de datos (DNI, RUC, placa, códigos)
+- Métricas en memoria (contadores, gauges, latencias)
+- Plazos (deadlines) de extremo a extremo para las llamadas externas de un action
+- Caché en memoria LRU con expiración (TTL) y límite de tamaño
+- Directorio de datos locales (outbox, almacén de tokens)
 - Helpers de formateo
 - Funciones comunes entre diferentes módulos
 """
\ No newline at end of file
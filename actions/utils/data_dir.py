@@ -0,0 +1,27 @@
+"""
+Directorio de datos locales del action server (outbox, almacén de tokens)
+
+Por defecto es un subdirectorio del directorio temporal del sistema, que
+siempre es escribible por el usuario del contenedor. En producción debe
+apuntarse ACTIONS_DATA_DIR a un volumen persistente y privado del servicio.
+"""
+import os
+import tempfile
+from dotenv import load_dotenv
+
+# Cargar variables de entorno
+load_dotenv()
+
+# Directorio base de los archivos locales del action server
+DATA_DIR = os.getenv('ACTIONS_DATA_DIR', os.path.join(tempfile.gettempdir(), 'sat-actions'))
+
+
+def data_path(filename: str) -> str:
+    """Ruta de un archivo dentro del directorio de datos"""
+    return os.path.join(DATA_DIR, filename)
+
+
+def ensure_parent_dir(path: str):
+    """Crea (solo para el usuario actual) el directorio que contendrá path si no existe"""
+    parent = os.path.dirname(os.path.abspath(path))
+    os.makedirs(parent, mode=0o700, exist_ok=True)
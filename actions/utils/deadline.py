@@ -0,0 +1,61 @@
+"""
+Plazo (deadline) de extremo a extremo para las llamadas externas de un action
+
+El action crea un Deadline al empezar y lo pasa a los clientes del SAT y del
+backend y a los manejadores de autenticación; cada llamada recibe solo el
+tiempo que queda, de modo que el action responde antes de que Rasa core
+deje de esperarlo.
+"""
+import os
+import time
+from typing import Optional, Tuple, Union
+from dotenv import load_dotenv
+
+# Cargar variables de entorno
+load_dotenv()
+
+
+class DeadlineConfig:
+    """Configuración de plazos de los actions"""
+
+    # Segundos totales que un action puede dedicar a llamadas externas
+    # (debe ser menor que el timeout de Rasa core para el action endpoint)
+    ACTION_SECONDS = float(os.getenv('ACTION_DEADLINE_SECONDS', '20'))
+
+    # Timeout mínimo que se entrega a una llamada (evita timeouts de 0 s)
+    MIN_TIMEOUT = 0.05
+
+
+class Deadline:
+    """Instante límite medido con reloj monotónico"""
+
+    def __init__(self, seconds: float):
+        self.expires_at = time.monotonic() + seconds
+
+    @classmethod
+    def for_action(cls, seconds: Optional[float] = None) -> "Deadline":
+        """Plazo estándar para las llamadas externas de un action"""
+        return cls(DeadlineConfig.ACTION_SECONDS if seconds is None else seconds)
+
+    def remaining(self) -> float:
+        """Segundos que quedan (0 si ya venció)"""
+        return max(0.0, self.expires_at - time.monotonic())
+
+    def expired(self) -> bool:
+        """True si el plazo ya venció"""
+        return time.monotonic() >= self.expires_at
+
+    def cap(self, timeout: Optional[Union[float, Tuple[float, float]]]) -> Union[float, Tuple[float, float]]:
+        """Recorta un timeout (o tupla connect/read) al tiempo restante; None = solo el restante"""
+        remaining = max(DeadlineConfig.MIN_TIMEOUT, self.remaining())
+        if timeout is None:
+            return remaining
+        if isinstance(timeout, tuple):
+            return tuple(min(value, remaining) for value in timeout)
+        return min(timeout, remaining)
+
+
+def cap_timeout(timeout: Union[float, Tuple[float, float]],
+                deadline: Optional[Deadline]) -> Union[float, Tuple[float, float]]:
+    """Recorta timeout al deadline si hay uno"""
+    return deadline.cap(timeout) if deadline is not None else timeout
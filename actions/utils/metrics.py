@@ -0,0 +1,102 @@
+"""
+Métricas en memoria del action server (contadores, gauges y latencias)
+"""
+import threading
+import logging
+from collections import deque
+from typing import Dict, Any, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class LatencyWindow:
+    """Ventana deslizante de observaciones para calcular percentiles"""
+
+    def __init__(self, size: int = 500):
+        self.values = deque(maxlen=size)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def add(self, value: float):
+        """Registra una observación"""
+        self.values.append(value)
+        self.count += 1
+        self.total += value
+        self.max = max(self.max, value)
+
+    def percentile(self, p: float) -> Optional[float]:
+        """Percentil p (0-100) de la ventana o None si no hay observaciones"""
+        if not self.values:
+            return None
+        ordered = sorted(self.values)
+        index = min(len(ordered) - 1, int(round(p / 100 * (len(ordered) - 1))))
+        return ordered[index]
+
+
+class MetricsRegistry:
+    """Registro de métricas del proceso, seguro para uso concurrente"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters: Dict[str, float] = {}
+        self._gauges: Dict[str, float] = {}
+        self._latencies: Dict[str, LatencyWindow] = {}
+
+    def increment(self, name: str, value: float = 1):
+        """Incrementa un contador"""
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + value
+
+    def set_gauge(self, name: str, value: float):
+        """Fija el valor actual de un gauge"""
+        with self._lock:
+            self._gauges[name] = value
+
+    def observe(self, name: str, value: float):
+        """Registra una observación de latencia (en milisegundos)"""
+        with self._lock:
+            window = self._latencies.get(name)
+            if window is None:
+                window = self._latencies[name] = LatencyWindow()
+            window.add(value)
+
+    def percentile(self, name: str, p: float) -> Optional[float]:
+        """Percentil p de una latencia registrada o None si no hay datos"""
+        with self._lock:
+            window = self._latencies.get(name)
+            return window.percentile(p) if window else None
+
+    def sample_count(self, name: str) -> int:
+        """Observaciones disponibles en la ventana de una latencia"""
+        with self._lock:
+            window = self._latencies.get(name)
+            return len(window.values) if window else 0
+
+    def get_counter(self, name: str) -> float:
+        """Valor actual de un contador"""
+        with self._lock:
+            return self._counters.get(name, 0)
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Copia de todas las métricas para logs o diagnóstico"""
+        with self._lock:
+            return {
+                "counters": dict(self._counters),
+                "gauges": dict(self._gauges),
+                "latencies": {
+                    name: {
+                        "count": window.count,
+                        "avg": window.total / window.count if window.count else 0,
+                        "p50": window.percentile(50),
+                        "p95": window.percentile(95),
+                        "p99": window.percentile(99),
+                        "max": window.max
+                    }
+                    for name, window in self._latencies.items()
+                }
+            }
+
+
+# Instancia global de métricas
+metrics = MetricsRegistry()
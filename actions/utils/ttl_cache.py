@@ -0,0 +1,124 @@
+"""
+Caché en memoria LRU con expiración (TTL) y límite de tamaño
+
+Se usa para guardar por poco tiempo respuestas de servicios externos que
+los usuarios vuelven a pedir en la misma conversación.
+"""
+import copy
+import json
+import threading
+import time
+import logging
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+from actions.utils.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+
+class TTLCache:
+    """
+    Caché LRU con TTL, seguro para uso concurrente
+
+    Los valores se copian al guardar y al leer para que quien los modifique
+    no altere la copia guardada. El tamaño se acota por cantidad de entradas
+    y por bytes aproximados (JSON serializado); al superarlo se descartan
+    las entradas usadas hace más tiempo.
+    """
+
+    def __init__(self, name: str, ttl: float, max_entries: int, max_bytes: int = 0):
+        self.name = name
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        # clave -> (valor, vence_en, bytes aproximados)
+        self._entries: "OrderedDict[str, Tuple[Any, float, int]]" = OrderedDict()
+        self._bytes = 0
+
+    @property
+    def enabled(self) -> bool:
+        """False si la caché está desactivada (TTL o tamaño en 0)"""
+        return self.ttl > 0 and self.max_entries > 0
+
+    @staticmethod
+    def _size_of(value: Any) -> int:
+        """Tamaño aproximado de un valor en bytes"""
+        try:
+            return len(json.dumps(value, default=str))
+        except (TypeError, ValueError):
+            return 0
+
+    def _remove(self, key: str):
+        """Quita una entrada (llamar con _lock tomado)"""
+        _, _, size = self._entries.pop(key)
+        self._bytes -= size
+
+    def _update_gauges(self):
+        """Publica tamaño y bytes de la caché (llamar con _lock tomado)"""
+        metrics.set_gauge(f"{self.name}.entries", len(self._entries))
+        metrics.set_gauge(f"{self.name}.bytes", self._bytes)
+
+    def get(self, key: str) -> Optional[Any]:
+        """Copia del valor guardado bajo key o None si no existe o expiró"""
+        if not self.enabled:
+            return None
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[1] <= time.monotonic():
+                self._remove(key)
+                self._update_gauges()
+                entry = None
+            if entry is None:
+                metrics.increment(f"{self.name}.misses")
+                return None
+            self._entries.move_to_end(key)
+            value = entry[0]
+
+        metrics.increment(f"{self.name}.hits")
+        return copy.deepcopy(value)
+
+    def put(self, key: str, value: Any, ttl: Optional[float] = None):
+        """Guarda una copia de value bajo key durante ttl segundos (por defecto el de la caché)"""
+        if not self.enabled or value is None:
+            return
+
+        size = self._size_of(value)
+        if self.max_bytes and size > self.max_bytes:
+            logger.debug(f"Valor demasiado grande para {self.name} ({size} bytes), no se guarda")
+            return
+
+        stored = copy.deepcopy(value)
+        expires_at = time.monotonic() + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (stored, expires_at, size)
+            self._bytes += size
+
+            # Descartar las entradas menos usadas hasta volver a los límites
+            while len(self._entries) > self.max_entries or (self.max_bytes and self._bytes > self.max_bytes):
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+                metrics.increment(f"{self.name}.evictions")
+            self._update_gauges()
+
+    def invalidate(self, key: str):
+        """Elimina la entrada de key si existe"""
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+                self._update_gauges()
+
+    def clear(self):
+        """Vacía la caché"""
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+            self._update_gauges()
+
+    def stats(self) -> Dict[str, int]:
+        """Entradas y bytes ocupados (para diagnóstico)"""
+        with self._lock:
+            return {"entries": len(self._entries), "bytes": self._bytes}
@@ -0,0 +1,3 @@
+"""
+Pruebas unitarias del action server
+"""
@@ -0,0 +1,40 @@
+"""
+Pruebas del control de admisión de las consultas de documentos
+"""
+from actions.api.bulkhead import sat_bulkheads
+from actions.handlers.shared.admission import AdmissionController
+
+
+def make_controller(max_inflight: int = 2, degraded_max_inflight: int = 1) -> AdmissionController:
+    return AdmissionController("test", max_inflight=max_inflight, sat_pending_ratio=0.9,
+                               target_latency_ms=100, degraded_max_inflight=degraded_max_inflight,
+                               latency_window=10, latency_min_samples=3)
+
+
+def test_sheds_above_max_inflight_and_recovers_on_release():
+    controller = make_controller(max_inflight=2)
+    first = controller.try_admit()
+    second = controller.try_admit()
+
+    assert first is not None and second is not None
+    assert controller.try_admit() is None
+
+    controller.release(first)
+    assert controller.try_admit() is not None
+
+
+def test_limit_drops_while_recent_latency_is_high():
+    controller = make_controller(max_inflight=5, degraded_max_inflight=1)
+    for _ in range(3):
+        controller.release(controller.try_admit() - 1)
+
+    assert controller.try_admit() is not None
+    assert controller.try_admit() is None
+
+
+def test_sheds_when_the_sat_bulkhead_is_almost_full(monkeypatch):
+    controller = make_controller(max_inflight=100)
+    upstream = sat_bulkheads.upstream
+    monkeypatch.setattr(upstream, "_in_use", upstream.limit)
+
+    assert controller.try_admit() is None
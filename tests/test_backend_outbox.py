@@ -0,0 +1,127 @@
+"""
+Pruebas del outbox durable de escrituras al backend
+"""
+import json
+import sqlite3
+
+import pytest
+
+from actions.api import backend_outbox as outbox_module
+from actions.api.backend_client import WriteResult
+from actions.api.backend_outbox import BackendOutbox, OutboxConfig
+
+
+@pytest.fixture
+def outbox(tmp_path, monkeypatch):
+    """Outbox en un directorio temporal, sin hilo de reenvío"""
+    instance = BackendOutbox(str(tmp_path / "outbox.db"))
+    monkeypatch.setattr(instance, "start", lambda: None)
+    return instance
+
+
+@pytest.fixture
+def delivered(monkeypatch):
+    """Reemplaza las operaciones por un registro de entregas con resultados configurables"""
+    calls = []
+    results = {}
+
+    def operation(name):
+        def send(payload, key):
+            calls.append((name, payload))
+            return results.get(payload.get("phone_number"), WriteResult(True, "ok", 200))
+        return send
+
+    monkeypatch.setattr(outbox_module, "OUTBOX_OPERATIONS", {
+        name: operation(name) for name in outbox_module.OUTBOX_OPERATIONS
+    })
+    return calls, results
+
+
+def statuses(outbox: BackendOutbox):
+    with sqlite3.connect(outbox.path) as conn:
+        return conn.execute("SELECT payload, status, attempts FROM outbox ORDER BY id").fetchall()
+
+
+def drain(outbox: BackendOutbox):
+    claimed = outbox._claim_batch()
+    for row in claimed:
+        outbox._deliver(*row)
+    return claimed
+
+
+def test_same_ordering_key_is_delivered_in_order(outbox, delivered):
+    calls, _ = delivered
+    outbox.enqueue("request_advisor", {"phone_number": "1"}, ordering_key="1")
+    outbox.enqueue("close_assistance", {"phone_number": "1"}, ordering_key="1")
+    outbox.enqueue("close_assistance", {"phone_number": "2"}, ordering_key="2")
+
+    # Solo el primero de cada clave se reclama en una vuelta
+    assert len(drain(outbox)) == 2
+    assert len(drain(outbox)) == 1
+    assert calls == [
+        ("request_advisor", {"phone_number": "1"}),
+        ("close_assistance", {"phone_number": "2"}),
+        ("close_assistance", {"phone_number": "1"}),
+    ]
+    assert outbox.pending_count() == 0
+
+
+def test_permanent_rejection_is_dead_lettered_at_once(outbox, delivered):
+    _, results = delivered
+    results["1"] = WriteResult(False, "no existe", 404)
+    outbox.enqueue("close_assistance", {"phone_number": "1"}, ordering_key="1")
+
+    drain(outbox)
+
+    assert statuses(outbox) == [(json.dumps({"phone_number": "1"}), "dead", 1)]
+
+
+@pytest.mark.parametrize("status_code", [None, 429, 503])
+def test_transient_failure_is_retried_later(outbox, delivered, status_code):
+    _, results = delivered
+    results["1"] = WriteResult(False, "falla", status_code)
+    outbox.enqueue("close_assistance", {"phone_number": "1"}, ordering_key="1")
+
+    drain(outbox)
+
+    assert statuses(outbox) == [(json.dumps({"phone_number": "1"}), "pending", 1)]
+    # El backoff deja el registro fuera de la próxima vuelta
+    assert drain(outbox) == []
+
+
+def test_transient_failure_is_dead_lettered_after_max_age(outbox, delivered, monkeypatch):
+    _, results = delivered
+    results["1"] = WriteResult(False, "falla", 503)
+    outbox.enqueue("close_assistance", {"phone_number": "1"}, ordering_key="1")
+    monkeypatch.setattr(OutboxConfig, "MAX_AGE_SECONDS", 0)
+
+    drain(outbox)
+
+    assert statuses(outbox)[0][1] == "dead"
+
+
+def test_dead_row_unblocks_its_ordering_key(outbox, delivered):
+    calls, results = delivered
+    results["1"] = WriteResult(False, "inválido", 400)
+    outbox.enqueue("request_advisor", {"phone_number": "1"}, ordering_key="1")
+    outbox.enqueue("close_assistance", {"phone_number": "1"}, ordering_key="1")
+
+    drain(outbox)
+    results.clear()
+    drain(outbox)
+
+    assert [name for name, _ in calls] == ["request_advisor", "close_assistance"]
+
+
+def test_unknown_operation_is_rejected(outbox):
+    with pytest.raises(ValueError):
+        outbox.enqueue("borrar_todo", {})
+
+
+def test_submit_sends_directly_when_disabled(outbox, delivered, monkeypatch):
+    calls, _ = delivered
+    monkeypatch.setattr(OutboxConfig, "ENABLED", False)
+
+    assert outbox.submit("close_assistance", {"phone_number": "1"}) == (True, "ok")
+    assert calls == [("close_assistance", {"phone_number": "1"})]
+    assert not outbox.resume()
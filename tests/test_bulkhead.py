@@ -0,0 +1,48 @@
+"""
+Pruebas de los bulkheads por servicio y familia
+"""
+import asyncio
+
+from actions.api.bulkhead import Bulkhead, BulkheadRegistry
+
+
+def test_limit_and_release():
+    bulkhead = Bulkhead("test", limit=2)
+    assert bulkhead.acquire(0)
+    assert bulkhead.acquire(0)
+    assert not bulkhead.acquire(0.01)
+
+    bulkhead.release()
+    assert bulkhead.acquire(0)
+    assert bulkhead.in_use == 2
+
+
+def test_family_also_takes_a_slot_of_the_upstream():
+    registry = BulkheadRegistry("sat", limit=2, family_limits={"saldomatico": 1}, default_family_limit=2)
+    saldomatico = registry.get("saldomatico")
+    falta = registry.get("falta")
+
+    assert saldomatico.acquire(0)
+    assert not saldomatico.acquire(0)
+    assert falta.acquire(0)
+    # El servicio está lleno aunque la familia tenga cupo
+    assert not falta.acquire(0)
+    assert registry.upstream.in_use == 2
+
+    saldomatico.release()
+    assert registry.upstream.in_use == 1
+    assert falta.acquire(0)
+
+
+def test_async_waiter_gets_the_released_slot():
+    bulkhead = Bulkhead("test", limit=1)
+
+    async def scenario():
+        assert await bulkhead.acquire_async(0)
+        waiter = asyncio.ensure_future(bulkhead.acquire_async(1))
+        await asyncio.sleep(0.02)
+        bulkhead.release()
+        return await waiter
+
+    assert asyncio.run(scenario())
+    assert bulkhead.in_use == 1
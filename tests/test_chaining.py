@@ -0,0 +1,56 @@
+"""
+Pruebas del encadenamiento de actions en el mismo request
+"""
+import asyncio
+
+from rasa_sdk import Action, Tracker
+from rasa_sdk.events import SlotSet
+from rasa_sdk.executor import CollectingDispatcher
+
+from actions.handlers.shared.chaining import apply_events, run_chained
+
+
+class RecordingAction(Action):
+    """Action destino que anota lo que ve en el tracker"""
+
+    def __init__(self):
+        self.seen = None
+
+    def name(self):
+        return "action_destino"
+
+    async def run(self, dispatcher, tracker, domain):
+        self.seen = {
+            "placa": tracker.get_slot("placa"),
+            "entities": tracker.latest_message.get("entities"),
+        }
+        return [SlotSet("consultado", True)]
+
+
+def make_tracker() -> Tracker:
+    return Tracker("51999888777", {"placa": None}, {"entities": [{"entity": "dni", "value": "1"}]},
+                   [], False, None, {}, "action_listen")
+
+
+def test_run_chained_applies_slots_before_the_target_runs():
+    tracker = make_tracker()
+    action = RecordingAction()
+    events = [SlotSet("placa", "ABC123")]
+
+    result = asyncio.run(run_chained(action, CollectingDispatcher(), tracker, {}, events))
+
+    assert action.seen["placa"] == "ABC123"
+    assert result == [SlotSet("placa", "ABC123"), SlotSet("consultado", True)]
+
+
+def test_apply_events_does_not_modify_the_original_tracker():
+    tracker = make_tracker()
+
+    chained = apply_events(tracker, [SlotSet("placa", "ABC123")],
+                           entities=[{"entity": "placa", "value": "ABC123"}])
+
+    assert chained.get_slot("placa") == "ABC123"
+    assert [e["entity"] for e in chained.latest_message["entities"]] == ["placa", "dni"]
+    assert tracker.get_slot("placa") is None
+    assert tracker.events == []
+    assert len(tracker.latest_message["entities"]) == 1
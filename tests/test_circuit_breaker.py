@@ -0,0 +1,79 @@
+"""
+Pruebas del circuit breaker por familia de endpoints
+"""
+import time
+
+from actions.api.circuit_breaker import CircuitBreaker, CircuitBreakerRegistry
+
+
+def make_breaker(open_seconds: float = 60, half_open_probes: int = 2) -> CircuitBreaker:
+    return CircuitBreaker("test", window=10, min_calls=4, failure_rate=0.5,
+                          open_seconds=open_seconds, half_open_probes=half_open_probes)
+
+
+def record_all(breaker: CircuitBreaker, outcomes):
+    for outcome in outcomes:
+        assert breaker.allow_request()
+        breaker.record(outcome)
+
+
+def test_stays_closed_below_min_calls():
+    breaker = make_breaker()
+    record_all(breaker, [False, False, False])
+    assert breaker.state == CircuitBreaker.CLOSED
+
+
+def test_opens_at_failure_rate_and_rejects():
+    breaker = make_breaker()
+    record_all(breaker, [True, True, False, False])
+
+    assert breaker.state == CircuitBreaker.OPEN
+    assert not breaker.allow_request()
+
+
+def test_local_errors_do_not_count():
+    breaker = make_breaker()
+    record_all(breaker, [None] * 10 + [True, True, False])
+    assert breaker.state == CircuitBreaker.CLOSED
+
+
+def test_half_opens_after_open_seconds_and_limits_probes():
+    breaker = make_breaker(open_seconds=0.05)
+    record_all(breaker, [False] * 4)
+    time.sleep(0.06)
+
+    assert breaker.allow_request()
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    assert breaker.allow_request()
+    assert not breaker.allow_request()
+
+
+def test_successful_probes_close_and_failed_probe_reopens():
+    breaker = make_breaker(open_seconds=0.05)
+    record_all(breaker, [False] * 4)
+    time.sleep(0.06)
+    record_all(breaker, [True, True])
+    assert breaker.state == CircuitBreaker.CLOSED
+
+    record_all(breaker, [False] * 4)
+    time.sleep(0.06)
+    record_all(breaker, [False])
+    assert breaker.state == CircuitBreaker.OPEN
+
+
+def test_unevaluated_probe_releases_its_slot():
+    breaker = make_breaker(open_seconds=0.05, half_open_probes=1)
+    record_all(breaker, [False] * 4)
+    time.sleep(0.06)
+
+    assert breaker.allow_request()
+    breaker.record(None)
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    assert breaker.allow_request()
+
+
+def test_registry_reuses_breakers_and_prefixes_names():
+    registry = CircuitBreakerRegistry(prefix="background.", window=10, min_calls=4, failure_rate=0.5,
+                                      open_seconds=60, half_open_probes=1)
+    assert registry.get("falta") is registry.get("falta")
+    assert registry.get("falta").name == "background.falta"
@@ -0,0 +1,32 @@
+"""
+Pruebas del plazo de extremo a extremo de los actions
+"""
+import time
+
+from actions.utils.deadline import Deadline, DeadlineConfig, cap_timeout
+
+
+def test_remaining_and_expired():
+    deadline = Deadline(0.05)
+    assert 0 < deadline.remaining() <= 0.05
+    assert not deadline.expired()
+    time.sleep(0.06)
+    assert deadline.expired()
+    assert deadline.remaining() == 0
+
+
+def test_cap_limits_timeouts_to_the_remaining_time():
+    deadline = Deadline(1)
+    assert deadline.cap(30) <= 1
+    assert deadline.cap(0.5) == 0.5
+    connect, read = deadline.cap((3, 15))
+    assert connect <= 1 and read <= 1
+    assert deadline.cap(None) <= 1
+
+
+def test_expired_deadline_still_gives_a_minimum_timeout():
+    assert Deadline(0).cap(30) == DeadlineConfig.MIN_TIMEOUT
+
+
+def test_cap_timeout_without_deadline_keeps_the_timeout():
+    assert cap_timeout((3, 15), None) == (3, 15)
@@ -0,0 +1,79 @@
+"""
+Pruebas de la caché stale-while-revalidate de mensajes de despedida
+"""
+import threading
+import time
+
+from actions.api.farewell_cache import FarewellMessagesCache
+
+
+def wait_for(condition, timeout: float = 1):
+    until = time.monotonic() + timeout
+    while not condition() and time.monotonic() < until:
+        time.sleep(0.005)
+    assert condition()
+
+
+def test_miss_until_loaded_then_served_from_memory():
+    cache = FarewellMessagesCache(fresh_seconds=60, max_stale_seconds=600)
+    calls = []
+    cache.start(lambda category_id: calls.append(category_id) or ["Hasta luego"], category_id=4)
+
+    wait_for(lambda: cache.get(4) is not None)
+    assert cache.get(4) == ["Hasta luego"]
+    assert calls == [4]
+
+
+def test_stale_copy_is_served_while_revalidating():
+    cache = FarewellMessagesCache(fresh_seconds=0.01, max_stale_seconds=600)
+    messages = iter([["viejo"], ["nuevo"]])
+    cache.start(lambda category_id: next(messages), category_id=4)
+    wait_for(lambda: cache._entries.get(4) is not None)
+    time.sleep(0.02)
+
+    assert cache.get(4) == ["viejo"]
+    wait_for(lambda: cache._entries[4][0] == ["nuevo"])
+
+
+def test_too_old_copy_is_not_served():
+    cache = FarewellMessagesCache(fresh_seconds=0.01, max_stale_seconds=0.02)
+    cache.start(lambda category_id: ["viejo"], category_id=4)
+    wait_for(lambda: cache._entries.get(4) is not None)
+    cache._fetch = lambda category_id: None
+    time.sleep(0.03)
+
+    assert cache.get(4) is None
+
+
+def test_failed_revalidation_keeps_the_previous_copy():
+    cache = FarewellMessagesCache(fresh_seconds=0.01, max_stale_seconds=600)
+    cache.start(lambda category_id: ["viejo"], category_id=4)
+    wait_for(lambda: cache._entries.get(4) is not None)
+
+    def failing(category_id):
+        raise RuntimeError("backend caído")
+    cache._fetch = failing
+    time.sleep(0.02)
+
+    assert cache.get(4) == ["viejo"]
+    wait_for(lambda: not cache._revalidating)
+    assert cache.get(4) == ["viejo"]
+
+
+def test_one_revalidation_at_a_time_per_category():
+    cache = FarewellMessagesCache(fresh_seconds=60, max_stale_seconds=600)
+    release = threading.Event()
+    calls = []
+
+    def slow_fetch(category_id):
+        calls.append(category_id)
+        release.wait(1)
+        return ["Hasta luego"]
+
+    cache.start(slow_fetch, category_id=4)
+    for _ in range(5):
+        assert cache.get(4) is None
+    release.set()
+
+    wait_for(lambda: cache.get(4) is not None)
+    assert calls == [4]
@@ -0,0 +1,71 @@
+"""
+Pruebas de las peticiones con cobertura (hedging)
+"""
+import asyncio
+
+from actions.api.hedging import adaptive_hedge_delay, hedged_call
+from actions.api.rate_limiter import TokenBucket
+from actions.api.retry_policy import RequestBudget
+from actions.utils.metrics import metrics
+
+
+def generous_budget() -> RequestBudget:
+    return RequestBudget("test_hedge", ratio=1, min_per_second=0, max_tokens=10)
+
+
+def calls_with_latencies(*latencies):
+    """make_call que responde con su número de llamada tras la latencia indicada"""
+    calls = []
+
+    async def make_call():
+        number = len(calls)
+        calls.append(number)
+        await asyncio.sleep(latencies[number])
+        return number
+
+    return make_call, calls
+
+
+def test_fast_primary_is_not_hedged():
+    make_call, calls = calls_with_latencies(0.01)
+    result = asyncio.run(hedged_call(make_call, 0.1, generous_budget(), "test"))
+    assert result == 0
+    assert calls == [0]
+
+
+def test_slow_primary_is_hedged_and_the_first_answer_wins():
+    make_call, calls = calls_with_latencies(0.5, 0.01)
+    result = asyncio.run(hedged_call(make_call, 0.02, generous_budget(), "test"))
+    assert result == 1
+    assert calls == [0, 1]
+
+
+def test_unacceptable_answer_waits_for_the_other():
+    make_call, _ = calls_with_latencies(0.1, 0.01)
+    result = asyncio.run(hedged_call(make_call, 0.02, generous_budget(), "test",
+                                     is_acceptable=lambda number: number == 0))
+    assert result == 0
+
+
+def test_no_hedge_without_budget_or_rate_limit_token():
+    empty_budget = RequestBudget("test_hedge", ratio=0, min_per_second=0, max_tokens=1)
+    empty_budget._tokens = 0
+    make_call, calls = calls_with_latencies(0.05, 0.01)
+    assert asyncio.run(hedged_call(make_call, 0.01, empty_budget, "test")) == 0
+    assert calls == [0]
+
+    bucket = TokenBucket("test", rate=0.001, burst=1, max_queue=5)
+    bucket._tokens = 0
+    make_call, calls = calls_with_latencies(0.05, 0.01)
+    assert asyncio.run(hedged_call(make_call, 0.01, generous_budget(), "test", rate_limiter=bucket)) == 0
+    assert calls == [0]
+
+
+def test_adaptive_delay_uses_the_observed_percentile():
+    metric = "test_hedging.latency_ms"
+    assert adaptive_hedge_delay(metric, 95, min_samples=10, default_delay=2, min_delay=0.1) == 2
+
+    for _ in range(20):
+        metrics.observe(metric, 500)
+    assert adaptive_hedge_delay(metric, 95, min_samples=10, default_delay=2, min_delay=0.1) == 0.5
+    assert adaptive_hedge_delay(metric, 95, min_samples=10, default_delay=2, min_delay=1) == 1
@@ -0,0 +1,61 @@
+"""
+Pruebas del limitador de tasa con cola por prioridad
+"""
+import asyncio
+
+from actions.api.rate_limiter import (
+    PRIORITY_BACKGROUND, PRIORITY_INTERACTIVE, TokenBucket, background_priority, current_priority
+)
+
+
+def test_burst_then_empty():
+    bucket = TokenBucket("test", rate=0.001, burst=2, max_queue=5)
+    assert bucket.acquire(0)
+    assert bucket.acquire(0)
+    assert not bucket.acquire(0)
+
+
+def test_waiters_are_served_in_priority_order():
+    bucket = TokenBucket("test", rate=20, burst=1, max_queue=5)
+    served = []
+
+    async def wait_turn(label: str, priority: int):
+        assert await bucket.acquire_async(2, priority=priority)
+        served.append(label)
+
+    async def scenario():
+        assert await bucket.acquire_async(0)
+        background = asyncio.ensure_future(wait_turn("background", PRIORITY_BACKGROUND))
+        await asyncio.sleep(0)
+        interactive = asyncio.ensure_future(wait_turn("interactive", PRIORITY_INTERACTIVE))
+        await asyncio.gather(background, interactive)
+
+    asyncio.run(scenario())
+    assert served == ["interactive", "background"]
+
+
+def test_full_queue_rejects_without_waiting():
+    bucket = TokenBucket("test", rate=0.001, burst=1, max_queue=0)
+    assert bucket.acquire(0)
+    assert not bucket.acquire(5)
+
+
+def test_cancelled_waiter_leaves_the_queue():
+    bucket = TokenBucket("test", rate=0.001, burst=1, max_queue=5)
+
+    async def scenario():
+        assert await bucket.acquire_async(0)
+        waiter = asyncio.ensure_future(bucket.acquire_async(5))
+        await asyncio.sleep(0.01)
+        waiter.cancel()
+        await asyncio.gather(waiter, return_exceptions=True)
+
+    asyncio.run(scenario())
+    assert bucket._waiters == []
+
+
+def test_background_priority_context():
+    assert current_priority() == PRIORITY_INTERACTIVE
+    with background_priority():
+        assert current_priority() == PRIORITY_BACKGROUND
+    assert current_priority() == PRIORITY_INTERACTIVE
@@ -0,0 +1,67 @@
+"""
+Pruebas de la política de reintentos y del presupuesto de peticiones extra
+"""
+from actions.api.retry_policy import RequestBudget, RetryPolicy
+
+
+def make_policy(budget: RequestBudget, max_attempts: int = 3) -> RetryPolicy:
+    return RetryPolicy(max_attempts=max_attempts, base_delay=0.2, max_delay=1,
+                       retryable_statuses=frozenset({502, 503, 504}), budget=budget)
+
+
+def generous_budget() -> RequestBudget:
+    return RequestBudget("test", ratio=1, min_per_second=0, max_tokens=100)
+
+
+def test_budget_is_fed_by_original_requests():
+    budget = RequestBudget("test", ratio=0.5, min_per_second=0, max_tokens=10)
+    budget._tokens = 0
+
+    assert not budget.try_spend()
+    budget.record_request()
+    budget.record_request()
+    assert budget.try_spend()
+    assert not budget.try_spend()
+
+
+def test_budget_is_capped():
+    budget = RequestBudget("test", ratio=1, min_per_second=0, max_tokens=2)
+    for _ in range(5):
+        budget.record_request()
+    assert budget.try_spend()
+    assert budget.try_spend()
+    assert not budget.try_spend()
+
+
+def test_only_idempotent_methods_are_retried():
+    policy = make_policy(generous_budget())
+    assert policy.next_delay("POST", 1, "503") is None
+    assert policy.next_delay("PUT", 1, "503") is None
+    assert policy.next_delay("get", 1, "503") is not None
+
+
+def test_stops_at_max_attempts():
+    policy = make_policy(generous_budget(), max_attempts=3)
+    assert policy.next_delay("GET", 2, "503") is not None
+    assert policy.next_delay("GET", 3, "503") is None
+
+
+def test_backoff_is_bounded_and_jittered():
+    policy = make_policy(generous_budget(), max_attempts=10)
+    delays = [policy.next_delay("GET", attempt, "503") for attempt in range(1, 9)]
+    assert all(0 <= delay <= 1 for delay in delays)
+    assert policy.next_delay("GET", 1, "503") <= 0.2
+
+
+def test_exhausted_budget_stops_retries():
+    budget = RequestBudget("test", ratio=0, min_per_second=0, max_tokens=1)
+    policy = make_policy(budget)
+    assert policy.next_delay("GET", 1, "503") is not None
+    assert policy.next_delay("GET", 1, "503") is None
+
+
+def test_retryable_statuses():
+    policy = make_policy(generous_budget())
+    assert policy.is_retryable_status(503)
+    assert not policy.is_retryable_status(500)
+    assert not policy.is_retryable_status(404)
@@ -0,0 +1,67 @@
+"""
+Pruebas de la caché de consultas de deuda del cliente SAT
+"""
+import pytest
+
+from actions.api import sat_client as sat_client_module
+from actions.api.sat_client import SATAPIClient
+from actions.utils.metrics import metrics
+from actions.utils.ttl_cache import TTLCache
+
+
+@pytest.fixture
+def client(monkeypatch):
+    """Cliente SAT que cuenta las peticiones de red en lugar de hacerlas"""
+    instance = SATAPIClient()
+    instance.requests = []
+
+    def fake_request(method, endpoint, deadline=None, **kwargs):
+        instance.requests.append(endpoint)
+        return {"papeletas": [{"endpoint": endpoint}]}
+
+    monkeypatch.setattr(instance, "_make_request", fake_request)
+    return instance
+
+
+def use_cache(monkeypatch, ttl: float) -> TTLCache:
+    cache = TTLCache("test.result_cache", ttl=ttl, max_entries=10, max_bytes=1024 * 1024)
+    monkeypatch.setattr(sat_client_module, "sat_result_cache", cache)
+    return cache
+
+
+@pytest.mark.parametrize("consulta, primera, segunda", [
+    ("consultar_papeletas_por_placa", "abc-123", " ABC 123 "),
+    ("consultar_papeletas_por_dni", "12.345.678", " 12345678"),
+    ("consultar_papeletas_por_ruc", "20-12345678-9", "20123456789"),
+])
+def test_spellings_of_a_document_share_one_entry(client, monkeypatch, consulta, primera, segunda):
+    cache = use_cache(monkeypatch, ttl=60)
+    hits = metrics.get_counter("test.result_cache.hits")
+
+    first = getattr(client, consulta)(primera)
+    second = getattr(client, consulta)(segunda)
+
+    assert len(client.requests) == 1
+    assert second == first
+    assert cache.stats()["entries"] == 1
+    assert metrics.get_counter("test.result_cache.hits") == hits + 1
+
+
+def test_ttl_zero_disables_the_cache(client, monkeypatch):
+    cache = use_cache(monkeypatch, ttl=0)
+
+    client.consultar_papeletas_por_placa("ABC123")
+    client.consultar_papeletas_por_placa("ABC123")
+
+    assert len(client.requests) == 2
+    assert cache.stats()["entries"] == 0
+
+
+def test_failed_lookups_are_not_cached(client, monkeypatch):
+    use_cache(monkeypatch, ttl=60)
+    monkeypatch.setattr(client, "_make_request", lambda *args, **kwargs: client.requests.append(1))
+
+    client.consultar_papeletas_por_placa("ABC123")
+    client.consultar_papeletas_por_placa("ABC123")
+
+    assert len(client.requests) == 2
@@ -0,0 +1,139 @@
+"""
+Pruebas de los actions de sesión (action_session_start, action_finalizar_chat)
+"""
+import asyncio
+import sqlite3
+import threading
+from types import SimpleNamespace
+
+import pytest
+from rasa_sdk import Tracker
+from rasa_sdk.events import ActionExecuted, Restarted, SessionStarted, SlotSet
+from rasa_sdk.executor import CollectingDispatcher
+
+from actions.api.backend_outbox import BackendOutbox, OutboxConfig
+from actions.handlers.shared import session_actions
+from actions.handlers.shared.session_actions import ActionFinalizarChat, ActionSessionStart
+from actions.handlers.shared.sync_offload import ActionPoolFullError
+
+
+@pytest.fixture
+def outbox(tmp_path, monkeypatch):
+    """Outbox en un directorio temporal y sin hilo de reenvío"""
+    instance = BackendOutbox(str(tmp_path / "outbox.db"))
+    monkeypatch.setattr(instance, "start", lambda: None)
+    monkeypatch.setattr(session_actions, "backend_outbox", instance)
+    return instance
+
+
+@pytest.fixture
+def full_pool(monkeypatch):
+    """Pool de actions síncronos que rechaza todo el trabajo"""
+    async def rejected(func, *args):
+        raise ActionPoolFullError()
+    monkeypatch.setattr(session_actions.sync_action_executor, "run", rejected)
+
+
+def session_tracker(events, slots=None) -> Tracker:
+    return Tracker("51999888777", slots or {}, {}, events, False, None, {}, "action_listen")
+
+
+def start_session(tracker: Tracker, carry_over: bool):
+    domain = {"session_config": {"carry_over_slots_to_new_session": carry_over}}
+    return asyncio.run(ActionSessionStart().run(CollectingDispatcher(), tracker, domain))
+
+
+def test_session_start_carries_over_slots_when_configured():
+    tracker = session_tracker([SlotSet("placa", "ABC123"), SlotSet("dni", "12345678")])
+
+    assert start_session(tracker, carry_over=True) == [
+        SessionStarted(), SlotSet("placa", "ABC123"), SlotSet("dni", "12345678"), ActionExecuted("action_listen")
+    ]
+    assert start_session(tracker, carry_over=False) == [SessionStarted(), ActionExecuted("action_listen")]
+
+
+def test_session_start_keeps_session_started_metadata():
+    metadata = {"channel": "whatsapp"}
+    tracker = session_tracker([], slots={"session_started_metadata": metadata})
+
+    assert start_session(tracker, carry_over=False) == [
+        SessionStarted(), SlotSet("session_started_metadata", metadata), ActionExecuted("action_listen")
+    ]
+
+
+def test_session_start_prefetch_is_opt_in(monkeypatch):
+    prefetched = []
+    monkeypatch.setattr(session_actions.async_backend_client, "prefetch_citizen_data", prefetched.append)
+
+    monkeypatch.setattr(session_actions.BackendConfig, "CITIZEN_PREFETCH_ON_SESSION_START", False)
+    start_session(session_tracker([]), carry_over=False)
+    assert prefetched == []
+
+    monkeypatch.setattr(session_actions.BackendConfig, "CITIZEN_PREFETCH_ON_SESSION_START", True)
+    start_session(session_tracker([]), carry_over=False)
+    assert prefetched == ["51999888777"]
+
+
+def run_action(sender_id: str):
+    dispatcher = CollectingDispatcher()
+    tracker = SimpleNamespace(sender_id=sender_id)
+    events = asyncio.run(ActionFinalizarChat().run(dispatcher, tracker, {}))
+    return dispatcher, events
+
+
+def test_close_is_enqueued_with_pool_full(outbox, full_pool, monkeypatch):
+    monkeypatch.setattr(OutboxConfig, "ENABLED", True)
+
+    dispatcher, events = run_action("51999888777")
+
+    with sqlite3.connect(outbox.path) as conn:
+        rows = conn.execute("SELECT operation, payload, ordering_key, status FROM outbox").fetchall()
+    assert rows == [("close_assistance", '{"phone_number": "51999888777"}', "51999888777", "pending")]
+    assert events == [Restarted()]
+    assert len(dispatcher.messages) == 1
+
+
+def test_outbox_write_runs_off_the_event_loop(outbox, monkeypatch):
+    monkeypatch.setattr(OutboxConfig, "ENABLED", True)
+    threads = []
+    enqueue = outbox.enqueue
+
+    def recording_enqueue(*args, **kwargs):
+        threads.append(threading.current_thread())
+        return enqueue(*args, **kwargs)
+    monkeypatch.setattr(outbox, "enqueue", recording_enqueue)
+
+    run_action("51999888777")
+
+    assert threads and threads[0] is not threading.main_thread()
+    assert outbox.pending_count() == 1
+
+
+def test_close_is_sent_directly_with_outbox_disabled_and_pool_full(full_pool, monkeypatch):
+    monkeypatch.setattr(OutboxConfig, "ENABLED", False)
+    closed = []
+    monkeypatch.setattr(
+        session_actions.backend_client, "close_assistance",
+        lambda phone_number: closed.append(phone_number) or (True, "ok")
+    )
+
+    _, events = run_action("51999888777")
+
+    assert closed == ["51999888777"]
+    assert events == [Restarted()]
+
+
+def test_close_is_sent_directly_when_outbox_fails(full_pool, monkeypatch):
+    monkeypatch.setattr(OutboxConfig, "ENABLED", True)
+    def broken_enqueue(*args, **kwargs):
+        raise sqlite3.OperationalError("disk I/O error")
+    monkeypatch.setattr(session_actions.backend_outbox, "enqueue", broken_enqueue)
+    closed = []
+    monkeypatch.setattr(
+        session_actions.backend_client, "close_assistance",
+        lambda phone_number: closed.append(phone_number) or (True, "ok")
+    )
+
+    run_action("51999888777")
+
+    assert closed == ["51999888777"]
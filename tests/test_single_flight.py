@@ -0,0 +1,77 @@
+"""
+Pruebas de la deduplicación de peticiones en curso
+"""
+import asyncio
+import threading
+import time
+
+import pytest
+
+from actions.api.single_flight import AsyncSingleFlight, SingleFlight
+
+
+def test_concurrent_callers_share_one_call():
+    flight = SingleFlight("test")
+    calls = []
+
+    def fetch():
+        calls.append(1)
+        time.sleep(0.05)
+        return {"deuda": [1]}
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(flight.do("k", fetch))) for _ in range(5)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(calls) == 1
+    assert results == [{"deuda": [1]}] * 5
+    # Cada llamador recibe su propia copia
+    assert len({id(result) for result in results}) == 5
+
+
+def test_errors_reach_every_caller_and_the_key_is_released():
+    flight = SingleFlight("test")
+
+    def failing():
+        raise RuntimeError("caído")
+
+    with pytest.raises(RuntimeError):
+        flight.do("k", failing)
+    assert flight.do("k", lambda: 1) == 1
+
+
+def test_async_callers_share_one_call():
+    flight = AsyncSingleFlight("test")
+    calls = []
+
+    async def fetch():
+        calls.append(1)
+        await asyncio.sleep(0.02)
+        return {"deuda": [1]}
+
+    async def scenario():
+        return await asyncio.gather(*(flight.do("k", fetch) for _ in range(5)))
+
+    results = asyncio.run(scenario())
+    assert len(calls) == 1
+    assert results == [{"deuda": [1]}] * 5
+
+
+def test_cancelling_one_async_caller_does_not_cancel_the_shared_call():
+    flight = AsyncSingleFlight("test")
+
+    async def fetch():
+        await asyncio.sleep(0.05)
+        return "ok"
+
+    async def scenario():
+        first = asyncio.ensure_future(flight.do("k", fetch))
+        second = asyncio.ensure_future(flight.do("k", fetch))
+        await asyncio.sleep(0.01)
+        first.cancel()
+        return await second
+
+    assert asyncio.run(scenario()) == "ok"
@@ -0,0 +1,44 @@
+"""
+Pruebas de los timeouts por familia de endpoints
+"""
+from actions.api.timeout_policy import TimeoutPolicy
+from actions.utils.metrics import metrics
+
+
+def make_policy(metric_prefix: str, adaptive: bool = True) -> TimeoutPolicy:
+    return TimeoutPolicy(metric_prefix, connect_timeout=3, read_timeouts={"saldomatico": 25},
+                         default_read_timeout=10, adaptive=adaptive, percentile=99, factor=1.5,
+                         min_read_timeout=2, min_samples=5)
+
+
+def test_configured_timeouts_until_enough_samples():
+    policy = make_policy("test_timeouts_config")
+    assert policy.timeout_for("saldomatico") == (3, 25)
+    assert policy.timeout_for("otra") == (3, 10)
+
+
+def test_adaptive_read_timeout_follows_per_attempt_latency():
+    policy = make_policy("test_timeouts_adaptive")
+    for _ in range(10):
+        metrics.observe(policy.attempt_metric("saldomatico"), 4000)
+        # La latencia de la llamada completa (con reintentos) no mueve el timeout
+        metrics.observe("test_timeouts_adaptive.saldomatico.latency_ms", 60000)
+
+    assert policy.read_timeout("saldomatico") == 6
+
+
+def test_adaptive_read_timeout_is_bounded():
+    policy = make_policy("test_timeouts_bounds")
+    for _ in range(10):
+        metrics.observe(policy.attempt_metric("rapida"), 100)
+        metrics.observe(policy.attempt_metric("lenta"), 60000)
+
+    assert policy.read_timeout("rapida") == 2
+    assert policy.read_timeout("lenta") == 10
+
+
+def test_fixed_policy_ignores_observed_latency():
+    policy = make_policy("test_timeouts_fixed", adaptive=False)
+    for _ in range(10):
+        metrics.observe(policy.attempt_metric("saldomatico"), 100)
+    assert policy.read_timeout("saldomatico") == 25
@@ -0,0 +1,69 @@
+"""
+Pruebas de la caché LRU con TTL
+"""
+import time
+
+from actions.utils.ttl_cache import TTLCache
+
+
+def test_returns_copies():
+    cache = TTLCache("test", ttl=60, max_entries=10)
+    value = {"papeletas": [1, 2]}
+    cache.put("k", value)
+
+    value["papeletas"].append(3)
+    cached = cache.get("k")
+    cached["papeletas"].append(4)
+
+    assert cache.get("k") == {"papeletas": [1, 2]}
+
+
+def test_entries_expire():
+    cache = TTLCache("test", ttl=0.05, max_entries=10)
+    cache.put("k", 1)
+    cache.put("corta", 2, ttl=0.01)
+    time.sleep(0.02)
+    assert cache.get("corta") is None
+    assert cache.get("k") == 1
+    time.sleep(0.04)
+    assert cache.get("k") is None
+    assert cache.stats()["entries"] == 0
+
+
+def test_evicts_least_recently_used_by_count_and_bytes():
+    cache = TTLCache("test", ttl=60, max_entries=2)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    cache.get("a")
+    cache.put("c", 3)
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+
+    by_size = TTLCache("test", ttl=60, max_entries=10, max_bytes=20)
+    by_size.put("a", "x" * 10)
+    by_size.put("b", "y" * 10)
+    assert by_size.get("a") is None
+    assert by_size.get("b") == "y" * 10
+    by_size.put("enorme", "z" * 50)
+    assert by_size.get("enorme") is None
+
+
+def test_disabled_cache_and_none_values_are_not_stored():
+    disabled = TTLCache("test", ttl=0, max_entries=10)
+    disabled.put("k", 1)
+    assert not disabled.enabled
+    assert disabled.get("k") is None
+
+    cache = TTLCache("test", ttl=60, max_entries=10)
+    cache.put("k", None)
+    assert cache.stats()["entries"] == 0
+
+
+def test_invalidate_and_clear():
+    cache = TTLCache("test", ttl=60, max_entries=10)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    cache.invalidate("a")
+    assert cache.get("a") is None
+    cache.clear()
+    assert cache.stats() == {"entries": 0, "bytes": 0}